@@ -10,6 +10,7 @@ sudo apt-get install -y \
   python3 \
   python3-flask \
   python3-rtmidi \
+  python3-waitress \
   alsa-utils \
   mpv \
   mpg123 \
@@ -24,6 +25,16 @@ echo "[ShowBox] Installing application files"
 # web
 sudo cp -f "$REPO_ROOT/src/webapp/app.py" "$RUNTIME_BASE/webapp/app.py"
 
+echo "[ShowBox] Installing web UI assets (committed in the repo, no CDN needed at the venue)"
+if [ ! -s "$REPO_ROOT/src/webapp/static/showbox-1.css" ]; then
+  echo "[ShowBox] ERROR: src/webapp/static/showbox-1.css is missing from the checkout;" \
+       "the web UI would render unstyled. Restore it (git checkout -- src/webapp/static) and re-run." >&2
+  exit 1
+fi
+sudo mkdir -p "$RUNTIME_BASE/webapp/static"
+sudo cp -rf "$REPO_ROOT/src/webapp/static/." "$RUNTIME_BASE/webapp/static/"
+sudo chown -R fc:fc "$RUNTIME_BASE/webapp/static"
+
 # player/engine
 sudo cp -f "$REPO_ROOT/src/player/midi_cues.py" "$RUNTIME_BASE/player/midi_cues.py"
 
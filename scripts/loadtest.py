@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+loadtest.py — web UI + engine coexistence benchmark and soak test.
+
+Runs app.py and midi_cues.py from this checkout on one machine against a
+throwaway data directory (SHOWBOX_BASE), with the fake player backend and a
+UDP MIDI input. Then, for the whole run:
+
+ - web clients hammer /state, /, the media index, cue uploads and control
+   endpoints (log level, show reload, MIDI out, flight dump) concurrently
+ - a MIDI replayer sends Program Change -> GO -> STOP sequences to the engine
+ - both processes' RSS, threads and open fds are sampled
+
+Results (web latency/throughput per endpoint, engine trigger latency,
+memory growth, timeline) are written as JSON so runs can be compared.
+
+Usage:
+  scripts/loadtest.py                                  60 s, 16 clients
+  scripts/loadtest.py --duration 4h --clients 32       soak
+  scripts/loadtest.py --out run.json --baseline old.json
+
+Engine latency:
+  trigger_ms  MIDI datagram sent -> engine logs "GO cue NN" (log timestamps
+              have 1 ms resolution)
+  handle_ms   handle_midi() time for GO notes, including starting the cue
+              (from the engine's debug log)
+  start_ms    GO -> (fake) player started, the engine's spawn_ms
+The engine runs at log level debug with JSON logs so these can be read back.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+ENGINE = REPO / "src" / "player" / "midi_cues.py"
+WEBAPP = REPO / "src" / "webapp" / "app.py"
+
+RESERVOIR = 50_000          # latency samples kept per series; count/mean/max stay exact
+UPLOAD_CUES = range(90, 100)  # cue numbers the upload clients write (never GO'd)
+GO_NOTE, STOP_NOTE = 24, 27   # default NOTE_ACTIONS in midi_cues.py
+
+# endpoint name -> weight; chosen at random per request
+MIX = {
+    "state": 50,
+    "index": 12,
+    "media_index": 6,
+    "upload_cue": 5,
+    "log_level": 3,
+    "show_reload": 2,
+    "midi_out": 2,
+    "flight_dump": 1,
+}
+
+
+class Series:
+    """Count, errors, sum and max exactly; percentiles from a reservoir sample."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def add(self, value: float, ok: bool = True) -> None:
+        with self._lock:
+            self.count += 1
+            if not ok:
+                self.errors += 1
+            self.total += value
+            self.max = max(self.max, value)
+            if len(self.samples) < RESERVOIR:
+                self.samples.append(value)
+            else:
+                i = random.randrange(self.count)
+                if i < RESERVOIR:
+                    self.samples[i] = value
+
+    @classmethod
+    def merged(cls, series) -> "Series":
+        m = cls()
+        for s in series:
+            with s._lock:
+                m.samples.extend(s.samples)
+                m.count += s.count
+                m.errors += s.errors
+                m.total += s.total
+                m.max = max(m.max, s.max)
+        if len(m.samples) > RESERVOIR:
+            m.samples = random.sample(m.samples, RESERVOIR)
+        return m
+
+    def summary(self) -> dict:
+        with self._lock:
+            s = sorted(self.samples)
+            count, errors, total, peak = self.count, self.errors, self.total, self.max
+
+        def pct(p):
+            return round(s[min(len(s) - 1, int(p / 100.0 * len(s)))], 3) if s else None
+
+        return {"count": count, "errors": errors,
+                "mean": round(total / count, 3) if count else None,
+                "p50": pct(50), "p90": pct(90), "p95": pct(95), "p99": pct(99),
+                "max": round(peak, 3) if count else None}
+
+
+def parse_duration(text: str) -> float:
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)([smh]?)", text.strip())
+    if not m:
+        raise argparse.ArgumentTypeError(f"bad duration {text!r} (e.g. 90, 90s, 15m, 4h)")
+    return float(m.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600}[m.group(2)]
+
+
+def write_wav(path: Path, seconds: float, rate: int = 22050) -> None:
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\0\0" * int(rate * seconds))
+
+
+def wav_bytes(seconds: float) -> bytes:
+    with tempfile.NamedTemporaryFile(suffix=".wav") as f:
+        write_wav(Path(f.name), seconds)
+        return Path(f.name).read_bytes()
+
+
+def prepare_base(base: Path, cues: int, midi_port: int) -> None:
+    (base / "cues").mkdir(parents=True, exist_ok=True)
+    for n in range(1, cues + 1):
+        write_wav(base / "cues" / f"{n:02d}_workcue.wav", 1.0)
+    cfg = {
+        "mode": "cues",
+        "midi_in_port": "",
+        "midi_out_port": "14:0",
+        "show": "",
+        "jukebox": {"play_mode": "random", "playlist": "default.json"},
+        "midi_inputs": [{"name": "loadtest", "udp": f"127.0.0.1:{midi_port}"}],
+    }
+    (base / "config.json").write_text(json.dumps(cfg, indent=2))
+
+
+def proc_sample(pid: int) -> dict | None:
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+        fds = len(os.listdir(f"/proc/{pid}/fd"))
+    except OSError:
+        return None
+    fields = dict(line.split(":", 1) for line in status.splitlines() if ":" in line)
+    return {"rss_mb": round(int(fields["VmRSS"].split()[0]) / 1024.0, 2),
+            "threads": int(fields["Threads"]), "fds": fds}
+
+
+def growth_per_hour(points: list) -> float | None:
+    # least-squares slope of (seconds, MB), in MB/hour
+    if len(points) < 3:
+        return None
+    n = len(points)
+    mx = sum(t for t, _ in points) / n
+    my = sum(v for _, v in points) / n
+    den = sum((t - mx) ** 2 for t, _ in points)
+    if den == 0:
+        return None
+    return round(sum((t - mx) * (v - my) for t, v in points) / den * 3600.0, 3)
+
+
+# ---------- web clients ----------
+
+class WebClient(threading.Thread):
+    def __init__(self, port: int, stop: threading.Event, series: dict, upload: bytes):
+        super().__init__(daemon=True)
+        self.port = port
+        self.stop = stop
+        self.series = series
+        self.upload = upload
+        self.conn = None
+        self.names = list(MIX)
+        self.weights = [MIX[n] for n in self.names]
+
+    def request(self, method: str, path: str, body: bytes | None = None,
+                headers: dict | None = None) -> int:
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        try:
+            self.conn.request(method, path, body=body, headers=headers or {})
+            resp = self.conn.getresponse()
+            resp.read()
+            if resp.getheader("Connection", "").lower() == "close":
+                self.conn.close()
+                self.conn = None
+            return resp.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            raise
+
+    def form(self, path: str, fields: dict) -> int:
+        body = "&".join(f"{k}={v}" for k, v in fields.items()).encode()
+        return self.request("POST", path, body, {"Content-Type": "application/x-www-form-urlencoded"})
+
+    def multipart(self, path: str, fields: dict, filename: str, data: bytes) -> int:
+        boundary = f"loadtest{random.getrandbits(64):x}"
+        parts = [f"--{boundary}\r\nContent-Disposition: form-data; name=\"{k}\"\r\n\r\n{v}\r\n".encode()
+                 for k, v in fields.items()]
+        parts.append(f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; "
+                     f"filename=\"{filename}\"\r\nContent-Type: audio/wav\r\n\r\n".encode() + data + b"\r\n")
+        parts.append(f"--{boundary}--\r\n".encode())
+        return self.request("POST", path, b"".join(parts),
+                            {"Content-Type": f"multipart/form-data; boundary={boundary}"})
+
+    def one(self, name: str) -> int:
+        if name == "state":
+            return self.request("GET", "/state")
+        if name == "index":
+            return self.request("GET", "/")
+        if name == "media_index":
+            return self.request("GET", "/api/media-index")
+        if name == "upload_cue":
+            return self.multipart("/upload-cue", {"number": random.choice(UPLOAD_CUES)}, "load.wav", self.upload)
+        if name == "log_level":
+            return self.form("/log-level", {"level": "debug"})  # the latency read-back needs debug
+        if name == "show_reload":
+            return self.form("/show/select", {"show": ""})
+        if name == "midi_out":
+            return self.form("/midi-out", {"midi_out_port": "14:0"})
+        if name == "flight_dump":
+            return self.request("POST", "/flight/dump")
+        raise ValueError(name)
+
+    def run(self) -> None:
+        while not self.stop.is_set():
+            name = random.choices(self.names, self.weights)[0]
+            t0 = time.perf_counter()
+            try:
+                ok = self.one(name) < 400  # form posts answer 302
+            except (OSError, http.client.HTTPException):
+                ok = False
+            self.series[name].add((time.perf_counter() - t0) * 1000.0, ok)
+
+
+# ---------- MIDI replay and engine log read-back ----------
+
+class Engine:
+    """Sends PC -> GO -> STOP over UDP and matches GOs to the engine's JSON log."""
+
+    def __init__(self, midi_port: int, cues: int):
+        self.addr = ("127.0.0.1", midi_port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.cues = cues
+        self.sent = {}          # cue -> [send wall time, ...] waiting for their GO record
+        self.lock = threading.Lock()
+        self.gos_sent = 0
+        self.gos_seen = 0
+        self.unmatched = 0
+        self.errors = 0
+        self.trigger = Series()
+        self.handle = Series()
+        self.start = Series()
+        self.last_lines = []
+
+    def send(self, data: bytes) -> None:
+        self.sock.sendto(data, self.addr)
+
+    def replay(self, stop: threading.Event, period: float) -> None:
+        # PC n-1 selects cue n (PROGRAM_CHANGE_OFFSET = 1); the waits respect the engine's debounces
+        i = 0
+        while not stop.is_set():
+            cue = 1 + i % self.cues
+            i += 1
+            self.send(struct.pack("BB", 0xC0, cue - 1))
+            if stop.wait(max(0.25, period * 0.3)):
+                break
+            with self.lock:
+                self.sent.setdefault(cue, []).append(time.time())
+                self.gos_sent += 1
+            self.send(struct.pack("BBB", 0x90, GO_NOTE, 100))
+            if stop.wait(max(0.3, period * 0.4)):
+                break
+            self.send(struct.pack("BBB", 0x90, STOP_NOTE, 100))
+            stop.wait(max(0.3, period * 0.3))
+
+    def read_log(self, stream) -> None:
+        for line in stream:
+            line = line.decode("utf-8", "replace").strip()
+            self.last_lines = (self.last_lines + [line])[-20:]
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if rec.get("level") == "error":
+                self.errors += 1
+            msg = rec.get("msg", "")
+            if msg.startswith("GO cue") and rec.get("action") == "go":
+                with self.lock:
+                    pending = self.sent.get(rec.get("cue")) or []
+                    if pending:
+                        self.trigger.add(max(0.0, (rec["ts"] - pending.pop(0)) * 1000.0))
+                        self.gos_seen += 1
+                    else:
+                        self.unmatched += 1
+            elif rec.get("action") == "go" and "latency_ms" in rec:
+                self.handle.add(float(rec["latency_ms"]))
+            elif msg.startswith("starting playback") and "spawn_ms" in rec:
+                self.start.add(float(rec["spawn_ms"]))
+
+
+# ---------- run ----------
+
+def wait_ready(web_port: int, state: Path, procs: list, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for p in procs:
+            if p.poll() is not None:
+                raise RuntimeError(f"{p.args[1]} exited with {p.returncode} during startup")
+        try:
+            with socket.create_connection(("127.0.0.1", web_port), timeout=0.5):
+                pass
+            inputs = json.loads(state.read_text()).get("midi_inputs") or []
+            if any(i.get("connected") for i in inputs):
+                return
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("engine/web app not ready in time")
+
+
+def run(args) -> dict:
+    base = Path(args.base or tempfile.mkdtemp(prefix="showbox-loadtest-"))
+    prepare_base(base, args.cues, args.midi_port)
+    env = dict(os.environ, SHOWBOX_BASE=str(base), PYTHONUNBUFFERED="1")
+    engine_env = dict(env, SHOWBOX_PLAYER="fake", SHOWBOX_FAKE_PLAY_SEC=str(args.play_sec),
+                      SHOWBOX_LOG_FORMAT="json", SHOWBOX_LOG_LEVEL="debug")
+    web_env = dict(env, SHOWBOX_WEB_HOST="127.0.0.1", SHOWBOX_WEB_PORT=str(args.web_port),
+                   SHOWBOX_WEB_THREADS=str(args.web_threads))
+
+    engine = Engine(args.midi_port, args.cues)
+    web_log = open(base / "web.log", "wb")
+    procs = [subprocess.Popen([sys.executable, str(ENGINE)], env=engine_env, cwd=base,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT),
+             subprocess.Popen([sys.executable, str(WEBAPP)], env=web_env, cwd=base,
+                              stdout=web_log, stderr=subprocess.STDOUT)]
+    eng_proc, web_proc = procs
+    threading.Thread(target=engine.read_log, args=(eng_proc.stdout,), daemon=True).start()
+
+    stop = threading.Event()
+    series = {name: Series() for name in MIX}
+    memory = {"engine": [], "web": []}
+    timeline = []
+    try:
+        wait_ready(args.web_port, base / "state.json", procs)
+        print(f"loadtest: base {base}, {args.clients} clients, {args.duration:.0f}s", file=sys.stderr)
+        upload = wav_bytes(0.5)
+        clients = [WebClient(args.web_port, stop, series, upload) for _ in range(args.clients)]
+        for c in clients:
+            c.start()
+        threading.Thread(target=engine.replay, args=(stop, args.go_period), daemon=True).start()
+
+        t_start = time.monotonic()
+        wall_start = time.time()
+        last_count = 0
+        while True:
+            elapsed = time.monotonic() - t_start
+            row = {"t": round(elapsed, 1)}
+            for name, p in (("engine", eng_proc), ("web", web_proc)):
+                s = proc_sample(p.pid)
+                if s is None:
+                    raise RuntimeError(f"{name} process died (exit {p.poll()})")
+                memory[name].append((elapsed, s["rss_mb"]))
+                row[name] = s
+            count = sum(s.count for s in series.values())
+            row["requests"] = count - last_count
+            row["gos"] = engine.gos_seen
+            last_count = count
+            timeline.append(row)
+            if elapsed >= args.duration:
+                break
+            print(f"  {elapsed:7.0f}s  rps {row['requests'] / args.sample_sec:7.1f}  "
+                  f"gos {engine.gos_seen}  rss engine {row['engine']['rss_mb']} MB "
+                  f"web {row['web']['rss_mb']} MB", file=sys.stderr)
+            time.sleep(min(args.sample_sec, max(0.0, args.duration - elapsed)))
+        elapsed = time.monotonic() - t_start
+    finally:
+        stop.set()
+        time.sleep(1.0)  # let the last GO records reach the log
+        try:
+            final_state = json.loads((base / "state.json").read_text())
+        except (OSError, ValueError):
+            final_state = {}
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        web_log.close()
+
+    total = sum(s.count for s in series.values())
+    errors = sum(s.errors for s in series.values())
+    return {
+        "started": wall_start,
+        "duration_s": round(elapsed, 1),
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+        "host": {"cpus": os.cpu_count(), "python": sys.version.split()[0], "platform": sys.platform},
+        "web": {
+            "requests": total,
+            "errors": errors,
+            "throughput_rps": round(total / elapsed, 1) if elapsed else None,
+            "latency_ms": Series.merged(series.values()).summary(),
+            "endpoints": {name: s.summary() for name, s in series.items()},
+        },
+        "engine": {
+            "gos_sent": engine.gos_sent,
+            "gos_seen": engine.gos_seen,
+            "gos_unmatched": engine.unmatched,
+            "log_errors": engine.errors,
+            "trigger_ms": engine.trigger.summary(),
+            "handle_ms": engine.handle.summary(),
+            "start_ms": engine.start.summary(),
+            "midi_inputs": final_state.get("midi_inputs"),
+            "log": final_state.get("log"),
+        },
+        "memory": {name: {"rss_start_mb": pts[0][1] if pts else None,
+                          "rss_end_mb": pts[-1][1] if pts else None,
+                          "rss_max_mb": max(v for _, v in pts) if pts else None,
+                          "growth_mb_per_hour": growth_per_hour(pts[len(pts) // 10:])}  # skip warm-up
+                   for name, pts in memory.items()},
+        "timeline": timeline,
+        "engine_log_tail": engine.last_lines if engine.gos_seen == 0 else [],
+    }
+
+
+def print_report(r: dict, baseline: dict | None) -> None:
+    w, e = r["web"], r["engine"]
+
+    def cmp(value, path):
+        if baseline is None or value is None:
+            return ""
+        old = baseline
+        for k in path:
+            old = (old or {}).get(k)
+        if not old:
+            return ""
+        return f" ({(value - old) / old * 100.0:+.0f}% vs baseline {old})"
+
+    print(f"duration {r['duration_s']}s, {r['params']['clients']} clients")
+    print(f"web: {w['requests']} requests, {w['errors']} errors, "
+          f"{w['throughput_rps']} req/s{cmp(w['throughput_rps'], ('web', 'throughput_rps'))}")
+    print(f"  {'endpoint':<12} {'count':>8} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  ms")
+    for name, s in w["endpoints"].items():
+        print(f"  {name:<12} {s['count']:>8} {s['errors']:>5} {s['p50'] or 0:>8.1f} "
+              f"{s['p95'] or 0:>8.1f} {s['p99'] or 0:>8.1f} {s['max'] or 0:>8.1f}")
+    print(f"engine: {e['gos_seen']}/{e['gos_sent']} GOs seen, {e['log_errors']} error log lines")
+    for key in ("trigger_ms", "handle_ms", "start_ms"):
+        s = e[key]
+        print(f"  {key:<11} p50 {s['p50']}  p95 {s['p95']}{cmp(s['p95'], ('engine', key, 'p95'))}  "
+              f"p99 {s['p99']}  max {s['max']}")
+    for name, m in r["memory"].items():
+        print(f"memory {name}: {m['rss_start_mb']} -> {m['rss_end_mb']} MB (max {m['rss_max_mb']}), "
+              f"growth {m['growth_mb_per_hour']} MB/h")
+    if r["engine_log_tail"]:
+        print("no GO reached the engine; last engine output:")
+        for line in r["engine_log_tail"]:
+            print(f"  {line}")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="web UI + engine load/soak test (fake player, UDP MIDI)")
+    ap.add_argument("--duration", type=parse_duration, default=60.0, help="e.g. 90s, 15m, 4h (default 60s)")
+    ap.add_argument("--clients", type=int, default=16, help="concurrent web clients")
+    ap.add_argument("--go-period", type=float, default=1.0, help="seconds per PC/GO/STOP cycle")
+    ap.add_argument("--cues", type=int, default=8, help="cue files to rotate through")
+    ap.add_argument("--play-sec", type=float, default=0.5, help="fake player length per cue")
+    ap.add_argument("--web-port", type=int, default=18080)
+    ap.add_argument("--web-threads", type=int, default=8)
+    ap.add_argument("--midi-port", type=int, default=15700, help="UDP port of the simulated MIDI input")
+    ap.add_argument("--sample-sec", type=float, default=10.0, help="memory/timeline sample interval")
+    ap.add_argument("--base", help="data directory (default: a new temp dir)")
+    ap.add_argument("--out", help="JSON result file (default loadtest-<time>.json)")
+    ap.add_argument("--baseline", help="earlier result JSON to compare against")
+    args = ap.parse_args()
+
+    result = run(args)
+    out = Path(args.out or f"loadtest-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    out.write_text(json.dumps(result, indent=2))
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    print_report(result, baseline)
+    print(f"results: {out}")
+    e = result["engine"]
+    return 0 if e["gos_seen"] and e["gos_seen"] >= e["gos_sent"] - 1 and not result["web"]["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
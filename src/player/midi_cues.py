@@ -7,40 +7,79 @@ Fixes:
 - Program Change uses +1 offset (OnSong PC 0 => cue 1)
 - Debounce for program changes + note actions
 - Optional MIDI debug logging (set MIDI_DEBUG=1)
+- Logging is queued and written by a background thread (text or JSON lines)
+- Optional Chrome/Perfetto trace of the hot path (set SHOWBOX_TRACE=1 or a file path)
 
 Plays:
 - wav/mp3: mpv (preferred) or aplay/mpg123 fallback
+- mp3: decoded once into a PCM cache (LRU, byte limit) for instant repeat plays
 - mid/midi: aplaymidi -> ALSA port from config.json
+- named outputs (config "outputs"): one persistent mpv / MIDI port per output,
+  cues and jukebox routed per output; SHOWBOX_PLAYER=fake plays nothing (tests)
+
+Realtime profile (SHOWBOX_REALTIME=1):
+- MIDI reader, playback watchers and chain scheduler/worker run SCHED_FIFO on a reserved core
+- memory locked with mlockall; players get a lower FIFO priority, helpers are demoted
 
 Control:
 - Web control via /home/fc/showbox/control.json (one-shot command)
 - State/Now Playing via /home/fc/showbox/state.json
+- Flight recorder dumps in /home/fc/showbox/flight (crash, SIGUSR1, flight_dump command)
+
+Pre-show check:
+- midi_cues.py --check [--json] [--no-timing]: every cue resolved, decoded and
+  start-timed (cold/warm) on its player, outputs opened; nothing is heard
 """
 
+import argparse
+import atexit
+import ctypes
+import functools
+import hashlib
+import itertools
 import json
 import os
+import queue
 import random
+import re
+import resource
+import selectors
 import shutil
+import signal
+import socket
 import subprocess
+import sys
 import threading
 import time
+import wave
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import NamedTuple
 import mido
 
 # ---- Paths ----
-BASE = Path("/home/fc/showbox")
+BASE = Path(os.environ.get("SHOWBOX_BASE", "/home/fc/showbox"))  # override to run a second engine on one host
 CUES_DIR = BASE / "cues"
 JUKE_SONGS = BASE / "jukebox" / "songs"
 JUKE_LISTS = BASE / "jukebox" / "playlists"
 CFG_PATH = BASE / "config.json"
 STATE_PATH = BASE / "state.json"
 CONTROL_PATH = BASE / "control.json"
+PCM_CACHE_DIR = BASE / "cache" / "pcm"
+SHOWS_DIR = BASE / "shows"
+FLIGHT_DIR = BASE / "flight"
+RUN_DIR = BASE / "run"  # mpv IPC sockets
 
 # ---- Supported media ----
 AUDIO_EXTS = {".wav", ".mp3"}
 MIDI_EXTS = {".mid", ".midi"}
 ALL_EXTS = AUDIO_EXTS | MIDI_EXTS
 
+# compressed formats worth decoding once into the PCM cache
+PCM_DECODE_EXTS = {".mp3"}
+PCM_CACHE_DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
 # ---- MIDI mapping (your proven note numbers) ----
 NOTE_ACTIONS = {
     24: "go",    # C1
@@ -49,9 +88,49 @@ NOTE_ACTIONS = {
     27: "stop",  # D#1
 }
 
+NOTE_ACTION_NAMES = {"go", "back", "fire", "stop"}
+
 # IMPORTANT: OnSong Program Change is 0-based. We want cue numbers 1-based.
 PROGRAM_CHANGE_OFFSET = 1
 
+# ---- Shows ----
+# A show file (shows/<name>.json) maps cue numbers / Program Changes to files with
+# per-cue options; it is validated and compiled into flat lookup tables on load.
+MAX_CUE_NUMBER = 999
+CUE_FILE_RE = re.compile(r"^(\d+)_workcue(\.(wav|mp3|mid|midi))$", re.IGNORECASE)
+GAIN_DB_RANGE = (-60.0, 12.0)
+CHAIN_ACTIONS = {"go", "select", "stop"}
+CHAIN_TRIGGERS = {"start", "end"}
+
+# ---- Outputs / player backend ----
+PLAYER_BACKEND = os.environ.get("SHOWBOX_PLAYER", "auto").strip().lower()  # auto | fake
+OUTPUT_OPEN_TIMEOUT = 3.0   # mpv start until its IPC socket accepts
+OUTPUT_LOAD_TIMEOUT = 2.0   # loadfile until "file-loaded"
+FAKE_PLAY_SEC = float(os.environ.get("SHOWBOX_FAKE_PLAY_SEC", "0") or 0)  # 0 = the file's own length
+FAKE_DEFAULT_SEC = 2.0      # fake length when the file's length is unknown (mp3)
+
+# ---- Cue chain scheduler ----
+SCHED_TICK_SEC = 0.001      # timer wheel slot width
+SCHED_SLOTS = 1024          # one revolution ~1 s; longer delays wait for later laps
+SCHED_EARLY_SEC = 0.0002    # timers this close to due fire on the current wakeup
+SCHED_JITTER_SAMPLES = 256
+
+# ---- Logging ----
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+LOG_QUEUE_MAX = 4096     # records waiting for the writer; beyond this they are dropped
+LOG_BATCH = 256          # records written per flush
+LOG_RATE_PER_SEC = 2.0   # sustained rate allowed per rate-limit key
+LOG_RATE_BURST = 10
+
+# ---- Tracing ----
+TRACE_FILE_DEFAULT = BASE / "trace" / "showbox-trace.json"
+TRACE_FLUSH_SEC = 0.5
+TRACE_MAX_PENDING = 200_000  # events buffered between flushes; oldest dropped beyond this
+
+# ---- Flight recorder ----
+FLIGHT_SLOTS = 4096  # events kept; older ones are overwritten
+FLIGHT_KEEP = 20     # dump files kept in FLIGHT_DIR
+
 # ---- Debounce ----
 PC_DEBOUNCE_SEC = 0.20
 NOTE_DEBOUNCE_SEC = 0.25
@@ -60,73 +139,1444 @@ _last_go_time = 0.0
 
 # ---- MIDI port selection ----
 PORT_NAME_HINT = "Midi Through"  # fallback search
-# Better: set "midi_in_port" in config.json to exact mido port string
+# Better: set "midi_in_port" in config.json to exact mido port string,
+# or list several inputs under "midi_inputs" (each with its own note mapping)
+MIDI_REOPEN_SEC = 5.0   # retry inputs that are missing (unplugged foot controller) this often
+MIDI_UDP_MAX = 1024     # datagram size for UDP inputs (raw MIDI bytes, for simulation)
+
+# ---- Hot standby ----
+MIRROR_ROLES = {"off", "primary", "backup"}
+MIRROR_PORTS = {"primary": 5510, "backup": 5511}  # default listen ports; distinct so both fit on one host
+MIRROR_HEARTBEAT_SEC = 0.1
+MIRROR_TAKEOVER_SEC = 0.5   # backup goes active after this long without a heartbeat
+MIRROR_DGRAM_MAX = 4096
+MIRROR_UNACKED_MAX = 256    # send times kept for lag; older ones are forgotten
+MIRROR_LAG_SAMPLES = 256
+
+# ---- Show check (--check) ----
+CHECK_WORKERS = min(8, os.cpu_count() or 2)  # parallel file/decode checks
+CHECK_PROC_TIMEOUT = 60.0    # per decoder / player run
+CHECK_SLOW_START_MS = 150.0  # warm start slower than this is a warning
+
+
+class ChainAction(NamedTuple):
+    at: str         # "start" | "end" of the cue that owns it
+    delay: float    # seconds after the trigger
+    do: str         # "go" | "select" | "stop"
+    cue: int | None
+
+
+class ShowCue(NamedTuple):
+    cue: int
+    path: Path
+    gain_db: float
+    output: tuple   # output names (or raw device/port strings); () = default player
+    wait: float     # pre-wait between GO and the cue actually starting
+    actions: tuple  # ChainAction, ...
+
+
+class CompiledShow(NamedTuple):
+    name: str
+    cues: list      # index = cue number -> ShowCue | None
+    pc_map: list    # index = program 0..127 -> cue number | None
+    prev_cue: list  # index = cue number -> previous defined cue (for BACK) | None
+    legacy: bool    # built from N_workcue files; falls back to a disk lookup on miss
+
+
+class CueScheduler:
+    """Hashed timer wheel on the monotonic clock for cue chain actions.
+
+    Insert and cancel are O(1). The next deadline comes from walking the slots
+    from the current tick (at most one revolution), not from the whole timer set.
+    The thread blocks until that deadline and never spins, so the reserved
+    core stays free. Measured lateness is kept for the state report.
+    """
+
+    def __init__(self):
+        self._slots = [dict() for _ in range(SCHED_SLOTS)]
+        self._where = {}  # timer id -> slot index
+        self._cond = threading.Condition()
+        self._next_id = 1
+        self._cursor = self._tick(time.monotonic())  # first tick not yet fully fired
+        self._jitter = deque(maxlen=SCHED_JITTER_SAMPLES)
+        self._fired = 0
+        self._cancelled = 0
+        threading.Thread(target=self._run, name="cue-scheduler", daemon=True).start()
+
+    def schedule(self, delay: float, fn, *args) -> int:
+        deadline = time.monotonic() + max(0.0, delay)
+        with self._cond:
+            tid = self._next_id
+            self._next_id += 1
+            slot = self._tick(deadline) % SCHED_SLOTS
+            self._slots[slot][tid] = (deadline, fn, args)
+            self._where[tid] = slot
+            self._cond.notify()
+        return tid
+
+    def cancel(self, tid: int) -> bool:
+        with self._cond:
+            slot = self._where.pop(tid, None)
+            if slot is None:
+                return False
+            del self._slots[slot][tid]
+            self._cancelled += 1
+            return True
+
+    def cancel_all(self) -> int:
+        with self._cond:
+            n = len(self._where)
+            for slot in set(self._where.values()):
+                self._slots[slot].clear()
+            self._where.clear()
+            self._cancelled += n
+            return n
+
+    def stats(self) -> dict:
+        with self._cond:
+            js = sorted(self._jitter)
+            pending, fired, cancelled = len(self._where), self._fired, self._cancelled
+        return {
+            "pending": pending,
+            "fired": fired,
+            "cancelled": cancelled,
+            "jitter_ms": {
+                "mean": round(sum(js) / len(js), 3) if js else None,
+                "p99": round(js[min(len(js) - 1, int(len(js) * 0.99))], 3) if js else None,
+                "max": round(js[-1], 3) if js else None,
+            },
+        }
+
+    @staticmethod
+    def _tick(t: float) -> int:
+        return int(t / SCHED_TICK_SEC)
+
+    def _next_deadline(self) -> float:
+        # Caller holds the lock. Slots hold timers of later revolutions too; only the
+        # ones due in the lap being walked count. Nothing within one lap: look again
+        # one lap on (long delays cost one wakeup per revolution).
+        for tick in range(self._cursor, self._cursor + SCHED_SLOTS):
+            bucket = self._slots[tick % SCHED_SLOTS]
+            if bucket:
+                due = [d for d, _, _ in bucket.values() if self._tick(d) <= tick]
+                if due:
+                    return min(due)
+        return (self._cursor + SCHED_SLOTS) * SCHED_TICK_SEC
+
+    def _due(self, now: float) -> list:
+        # Caller holds the lock. Every pending deadline hashes to its slot, so walking the
+        # slots from the cursor up to now (+ SCHED_EARLY_SEC) finds everything that is due.
+        due = []
+        limit = now + SCHED_EARLY_SEC
+        end = self._tick(limit)
+        for tick in range(max(self._cursor, end - SCHED_SLOTS + 1), end + 1):
+            bucket = self._slots[tick % SCHED_SLOTS]
+            if not bucket:
+                continue
+            for tid, (deadline, fn, args) in list(bucket.items()):
+                if deadline <= limit:
+                    del bucket[tid]
+                    del self._where[tid]
+                    due.append((deadline, fn, args))
+        self._cursor = self._tick(now)  # a timer scheduled from now on cannot land behind it
+        return sorted(due, key=lambda d: d[0])
+
+    def _run(self) -> None:
+        rt_thread(True)
+        while True:
+            with self._cond:
+                while True:
+                    if not self._where:
+                        self._cursor = self._tick(time.monotonic())  # idle: nothing behind us
+                        self._cond.wait()
+                        continue
+                    remaining = self._next_deadline() - time.monotonic()
+                    if remaining <= SCHED_EARLY_SEC:
+                        break
+                    self._cond.wait(remaining)  # schedule/cancel wake us to recompute
+                due = self._due(time.monotonic())
+            for deadline, fn, args in due:
+                late_ms = max(0.0, time.monotonic() - deadline) * 1000.0
+                with self._cond:
+                    self._fired += 1
+                    self._jitter.append(late_ms)
+                try:
+                    fn(*args)
+                except Exception as e:
+                    flight("error", f"scheduler: {e}")
+                    log(f"scheduler: action error: {e}", level="error", key="scheduler_error")
+
+
+class MidiInput:
+    """One configured MIDI input with its own note mapping, debounce state and counters."""
+
+    def __init__(self, name: str, port: str, notes: dict, programs: bool = True, udp: str = ""):
+        self.name = name
+        self.port = port          # mido port name or substring; "" = auto (Midi Through)
+        self.udp = udp            # "host:port" instead of a mido port
+        self.notes = notes        # note number -> action
+        self.programs = programs  # accept Program Changes from this input
+        self.opened = ""          # resolved port name / address while open
+        self.handle = None        # open mido port or socket
+        self.warned = False       # "not found" already logged since the last successful open
+        self.last_pc_val = None
+        self.last_pc_time = 0.0
+        self.last_action_time = {}
+        self.stats = {"received": 0, "actions": 0, "debounced": 0, "ignored": 0, "errors": 0,
+                      "last_rx": None, "queue_ms_max": 0.0}
+
+    def status(self) -> dict:
+        return dict(self.stats, name=self.name, port=self.opened or self.port or self.udp,
+                    connected=self.handle is not None)
+
+
+class MidiMux:
+    """Merges every input into the MIDI thread through one selector.
+
+    mido ports deliver through callbacks on the backend's own thread; the callback
+    queues the message and writes a byte to a self-pipe. UDP inputs are sockets on
+    the same selector. No reader thread per port.
+    """
+
+    def __init__(self):
+        self._sel = selectors.DefaultSelector()
+        self._rfd, self._wfd = os.pipe()
+        os.set_blocking(self._rfd, False)
+        os.set_blocking(self._wfd, False)
+        self._sel.register(self._rfd, selectors.EVENT_READ, None)
+        self._pending = deque()  # (input, message, monotonic arrival)
+        self._parsers = {}
+        self._open = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def open(self, inp: MidiInput, ports: list[str]) -> bool:
+        try:
+            if inp.udp:
+                host, _, port = inp.udp.rpartition(":")
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                try:
+                    sock.bind((host or "127.0.0.1", int(port)))  # exclusive: a second listener is an error
+                except (OSError, ValueError) as e:
+                    sock.close()
+                    log(f"midi input {inp.name}: cannot listen on udp {inp.udp}: {e}", level="error",
+                        key=f"midi_open_{inp.name}")
+                    return False
+                sock.setblocking(False)
+                self._sel.register(sock, selectors.EVENT_READ, inp)
+                self._parsers[inp] = mido.Parser()
+                inp.handle, inp.opened = sock, f"udp:{inp.udp}"
+            else:
+                name = match_input_port(inp.port, ports)
+                if not name:
+                    if not inp.warned:
+                        log(f"midi input {inp.name}: port {inp.port or '(auto)'} not found; "
+                            f"retrying every {MIDI_REOPEN_SEC:.0f}s", level="warning")
+                        inp.warned = True
+                    return False
+                inp.handle = mido.open_input(name, callback=lambda msg, i=inp: self._push(i, msg))
+                inp.opened = name
+        except (OSError, ValueError, ImportError) as e:
+            log(f"midi input {inp.name}: cannot open {inp.port or inp.udp}: {e}", level="warning",
+                key=f"midi_open_{inp.name}")
+            return False
+        self._open.append(inp)
+        inp.warned = False
+        log(f"listening on MIDI input {inp.name}: {inp.opened}")
+        return True
+
+    def refresh(self, inputs: list[MidiInput]) -> None:
+        # called when idle: drop ports that vanished (unplugged) and retry missing ones
+        ports = midi_input_names()
+        for inp in list(self._open):
+            if not inp.udp and inp.opened not in ports:
+                log(f"midi input {inp.name}: {inp.opened} disconnected", level="warning")
+                self._close(inp)
+        for inp in inputs:
+            if inp.handle is None:
+                self.open(inp, ports)
+
+    def _close(self, inp: MidiInput) -> None:
+        if inp.udp:
+            self._sel.unregister(inp.handle)
+            self._parsers.pop(inp, None)
+        try:
+            inp.handle.close()
+        except Exception:
+            pass
+        inp.handle = None
+        inp.opened = ""
+        self._open.remove(inp)
+
+    def _push(self, inp: MidiInput, msg) -> None:
+        # backend callback thread: queue and wake the selector, never block
+        self._pending.append((inp, msg, time.monotonic()))
+        try:
+            os.write(self._wfd, b"\0")
+        except BlockingIOError:
+            pass  # pipe full: the reader is awake already
+
+    def poll(self, timeout: float) -> list:
+        for key, _ in self._sel.select(timeout):
+            if key.data is None:
+                try:
+                    while os.read(self._rfd, 4096):
+                        pass
+                except BlockingIOError:
+                    pass
+                continue
+            inp = key.data
+            try:
+                data = key.fileobj.recv(MIDI_UDP_MAX)
+            except BlockingIOError:
+                continue
+            parser = self._parsers[inp]
+            parser.feed(data)
+            now = time.monotonic()
+            for msg in parser:
+                self._pending.append((inp, msg, now))
+        batch = []
+        while self._pending:
+            batch.append(self._pending.popleft())
+        return batch
+
+    def close(self) -> None:
+        for inp in list(self._open):
+            self._close(inp)
+        self._sel.close()
+        os.close(self._rfd)
+        os.close(self._wfd)
+
+
+class Mirror:
+    """Hot-standby link between a primary and a backup engine over UDP.
+
+    The primary sends each cue action (select, go, stop, show) as a sequence-numbered
+    JSON datagram when it happens, and a heartbeat with a state snapshot every
+    heartbeat_sec. The backup applies actions without playing anything, so it stays
+    armed on the same cue, and acks them; the primary turns acks into replication
+    lag. A lost datagram shows up as a sequence gap and the next snapshot repairs it.
+    Without heartbeats for takeover_sec the backup goes active and handles its own MIDI.
+    """
+
+    def __init__(self, role: str, listen: tuple, peer: tuple | None,
+                 heartbeat: float, takeover: float, auto: bool):
+        self.role = role
+        self.active = role == "primary"
+        self.listen = listen
+        self.peer = peer              # primary: where the backup listens; backup: learned from heartbeats
+        self.heartbeat = heartbeat
+        self.takeover = takeover
+        self.auto = auto              # backup promotes itself when heartbeats stop
+        self.epoch = f"{os.getpid()}-{time.time_ns()}"  # one primary run; seq restarts with it
+        self.seq = 0
+        self._lock = threading.Lock()
+        self._sent = {}               # seq -> monotonic send time, until acked
+        self._lag = deque(maxlen=MIRROR_LAG_SAMPLES)
+        self._rtt_ms = None
+        self._peer_epoch = None
+        self._last_seq = 0
+        self._last_rx = None          # monotonic time of the last datagram from the peer
+        self._show_failed = None      # show name the backup could not load; not retried
+        self.last_go = None           # backup: the cue the primary last started
+        self.stats = {"sent": 0, "received": 0, "acked": 0, "applied": 0, "duplicates": 0,
+                      "gaps": 0, "resyncs": 0, "errors": 0, "takeovers": 0}
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self.sock.bind(listen)  # no SO_REUSEADDR: a second engine on the port is an error
+        except OSError:
+            self.sock.close()
+            raise
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mirror", daemon=True)
+        self._thread.start()
+
+    def send(self, kind: str, **data) -> None:
+        # primary only; called on the MIDI/scheduler threads, a single non-blocking sendto
+        if self.role != "primary" or self.peer is None:
+            return
+        with self._lock:  # held over sendto so a heartbeat never carries a seq not yet sent
+            self.seq += 1
+            now = time.monotonic()
+            self._sent[self.seq] = now
+            while len(self._sent) > MIRROR_UNACKED_MAX:
+                del self._sent[next(iter(self._sent))]
+            self._sendto({"type": "act", "kind": kind, "seq": self.seq, "t": now, **data}, self.peer)
+
+    def close(self) -> None:
+        self._closed.set()
+        self._thread.join(timeout=max(self.heartbeat, 0.1) + 1.0)
+
+    def promote(self, reason: str) -> None:
+        if self.active:
+            return
+        self.active = True
+        self.stats["takeovers"] += 1
+        flight("mirror_takeover", reason)
+        log(f"standby: taking over ({reason}), cue {current_cue}", level="warning",
+            cue=current_cue, action="takeover")
+        write_state(False, None)
+
+    def standby(self) -> None:
+        if self.role != "backup" or not self.active:
+            return
+        self.active = False
+        self._last_rx = None  # wait for the primary again before auto takeover re-arms
+        flight("mirror_standby")
+        log("standby: back to standby, following the primary", level="warning", action="standby")
+        write_state(False, None)
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        lag = list(self._lag)
+        return dict(self.stats, role=self.role, active=self.active,
+                    peer=f"{self.peer[0]}:{self.peer[1]}" if self.peer else None,
+                    seq=self.seq if self.role == "primary" else self._last_seq,
+                    unacked=len(self._sent), rtt_ms=self._rtt_ms,
+                    lag_ms=lag[-1] if lag else None, lag_ms_max=max(lag) if lag else None,
+                    peer_age_ms=round((now - self._last_rx) * 1000.0, 1) if self._last_rx else None,
+                    last_go=self.last_go)
+
+    def _sendto(self, msg: dict, addr: tuple) -> None:
+        msg["v"] = 1
+        msg["epoch"] = self.epoch if self.role == "primary" else self._peer_epoch
+        try:
+            self.sock.sendto(json.dumps(msg, separators=(",", ":")).encode(), addr)
+            self.stats["sent"] += 1
+        except OSError as e:
+            # backup down: ICMP unreachable surfaces here or on the next recv
+            self.stats["errors"] += 1
+            log(f"standby: send to {addr[0]}:{addr[1]} failed: {e}", level="warning", key="mirror_send")
+
+    def _snapshot(self) -> dict:
+        # runs every heartbeat, possibly SCHED_FIFO: no config file I/O here
+        return {"cue": current_cue, "show": _show.name, "mode": _cfg_mode}
+
+    def _run(self) -> None:
+        rt_thread(True)  # heartbeats and takeover timing
+        next_hb = 0.0
+        while not self._closed.is_set():
+            now = time.monotonic()
+            if self.role == "primary":
+                if now >= next_hb:
+                    if self.peer is not None:
+                        snap = self._snapshot()
+                        with self._lock:
+                            self._sendto({"type": "hb", "seq": self.seq, "t": now, "snap": snap},
+                                         self.peer)
+                    next_hb = now + self.heartbeat
+                self.sock.settimeout(max(0.001, next_hb - now))
+            else:
+                self.sock.settimeout(self.heartbeat / 2)
+            try:
+                data, addr = self.sock.recvfrom(MIRROR_DGRAM_MAX)
+            except socket.timeout:
+                data = None
+            except OSError:
+                self.stats["errors"] += 1
+                data = None
+            if data:
+                try:
+                    msg = json.loads(data)
+                    if msg.get("v") == 1:
+                        self.stats["received"] += 1
+                        self._receive(msg, addr)
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    log(f"standby: bad datagram from {addr[0]}:{addr[1]}: {e}", level="warning",
+                        key="mirror_rx")
+            if (self.role == "backup" and not self.active and self.auto and self._last_rx is not None
+                    and time.monotonic() - self._last_rx > self.takeover):
+                self.promote(f"no heartbeat for {self.takeover * 1000:.0f} ms")
+        self.sock.close()
+
+    def _receive(self, msg: dict, addr: tuple) -> None:
+        now = time.monotonic()
+        kind = msg.get("type")
+        if self.role == "primary":
+            if kind != "ack" or msg.get("epoch") != self.epoch:
+                return
+            self._last_rx = now
+            rtt = round((now - float(msg["t"])) * 1000.0, 3)
+            if msg.get("hb"):
+                self._rtt_ms = rtt
+                return
+            with self._lock:
+                sent = self._sent.pop(int(msg["seq"]), None)
+            if sent is not None:
+                self.stats["acked"] += 1
+                self._lag.append(rtt)
+            return
+
+        if kind not in ("act", "hb"):
+            return
+        if msg.get("epoch") != self._peer_epoch:
+            self._peer_epoch = msg.get("epoch")
+            self._last_seq = 0
+            log(f"standby: following primary {addr[0]}:{addr[1]} (epoch {self._peer_epoch})")
+        self._last_rx = now
+        self.peer = addr
+        seq = int(msg["seq"])
+        if self.active:
+            log("standby: primary is alive but this engine is active; "
+                "send mirror_standby to hand back", level="warning", key="mirror_split")
+            return
+        if kind == "hb":
+            if seq > self._last_seq:
+                self.stats["gaps"] += seq - self._last_seq
+                self._last_seq = seq
+            self._sendto({"type": "ack", "hb": True, "seq": seq, "t": msg["t"]}, addr)
+            self._resync(msg.get("snap") or {})
+            return
+
+        if seq <= self._last_seq:
+            self.stats["duplicates"] += 1
+            return
+        self.stats["gaps"] += seq - self._last_seq - 1
+        self._last_seq = seq
+        changed = self._apply(msg)
+        self.stats["applied"] += 1
+        self._sendto({"type": "ack", "seq": seq, "t": msg["t"]}, addr)
+        if changed:
+            write_state(False, None)
+
+    def _apply(self, msg: dict) -> bool:
+        # backup: mirror the primary's action without playing anything
+        global current_cue
+        kind = msg.get("kind")
+        flight("mirror", (kind, msg.get("cue")))
+        if kind == "select":
+            current_cue = msg.get("cue")
+        elif kind == "go":
+            current_cue = msg.get("cue")
+            self.last_go = current_cue
+        elif kind == "stop":
+            self.last_go = None
+        elif kind == "show":
+            return self._load_show(msg.get("name") or "")
+        else:
+            return False
+        return True
+
+    def _resync(self, snap: dict) -> None:
+        global current_cue
+        changed = False
+        if "show" in snap and snap["show"] != _show.name:
+            changed = self._load_show(snap["show"] or "")
+        if "cue" in snap and snap["cue"] != current_cue:
+            current_cue = snap["cue"]
+            changed = True
+        mode = snap.get("mode")
+        if mode in ("cues", "jukebox"):
+            cfg = load_cfg()
+            if cfg.get("mode") != mode:
+                cfg["mode"] = mode
+                save_cfg(cfg)
+                changed = True
+        if changed:
+            self.stats["resyncs"] += 1
+            flight("mirror_resync", snap.get("cue"))
+            write_state(False, None)
+
+    def _load_show(self, name: str) -> bool:
+        if name == self._show_failed:
+            return False
+        if activate_show(name):
+            self._show_failed = None
+            return True
+        self._show_failed = name
+        return False
+
+
+class ProcPlayback:
+    """One player process per cue (mpv/aplay/mpg123/aplaymidi), the original model."""
+
+    def __init__(self, cmd: list[str]):
+        self.cmd = cmd
+        self.label = " ".join(cmd)
+        self.pid = None
+        self.proc = None
+
+    def start(self) -> None:
+        self.proc = subprocess.Popen(self.cmd, preexec_fn=_player_preexec if RT_ENABLED else None)
+        self.pid = self.proc.pid
+
+    def wait(self) -> int:
+        return self.proc.wait()
+
+    def stop(self) -> None:
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+class OutputPlayback:
+    """A file on one or more persistent outputs, started together.
+
+    Every output prerolls paused and is armed (callback set, release message built),
+    then all are released back to back: one send per output and no reply read in
+    between, so outputs start within the IPC round trip of each other.
+    """
+
+    pid = None
+    sent = ()
+
+    def __init__(self, outputs: list, path: Path, gain_db: float):
+        self.outputs = outputs
+        self.path = path
+        self.gain_db = gain_db
+        self.label = f"{path.name} -> {'+'.join(o.name for o in outputs)}"
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._left = len(outputs)
+        self._code = 0
+
+    def start(self) -> None:
+        global _output_start
+        for o in self.outputs:
+            o.load(self.path, self.gain_db)
+        for o in self.outputs:
+            o.arm(self._ended)
+        self.sent = [o.release() for o in self.outputs]
+        _output_start = self
+
+    def timing(self) -> dict:
+        # send skew: first to last release; start skew: first to last output confirming
+        # it runs (mpv's reply to the unpause; MIDI and fake start in-process on release)
+        started = [o.started_at for o in self.outputs]
+        return {
+            "outputs": [o.name for o in self.outputs],
+            "send_skew_ms": round((max(self.sent) - min(self.sent)) * 1000.0, 3) if self.sent else None,
+            "start_skew_ms": (round((max(started) - min(started)) * 1000.0, 3)
+                              if self.sent and None not in started else None),
+        }
+
+    def _ended(self, code: int) -> None:
+        with self._lock:
+            self._left -= 1
+            self._code = max(self._code, code)
+            if self._left <= 0:
+                self._done.set()
+
+    def wait(self) -> int:
+        self._done.wait()
+        return self._code
+
+    def stop(self) -> None:
+        for o in self.outputs:
+            o.stop()
+        self._done.set()
+
+
+class AudioOutput:
+    """Persistent `mpv --idle` on one audio device, driven over its JSON IPC socket."""
+
+    kind = "audio"
+
+    def __init__(self, name: str, device: str):
+        self.name = name
+        self.device = device
+        self.spec = ("audio", device)
+        self.plays = 0
+        self.proc = None
+        self.sock = None
+        self._sock_path = RUN_DIR / f"mpv-{os.getpid()}-{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}.sock"
+        self._send_lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._load_error = False
+        self._on_end = None
+        self._release = b""
+        self.started_at = None  # perf_counter() when mpv confirmed the last unpause
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None and self.sock is not None
+
+    def open(self) -> None:
+        if self.alive():
+            return
+        self.close()
+        if not MPV:
+            raise RuntimeError("mpv not found (install: sudo apt-get install -y mpv)")
+        RUN_DIR.mkdir(parents=True, exist_ok=True)
+        self._sock_path.unlink(missing_ok=True)
+        cmd = [MPV, "--idle=yes", "--no-video", "--no-terminal", "--really-quiet",
+               f"--input-ipc-server={self._sock_path}"]
+        if self.device:
+            cmd.append(f"--audio-device={self.device}")
+        self.proc = subprocess.Popen(cmd, preexec_fn=_player_preexec if RT_ENABLED else None)
+        deadline = time.monotonic() + OUTPUT_OPEN_TIMEOUT
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(str(self._sock_path))
+                break
+            except OSError:
+                sock.close()
+                if self.proc.poll() is not None or time.monotonic() > deadline:
+                    self.close()
+                    raise RuntimeError(f"output {self.name}: mpv did not start on {self.device or 'default'}")
+                time.sleep(0.02)
+        self.sock = sock
+        threading.Thread(target=self._reader, args=(sock,), name=f"mpv-{self.name}", daemon=True).start()
+        log(f"output {self.name}: mpv pid={self.proc.pid} on {self.device or 'default device'}")
+
+    def _send(self, *command) -> None:
+        with self._send_lock:
+            self.sock.sendall((json.dumps({"command": list(command)}) + "\n").encode())
+
+    def _reader(self, sock) -> None:
+        rt_thread(True)
+        try:
+            for line in sock.makefile("rb"):
+                try:
+                    ev = json.loads(line)
+                except ValueError:
+                    continue
+                if self.plays and ev.get("request_id") == self.plays and ev.get("error") == "success":
+                    self.started_at = time.perf_counter()  # reply to the unpause
+                    continue
+                event = ev.get("event")
+                if event == "file-loaded":
+                    self._loaded.set()
+                elif event == "end-file" and ev.get("reason") in ("eof", "error"):
+                    # "stop" ends (replace/stop) are ours; eof belongs to the current file
+                    if ev.get("reason") == "error" and not self._loaded.is_set():
+                        self._load_error = True
+                        self._loaded.set()
+                    cb, self._on_end = self._on_end, None
+                    if cb:
+                        cb(0 if ev.get("reason") == "eof" else 1)
+        except OSError:
+            pass
+        cb, self._on_end = self._on_end, None  # mpv went away mid-play
+        if cb:
+            cb(1)
+
+    def load(self, path: Path, gain_db: float) -> None:
+        self.open()
+        self._on_end = None
+        self._loaded.clear()
+        self._load_error = False
+        self._send("set_property", "pause", True)
+        self._send("set_property", "af", f"lavfi=[volume={gain_db}dB]" if gain_db else "")
+        self._send("loadfile", str(path), "replace")
+        if not self._loaded.wait(OUTPUT_LOAD_TIMEOUT) or self._load_error:
+            raise RuntimeError(f"output {self.name}: could not load {path.name}")
+
+    def arm(self, on_end) -> None:
+        self._on_end = on_end
+        self.plays += 1
+        self.started_at = None
+        self._release = (json.dumps({"command": ["set_property", "pause", False],
+                                     "request_id": self.plays}) + "\n").encode()
+
+    def release(self) -> float:
+        with self._send_lock:
+            t = time.perf_counter()
+            self.sock.sendall(self._release)
+        return t
+
+    def stop(self) -> None:
+        self._on_end = None
+        if self.sock:
+            try:
+                self._send("stop")
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        self._on_end = None
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        self.proc = None
+        self._sock_path.unlink(missing_ok=True)
+
+    def status(self) -> dict:
+        return {"type": "audio", "device": self.device, "alive": self.alive(), "plays": self.plays}
+
+
+class MidiOutput:
+    """Persistent mido output port; MIDI files are sequenced in-process onto it."""
+
+    kind = "midi"
+
+    def __init__(self, name: str, port: str):
+        self.name = name
+        self.port = port
+        self.spec = ("midi", port)
+        self.plays = 0
+        self.handle = None
+        self._midi = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.started_at = None
+
+    def alive(self) -> bool:
+        return self.handle is not None and not self.handle.closed
+
+    def open(self) -> None:
+        if self.alive():
+            return
+        names = mido.get_output_names()
+        want = self.port.lower()
+        match = next((n for n in names if n == self.port), None) or \
+            next((n for n in names if want and want in n.lower()), None)
+        if not match:
+            raise RuntimeError(f"output {self.name}: MIDI port {self.port!r} not found; available: {names}")
+        self.handle = mido.open_output(match)
+        log(f"output {self.name}: MIDI port {match}")
+
+    def load(self, path: Path, gain_db: float) -> None:
+        self.open()
+        self._midi = mido.MidiFile(str(path))
+
+    def arm(self, on_end) -> None:
+        self._stop = threading.Event()
+        self.plays += 1
+        self._thread = threading.Thread(target=self._run, args=(self._midi, self._stop, on_end),
+                                        name=f"midi-{self.name}", daemon=True)
+
+    def release(self) -> float:
+        self.started_at = time.perf_counter()
+        self._thread.start()
+        return self.started_at
+
+    def _run(self, midi, stop: threading.Event, on_end) -> None:
+        rt_thread(True)
+        code = 0
+        t0 = time.monotonic()
+        at = 0.0
+        try:
+            for msg in midi:  # msg.time: seconds since the previous message
+                at += msg.time
+                delay = t0 + at - time.monotonic()
+                if delay > 0 and stop.wait(delay):
+                    return
+                if stop.is_set():
+                    return
+                if not msg.is_meta:
+                    self.handle.send(msg)
+        except Exception as e:
+            log(f"output {self.name}: MIDI playback error: {e}", level="error")
+            code = 1
+        if not stop.is_set():
+            on_end(code)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.alive():
+            try:
+                self.handle.reset()  # all notes off, reset controllers
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        self.stop()
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+    def status(self) -> dict:
+        return {"type": "midi", "port": self.port, "alive": self.alive(), "plays": self.plays}
+
+
+class FakeOutput:
+    """Stands in for a device: "plays" for the file's length without making sound,
+    so the engine runs in tests, simulations and on machines without audio."""
+
+    kind = "fake"
+
+    def __init__(self, name: str):
+        self.name = name
+        self.spec = ("fake",)
+        self.plays = 0
+        self._length = FAKE_DEFAULT_SEC
+        self._stop = threading.Event()
+        self._thread = None
+        self.started_at = None
+
+    def alive(self) -> bool:
+        return True
+
+    def open(self) -> None:
+        pass
+
+    def load(self, path: Path, gain_db: float) -> None:
+        self._length = FAKE_PLAY_SEC or media_length(path) or FAKE_DEFAULT_SEC
+
+    def arm(self, on_end) -> None:
+        stop = self._stop = threading.Event()
+        self.plays += 1
+        length = self._length
+
+        def run():
+            if not stop.wait(length):
+                on_end(0)
+        self._thread = threading.Thread(target=run, name=f"fake-{self.name}", daemon=True)
+
+    def release(self) -> float:
+        self.started_at = time.perf_counter()
+        self._thread.start()
+        return self.started_at
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def close(self) -> None:
+        self.stop()
+
+    def status(self) -> dict:
+        return {"type": "fake", "alive": True, "plays": self.plays}
+
 
 # ---- Runtime state ----
 current_cue = None
 playlist_index = 0
 
-running_proc = None
-running_lock = threading.Lock()
+current_playback = None  # ProcPlayback | OutputPlayback
+running_lock = threading.RLock()
 playback_watcher = None
-stop_watcher = threading.Event()
-
-# debouncing
-_last_pc_time = 0.0
-_last_pc_val = None
-_last_action_time = {}  # action -> timestamp
+stop_watcher = threading.Event()  # replaced per playback; set = ended by stop, skip on-exit
+
+# active compiled show (swapped as a whole by activate_show)
+_show = CompiledShow("", [], [None] * 128, [], True)
+_show_status = {"name": None, "cues": 0, "error": None}
+_scheduler = None  # CueScheduler, created on first use
+# Chain actions due on the scheduler are run here, in order, so a slow load never holds
+# up other timers. Entries carry the chain generation; cancel_chain() bumps it.
+_chain_queue: "queue.Queue[tuple]" = queue.Queue()
+_chain_gen = 0
+_chain_thread: threading.Thread | None = None
+_chain_stats = {"run": 0, "stale": 0, "lag_ms_max": 0.0}
+_outputs: dict = {}  # output name -> AudioOutput | MidiOutput | FakeOutput (kept open)
+_outputs_lock = threading.Lock()
+_output_start = None  # last OutputPlayback started; its timing() goes to state.json
+
+# MIDI inputs (debounce state lives on each MidiInput; GO debounce stays global)
+_midi_inputs: list[MidiInput] = []
+_default_input = MidiInput("default", "", NOTE_ACTIONS)  # handle_midi callers without an input
+_mirror = None  # Mirror, when cfg["mirror"] sets a role
+_mirror_error = None  # why the configured mirror did not start (reported in state.json)
+_cfg_mode = "cues"  # mode as of the last load_cfg/save_cfg; the mirror heartbeat reads this, not the file
 
 # ---- Binaries ----
 APLAY = shutil.which("aplay")
 APLAYMIDI = shutil.which("aplaymidi")
 MPV = shutil.which("mpv")
 MPG123 = shutil.which("mpg123")
+FFMPEG = shutil.which("ffmpeg")
+
+# ---- Decoded PCM cache (see docs/architecture.md) ----
+# key -> size in bytes, least recently used first
+_pcm_index: "OrderedDict[str, int]" = OrderedDict()
+_pcm_lock = threading.Lock()
+_pcm_pending: set[str] = set()
+_pcm_stats = {"hits": 0, "misses": 0}
+_pcm_scanned_dir: Path | None = None
 
 MIDI_DEBUG = os.environ.get("MIDI_DEBUG", "").strip() in ("1", "true", "yes", "on")
 
+# ---- Logger (see docs/architecture.md) ----
+# Callers only enqueue (time, level, msg, fields); formatting and the stdout/journald
+# write happen on the writer thread, so a slow journal never stalls MIDI handling.
+_log_queue: "queue.Queue[tuple]" = queue.Queue(LOG_QUEUE_MAX)
+_log_level = LOG_LEVELS.get(os.environ.get("SHOWBOX_LOG_LEVEL", "").strip().lower(),
+                            LOG_LEVELS["debug"] if MIDI_DEBUG else LOG_LEVELS["info"])
+_log_json = os.environ.get("SHOWBOX_LOG_FORMAT", "").strip().lower() == "json"
+_log_buckets: dict[str, list] = {}  # rate-limit key -> [tokens, last refill, suppressed]
+_log_bucket_lock = threading.Lock()
+_log_stats = {"written": 0, "dropped": 0, "suppressed": 0}
+_log_out = sys.stdout  # stderr under --check --json, so stdout is only the report
+_log_thread: threading.Thread | None = None
+_log_start_lock = threading.Lock()
+
+# ---- Tracing (opt-in, see docs/architecture.md) ----
+# Decided once at import: with tracing off @traced returns the function unchanged.
+_trace_env = os.environ.get("SHOWBOX_TRACE", "").strip()
+TRACE_PATH = (None if _trace_env in ("", "0", "false", "no", "off")
+              else TRACE_FILE_DEFAULT if _trace_env in ("1", "true", "yes", "on") else Path(_trace_env))
+_trace_pending: deque = deque(maxlen=TRACE_MAX_PENDING)  # (ph, name, ts_us, tid, args)
+_trace_threads: set[int] = set()
+_trace_writer: threading.Thread | None = None
+_trace_start_lock = threading.Lock()
+
+# ---- Flight recorder (see docs/architecture.md) ----
+# Preallocated ring; a record is one counter step and four list stores, no formatting.
+# Details are kept as the raw objects (mido messages, tuples) and only turned into text on dump.
+_fr_seq = [-1] * FLIGHT_SLOTS
+_fr_time = [0.0] * FLIGHT_SLOTS
+_fr_event = [""] * FLIGHT_SLOTS
+_fr_detail = [None] * FLIGHT_SLOTS
+_fr_counter = itertools.count()  # next() is atomic under the GIL
+_fr_dump_lock = threading.Lock()
+
+# ---- Realtime profile (opt-in, see docs/architecture.md) ----
+RT_ENABLED = os.environ.get("SHOWBOX_REALTIME", "").strip() in ("1", "true", "yes", "on")
+RT_PRIORITY = int(os.environ.get("SHOWBOX_RT_PRIORITY", "70"))          # MIDI/playback/scheduler
+RT_PLAYER_PRIORITY = int(os.environ.get("SHOWBOX_RT_PLAYER_PRIORITY", "60"))
+RT_CPU = os.environ.get("SHOWBOX_RT_CPU", "").strip()                    # empty = highest CPU
+RT_MLOCK = os.environ.get("SHOWBOX_RT_MLOCK", "1").strip() in ("1", "true", "yes", "on")
+RT_MLOCK_MIN_BYTES = 256 * 1024 * 1024  # below this RLIMIT_MEMLOCK, MCL_FUTURE risks ENOMEM later
+RT_THREAD_STACK = 512 * 1024            # every locked thread stack is resident; keep them small
+MCL_CURRENT, MCL_FUTURE = 1, 2
+
+_rt_cpus: tuple[set[int], set[int]] | None = None  # (reserved core, everything else)
+_rt_status = {"enabled": RT_ENABLED, "cpu": None, "fifo": False, "mlock": False, "errors": []}
+
 
 def go_debounced() -> bool:
     global _last_go_time
     now = time.time()
     if now - _last_go_time < GO_DEBOUNCE_SEC:
+        flight("debounced", "go")
         return True
     _last_go_time = now
     return False
 
 
-def log(msg: str) -> None:
-    print(msg, flush=True)
+def log(msg: str, level: str = "info", key: str | None = None, **fields) -> None:
+    """Queue a log record; never blocks.
+
+    Extra keyword fields (cue, action, latency_ms, ...) become JSON fields. Records
+    sharing a rate-limit `key` are limited to LOG_RATE_PER_SEC; the next record that
+    gets through carries the number suppressed meanwhile.
+    """
+    if LOG_LEVELS.get(level, 20) < _log_level:
+        return
+    if key is not None:
+        suppressed = _log_allow(key)
+        if suppressed is None:
+            return
+        if suppressed:
+            fields["suppressed"] = suppressed
+    try:
+        _log_queue.put_nowait((time.time(), level, msg, fields))
+    except queue.Full:
+        _log_stats["dropped"] += 1
+        return
+    if _log_thread is None:
+        _log_start()
+
+
+def log_enabled(level: str) -> bool:
+    # guard for messages that are expensive to format (per-MIDI-message debug output)
+    return LOG_LEVELS.get(level, 20) >= _log_level
+
+
+def set_log_level(level: str, fmt: str | None = None) -> bool:
+    global _log_level, _log_json
+    if level not in LOG_LEVELS or fmt not in (None, "text", "json"):
+        return False
+    _log_level = LOG_LEVELS[level]
+    if fmt:
+        _log_json = fmt == "json"
+    return True
+
+
+def log_stats() -> dict:
+    level = next(n for n, v in LOG_LEVELS.items() if v == _log_level)
+    return dict(_log_stats, level=level, format="json" if _log_json else "text",
+                queued=_log_queue.qsize())
+
+
+def log_flush(timeout: float = 1.0) -> None:
+    # An empty queue only means the writer took the last batch, not that it wrote it:
+    # wait for its task_done() calls, which follow write() and flush(). Bounded, so an
+    # exit never hangs on a stuck stdout.
+    deadline = time.monotonic() + timeout
+    with _log_queue.all_tasks_done:
+        while _log_queue.unfinished_tasks:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return
+            _log_queue.all_tasks_done.wait(left)
+
+
+def _log_allow(key: str) -> int | None:
+    # token bucket per key: None = suppress, otherwise how many were suppressed before this one
+    now = time.monotonic()
+    with _log_bucket_lock:
+        b = _log_buckets.get(key)
+        if b is None:
+            b = _log_buckets[key] = [float(LOG_RATE_BURST), now, 0]
+        b[0] = min(float(LOG_RATE_BURST), b[0] + (now - b[1]) * LOG_RATE_PER_SEC)
+        b[1] = now
+        if b[0] < 1.0:
+            b[2] += 1
+            _log_stats["suppressed"] += 1
+            return None
+        b[0] -= 1.0
+        suppressed, b[2] = b[2], 0
+        return suppressed
+
+
+def _log_start() -> None:
+    global _log_thread
+    with _log_start_lock:
+        if _log_thread is None:
+            _log_thread = threading.Thread(target=_log_writer, name="log-writer", daemon=True)
+            _log_thread.start()
+            atexit.register(log_flush)
+
+
+def _log_format(rec: tuple) -> str:
+    ts, level, msg, fields = rec
+    if _log_json:
+        return json.dumps({"ts": round(ts, 3), "level": level, "msg": msg, **fields}, default=str)
+    line = msg if level in ("info", "debug") else f"{level.upper()}: {msg}"
+    shown = " ".join(f"{k}={v}" for k, v in fields.items() if v is not None)
+    if shown:
+        line += f" [{shown}]"
+    return line
+
+
+def _log_writer() -> None:
+    rt_thread(False)
+    dropped = 0
+    while True:
+        batch = [_log_queue.get()]
+        try:
+            while len(batch) < LOG_BATCH:
+                batch.append(_log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        lines = []
+        for rec in batch:
+            try:
+                lines.append(_log_format(rec))
+            except Exception as e:
+                lines.append(f"log: unformattable record {rec[2]!r}: {e}")
+        if _log_stats["dropped"] != dropped:
+            lines.append(f"log: queue full, {_log_stats['dropped'] - dropped} record(s) dropped")
+            dropped = _log_stats["dropped"]
+        try:
+            _log_out.write("\n".join(lines) + "\n")
+            _log_out.flush()
+        except Exception:
+            pass  # nowhere left to report it
+        _log_stats["written"] += len(batch)
+        for _ in batch:
+            _log_queue.task_done()  # releases log_flush()
+
+
+def traced(fn=None, *, detail=None):
+    """Record begin/end spans around fn when SHOWBOX_TRACE is set.
+
+    `detail(*args, **kwargs)` may return a dict attached to the begin event.
+    """
+    if fn is None:
+        return lambda f: traced(f, detail=detail)
+    if TRACE_PATH is None:
+        return fn
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        tid = threading.get_native_id()
+        _trace_event("B", name, tid, detail(*args, **kwargs) if detail else None)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _trace_event("E", name, tid)
+    return wrapper
+
+
+def _trace_event(ph: str, name: str, tid: int, args: dict | None = None) -> None:
+    if tid not in _trace_threads:
+        _trace_threads.add(tid)
+        _trace_pending.append(("M", "thread_name", 0, tid, {"name": threading.current_thread().name}))
+    _trace_pending.append((ph, name, time.monotonic_ns() // 1000, tid, args))
+    if _trace_writer is None:
+        _trace_start()
+
+
+def _trace_start() -> None:
+    global _trace_writer
+    with _trace_start_lock:
+        if _trace_writer is None:
+            _trace_writer = threading.Thread(target=_trace_run, name="trace-writer", daemon=True)
+            _trace_writer.start()
+            atexit.register(_trace_flush)
+
+
+def _trace_open() -> int:
+    # JSON array format; the closing "]" is optional, so a crash never leaves an
+    # unreadable file. Appends keep engine and web app spans in one timeline.
+    TRACE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        fd = os.open(TRACE_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        os.write(fd, b"[\n")
+        os.close(fd)
+    except FileExistsError:
+        pass
+    fd = os.open(TRACE_PATH, os.O_WRONLY | os.O_APPEND)
+    meta = {"name": "process_name", "ph": "M", "pid": os.getpid(), "tid": 0, "args": {"name": "midicues"}}
+    os.write(fd, (json.dumps(meta) + ",\n").encode())
+    return fd
+
+
+def _trace_flush(fd: int | None = None) -> None:
+    lines = []
+    pid = os.getpid()
+    while _trace_pending:
+        ph, name, ts, tid, args = _trace_pending.popleft()
+        ev = {"name": name, "ph": ph, "ts": ts, "pid": pid, "tid": tid}
+        if args:
+            ev["args"] = args
+        lines.append(json.dumps(ev, default=str) + ",\n")
+    if not lines:
+        return
+    try:
+        if fd is None:
+            fd = os.open(TRACE_PATH, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, "".join(lines).encode())
+            finally:
+                os.close(fd)
+        else:
+            os.write(fd, "".join(lines).encode())
+    except OSError as e:
+        log(f"trace: write failed: {e}", level="warning", key="trace_write")
+
+
+def _trace_run() -> None:
+    rt_thread(False)
+    try:
+        fd = _trace_open()
+    except OSError as e:
+        log(f"trace: cannot open {TRACE_PATH}: {e}", level="error")
+        return
+    log(f"trace: writing spans to {TRACE_PATH}")
+    while True:
+        time.sleep(TRACE_FLUSH_SEC)
+        _trace_flush(fd)
+
+
+def flight(event: str, detail=None) -> None:
+    n = next(_fr_counter)
+    i = n % FLIGHT_SLOTS
+    _fr_time[i] = time.monotonic()
+    _fr_event[i] = event
+    _fr_detail[i] = detail
+    _fr_seq[i] = n  # written last: a dump skips a slot that is still being filled
+
+
+def _flight_value(v):
+    if v is None or isinstance(v, (bool, int, float, str)):
+        return v
+    if isinstance(v, (tuple, list)):
+        return [_flight_value(x) for x in v]
+    return str(v)
+
+
+def flight_events() -> list[dict]:
+    now = time.monotonic()
+    seqs = list(_fr_seq)
+    rows = []
+    for i in sorted((i for i, n in enumerate(seqs) if n >= 0), key=seqs.__getitem__):
+        t, event, detail = _fr_time[i], _fr_event[i], _fr_detail[i]
+        if _fr_seq[i] != seqs[i]:
+            continue  # overwritten while copying
+        rows.append({"seq": seqs[i], "t": round(t, 6), "ago_ms": round((now - t) * 1000.0, 3),
+                     "event": event, "detail": _flight_value(detail)})
+    return rows
+
+
+def flight_dump(reason: str) -> Path | None:
+    """Write the ring to FLIGHT_DIR/flight-<time>-<reason>.json, oldest event first."""
+    with _fr_dump_lock:
+        try:
+            FLIGHT_DIR.mkdir(parents=True, exist_ok=True)
+            doc = {
+                "reason": reason,
+                "time": time.time(),
+                "monotonic": time.monotonic(),  # event "t" values are on this clock
+                "pid": os.getpid(),
+                "current_cue": current_cue,
+                "show": _show_status.get("name"),
+                "events": flight_events(),
+            }
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = FLIGHT_DIR / f"flight-{stamp}-{int(time.time() * 1000) % 1000:03d}-{reason}.json"
+            tmp = path.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(doc, indent=1))
+            os.replace(tmp, path)
+            for old in sorted(FLIGHT_DIR.glob("flight-*.json"))[:-FLIGHT_KEEP]:
+                old.unlink(missing_ok=True)
+            log(f"flight recorder: {len(doc['events'])} events -> {path}")
+            return path
+        except Exception as e:
+            log(f"flight recorder: dump failed: {e}", level="error")
+            return None
+
+
+def _flight_signal(signum, frame) -> None:
+    # keep the handler short; the MIDI loop resumes immediately
+    threading.Thread(target=flight_dump, args=("signal",), daemon=True).start()
+
+
+def _flight_thread_crash(args) -> None:
+    flight("fatal", f"{args.thread.name if args.thread else '?'}: {args.exc_value}")
+    flight_dump("crash")
+    threading.__excepthook__(args)
+
+
+def _rt_error(what: str, e: Exception) -> None:
+    msg = f"{what}: {e}"
+    if msg not in _rt_status["errors"]:
+        _rt_status["errors"].append(msg)
+        log(f"realtime: {msg} (continuing without it)", level="warning")
+
+
+def _rt_cpu_sets() -> tuple[set[int], set[int]] | None:
+    allowed = os.sched_getaffinity(0)
+    if len(allowed) < 2:
+        return None  # nothing to reserve on a single core
+    cpu = int(RT_CPU) if RT_CPU else max(allowed)
+    if cpu not in allowed:
+        raise ValueError(f"SHOWBOX_RT_CPU={cpu} not in allowed CPUs {sorted(allowed)}")
+    return {cpu}, allowed - {cpu}
+
+
+def _rt_mlock() -> None:
+    soft, _hard = resource.getrlimit(resource.RLIMIT_MEMLOCK)
+    if soft != resource.RLIM_INFINITY and soft < RT_MLOCK_MIN_BYTES and os.geteuid() != 0:
+        raise PermissionError(f"RLIMIT_MEMLOCK is {soft} bytes (set LimitMEMLOCK=infinity)")
+    threading.stack_size(RT_THREAD_STACK)
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+
+
+def realtime_setup() -> None:
+    """Apply the realtime profile to the process and the calling (MIDI reader) thread."""
+    global _rt_cpus
+    if not RT_ENABLED:
+        return
+    try:
+        _rt_cpus = _rt_cpu_sets()
+        _rt_status["cpu"] = min(_rt_cpus[0]) if _rt_cpus else None
+    except (OSError, ValueError) as e:
+        _rt_error("cpu affinity", e)
+    if RT_MLOCK and not _rt_status["mlock"]:
+        try:
+            _rt_mlock()
+            _rt_status["mlock"] = True
+        except (OSError, AttributeError) as e:
+            _rt_error("mlockall", e)
+    rt_thread(True)
+    log(f"realtime: fifo={'prio ' + str(RT_PRIORITY) if _rt_status['fifo'] else 'no'} "
+        f"cpu={_rt_status['cpu']} mlock={'yes' if _rt_status['mlock'] else 'no'}")
+
+
+def rt_thread(critical: bool) -> None:
+    """Place the calling thread: critical threads get SCHED_FIFO on the reserved core,
+    everything else is demoted to SCHED_OTHER on the remaining cores.
+
+    New threads inherit the creator's class, so every thread entry point calls this.
+    """
+    if not RT_ENABLED:
+        return
+    try:
+        if critical:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(RT_PRIORITY))
+            _rt_status["fifo"] = True
+        else:
+            os.sched_setscheduler(0, os.SCHED_OTHER, os.sched_param(0))
+    except OSError as e:
+        _rt_error("SCHED_FIFO", e)
+    if _rt_cpus:
+        try:
+            os.sched_setaffinity(0, _rt_cpus[0] if critical else _rt_cpus[1])
+        except OSError as e:
+            _rt_error("cpu affinity", e)
+
+
+def _player_preexec() -> None:
+    # Runs in the forked player before exec: FIFO just below the engine, on the reserved core.
+    # Failures are ignored so a missing permission never stops a cue from playing.
+    if not RT_ENABLED:
+        return
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(RT_PLAYER_PRIORITY))
+    except OSError:
+        pass
+    if _rt_cpus:
+        try:
+            os.sched_setaffinity(0, _rt_cpus[0])
+        except OSError:
+            pass
+
+
+def _background_preexec(nice: int) -> None:
+    # helpers (decoders) never inherit a realtime class or the reserved core
+    if RT_ENABLED:
+        try:
+            os.sched_setscheduler(0, os.SCHED_OTHER, os.sched_param(0))
+        except OSError:
+            pass
+        if _rt_cpus:
+            try:
+                os.sched_setaffinity(0, _rt_cpus[1])
+            except OSError:
+                pass
+    os.nice(nice)
 
 
 def ensure_dirs() -> None:
     BASE.mkdir(parents=True, exist_ok=True)
     CUES_DIR.mkdir(parents=True, exist_ok=True)
+    SHOWS_DIR.mkdir(parents=True, exist_ok=True)
     JUKE_SONGS.mkdir(parents=True, exist_ok=True)
     JUKE_LISTS.mkdir(parents=True, exist_ok=True)
 
 
+def write_json(path: Path, obj) -> None:
+    # write + rename: the web app (and the other writer of config.json) never reads half a file
+    tmp = path.with_name(f".{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(obj, indent=2))
+    os.replace(tmp, path)
+
+
 def _default_cfg() -> dict:
     return {
         "mode": "cues",
         "midi_in_port": "",         # optional exact mido port name
         "midi_out_port": "14:0",
+        "show": "",                 # shows/<name>.json; empty = N_workcue files
         "jukebox": {"play_mode": "random", "playlist": "default.json"},
+        "pcm_cache": {"enabled": True, "dir": "", "max_bytes": PCM_CACHE_DEFAULT_MAX_BYTES},
     }
 
 
+@traced
 def load_cfg() -> dict:
     if not CFG_PATH.exists():
         cfg = _default_cfg()
-        CFG_PATH.write_text(json.dumps(cfg, indent=2))
-        return cfg
+        write_json(CFG_PATH, cfg)
+        return _cfg_seen(cfg)
 
     try:
         cfg = json.loads(CFG_PATH.read_text())
     except Exception as e:
-        log(f"WARNING: config.json invalid, restoring defaults: {e}")
+        log(f"config.json invalid, restoring defaults: {e}", level="warning", key="cfg_invalid")
         cfg = _default_cfg()
-        CFG_PATH.write_text(json.dumps(cfg, indent=2))
-        return cfg
+        write_json(CFG_PATH, cfg)
+        return _cfg_seen(cfg)
 
     # ensure required structure
     if "jukebox" not in cfg or not isinstance(cfg.get("jukebox"), dict):
@@ -141,14 +1591,28 @@ def load_cfg() -> dict:
     if "midi_in_port" not in cfg:
         cfg["midi_in_port"] = ""
 
+    if "show" not in cfg:
+        cfg["show"] = ""
+
+    if "pcm_cache" not in cfg or not isinstance(cfg.get("pcm_cache"), dict):
+        cfg["pcm_cache"] = {"enabled": True, "dir": "", "max_bytes": PCM_CACHE_DEFAULT_MAX_BYTES}
+
+    return _cfg_seen(cfg)
+
+
+def _cfg_seen(cfg: dict) -> dict:
+    # keep _cfg_mode current; the main loop reloads the config at least every MIDI_REOPEN_SEC
+    global _cfg_mode
+    _cfg_mode = cfg.get("mode", "cues")
     return cfg
 
 
 def save_cfg(cfg: dict) -> None:
+    _cfg_seen(cfg)
     try:
-        CFG_PATH.write_text(json.dumps(cfg, indent=2))
+        write_json(CFG_PATH, cfg)
     except Exception as e:
-        log(f"WARNING: failed writing config.json: {e}")
+        log(f"failed writing config.json: {e}", level="warning", key="cfg_write")
 
 
 def force_startup_defaults() -> None:
@@ -160,20 +1624,33 @@ def force_startup_defaults() -> None:
     write_state(False, None)
 
 
+@traced
 def write_state(playing: bool, now_playing: dict | None) -> None:
     cfg = load_cfg()
+    flight("state", (bool(playing), now_playing["name"] if now_playing else None, current_cue))
     state = {
+        "pid": os.getpid(),
         "mode": cfg.get("mode", "cues"),
         "playing": bool(playing),
         "now_playing": now_playing,
         "midi_out_port": cfg.get("midi_out_port", ""),
         "timestamp": time.time(),
         "current_cue": current_cue,
+        "show": _show_status,
+        "scheduler": dict(_scheduler.stats(), chain=dict(_chain_stats)) if _scheduler else None,
+        "pcm_cache": pcm_cache_stats(cfg),
+        "midi_inputs": [i.status() for i in _midi_inputs],
+        "player": PLAYER_BACKEND,
+        "outputs": outputs_status(),
+        "output_start": _output_start.timing() if _output_start else None,
+        "realtime": _rt_status,
+        "mirror": _mirror.status() if _mirror else ({"error": _mirror_error} if _mirror_error else None),
+        "log": log_stats(),
     }
     try:
-        STATE_PATH.write_text(json.dumps(state, indent=2))
+        write_json(STATE_PATH, state)
     except Exception as e:
-        log(f"error writing state.json: {e}")
+        log(f"error writing state.json: {e}", level="error", key="state_write")
 
 
 def read_control() -> dict | None:
@@ -195,16 +1672,38 @@ def read_control() -> dict | None:
     return data
 
 
-def find_input_port(cfg: dict) -> str:
-    ports = mido.get_input_names()
+def match_input_port(want: str, ports: list[str]) -> str | None:
+    want = (want or "").strip()
+    if want:
+        for p in ports:
+            if p == want:
+                return p
+        for p in ports:
+            if want.lower() in p.lower():
+                return p
+        return None
+    return find_input_port({}, ports)
+
+
+def midi_input_names() -> list[str]:
+    # an empty list (not an exception) when the backend is missing, so UDP inputs still work
+    try:
+        return mido.get_input_names()
+    except (ImportError, OSError) as e:
+        log(f"MIDI backend unavailable: {e}", level="warning", key="midi_backend")
+        return []
+
+
+def find_input_port(cfg: dict, ports: list[str] | None = None) -> str:
+    ports = mido.get_input_names() if ports is None else ports
     if not ports:
         raise RuntimeError("mido sees no MIDI input ports (install python3-rtmidi)")
 
     want = (cfg.get("midi_in_port") or "").strip()
     if want:
-        for p in ports:
-            if p == want or want.lower() in p.lower():
-                return p
+        p = match_input_port(want, ports)
+        if p:
+            return p
         raise RuntimeError(f"configured midi_in_port not found: {want}; available: {ports}")
 
     # Prefer Midi Through
@@ -220,6 +1719,85 @@ def find_input_port(cfg: dict) -> str:
     return ports[0]
 
 
+def midi_inputs_from_cfg(cfg: dict) -> list[MidiInput]:
+    """Build inputs from cfg["midi_inputs"]; without it, one input on midi_in_port
+    with the default NOTE_ACTIONS (the single-port behavior)."""
+    specs = cfg.get("midi_inputs") or []
+    if not isinstance(specs, list) or not specs:
+        return [MidiInput("default", cfg.get("midi_in_port", ""), dict(NOTE_ACTIONS))]
+    inputs = []
+    for i, spec in enumerate(specs):
+        if not isinstance(spec, dict):
+            log(f"midi_inputs[{i}]: not an object, skipped", level="warning")
+            continue
+        notes = {}
+        for k, action in (spec.get("notes") or NOTE_ACTIONS).items():
+            try:
+                note = int(k)
+            except (TypeError, ValueError):
+                note = -1
+            if not 0 <= note <= 127 or action not in NOTE_ACTION_NAMES:
+                log(f"midi_inputs[{i}]: bad note mapping {k!r}: {action!r}, skipped", level="warning")
+                continue
+            notes[note] = action
+        name = str(spec.get("name") or spec.get("port") or spec.get("udp") or f"input{i}")
+        inputs.append(MidiInput(name, str(spec.get("port", "")), notes,
+                                bool(spec.get("programs", True)), str(spec.get("udp", ""))))
+    return inputs
+
+
+def _mirror_addr(spec: str, host: str, port: int) -> tuple[str, int]:
+    h, sep, p = spec.strip().rpartition(":")
+    if not sep and not p.isdigit():  # "10.0.0.12": host only
+        h, p = p, ""
+    return (h or host, int(p or port))
+
+
+def mirror_from_cfg(cfg: dict) -> Mirror | None:
+    """Start the hot-standby link from cfg["mirror"]; None when off or misconfigured."""
+    global _mirror_error
+    _mirror_error = None
+    spec = cfg.get("mirror") or {}
+    if not isinstance(spec, dict):
+        log("mirror: not an object, hot standby off", level="warning")
+        return None
+    role = str(spec.get("role", "off")).strip().lower()
+    if role not in MIRROR_ROLES:
+        log(f"mirror: unknown role {role!r}, hot standby off", level="warning")
+        return None
+    if role == "off":
+        return None
+    try:
+        listen = _mirror_addr(str(spec.get("listen") or ""), "0.0.0.0", MIRROR_PORTS[role])
+        peer = (_mirror_addr(str(spec["peer"]), "127.0.0.1", MIRROR_PORTS["backup"])
+                if spec.get("peer") else None)
+        if role == "primary" and peer is None:
+            raise ValueError("a primary needs \"peer\" (the backup's host:port)")
+        heartbeat = float(spec.get("heartbeat_sec", MIRROR_HEARTBEAT_SEC))
+        takeover = float(spec.get("takeover_sec", MIRROR_TAKEOVER_SEC))
+    except (ValueError, TypeError) as e:
+        _mirror_error = f"bad config: {e}"
+        log(f"mirror: cannot start {role}: {e}", level="error")
+        return None
+    try:
+        m = Mirror(role, listen, peer, heartbeat=heartbeat, takeover=takeover,
+                   auto=bool(spec.get("auto_takeover", True)))
+    except OSError as e:
+        # port taken (often the other engine's default on the same host): no standby
+        _mirror_error = f"cannot listen on {listen[0]}:{listen[1]}: {e.strerror or e}"
+        flight("mirror_error", _mirror_error)
+        log(f"mirror: {role} {_mirror_error}; hot standby is NOT running", level="error")
+        return None
+    log(f"hot standby: {role} on {listen[0]}:{listen[1]}"
+        + (f" -> {peer[0]}:{peer[1]}" if peer else ""))
+    return m
+
+
+def mirror_send(kind: str, **data) -> None:
+    if _mirror is not None:
+        _mirror.send(kind, **data)
+
+
 def load_playlist(name: str) -> dict:
     p = JUKE_LISTS / name
     if not p.exists():
@@ -264,6 +1842,7 @@ def pick_playlist_track(cfg: dict) -> Path | None:
     return None
 
 
+@traced(detail=lambda cue_num: {"cue": cue_num})
 def find_cue_file(cue_num: int) -> Path | None:
     # strict naming per your convention
     for ext in (".wav", ".mp3", ".mid", ".midi"):
@@ -273,64 +1852,539 @@ def find_cue_file(cue_num: int) -> Path | None:
     return None
 
 
+def _pcm_cache_settings(cfg: dict) -> tuple[bool, Path, int]:
+    pc = cfg.get("pcm_cache", {}) or {}
+    enabled = bool(pc.get("enabled", True))
+    d = (pc.get("dir") or "").strip()
+    cache_dir = Path(d) if d else PCM_CACHE_DIR
+    try:
+        max_bytes = int(pc.get("max_bytes", PCM_CACHE_DEFAULT_MAX_BYTES))
+    except (TypeError, ValueError):
+        max_bytes = PCM_CACHE_DEFAULT_MAX_BYTES
+    return enabled, cache_dir, max(0, max_bytes)
+
+
+def _pcm_key(path: Path) -> str | None:
+    # path + mtime (+ size) so a replaced file never hits a stale decode
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    raw = f"{path.resolve()}|{st.st_mtime_ns}|{st.st_size}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _pcm_scan(cache_dir: Path) -> None:
+    # Rebuild the LRU index from disk (oldest mtime first). Caller holds _pcm_lock.
+    global _pcm_scanned_dir
+    if _pcm_scanned_dir == cache_dir:
+        return
+    _pcm_index.clear()
+    entries = []
+    if cache_dir.exists():
+        for p in cache_dir.iterdir():
+            if p.name.endswith(".part.wav"):
+                p.unlink(missing_ok=True)
+                continue
+            if p.is_file() and p.suffix == ".wav":
+                st = p.stat()
+                entries.append((st.st_mtime, p.stem, st.st_size))
+    for _, key, size in sorted(entries):
+        _pcm_index[key] = size
+    _pcm_scanned_dir = cache_dir
+
+
+def _pcm_evict(cache_dir: Path, max_bytes: int) -> None:
+    # Caller holds _pcm_lock.
+    total = sum(_pcm_index.values())
+    while _pcm_index and total > max_bytes:
+        key, size = _pcm_index.popitem(last=False)
+        (cache_dir / f"{key}.wav").unlink(missing_ok=True)
+        total -= size
+        log(f"pcm cache: evicted {key} ({size} bytes)")
+
+
+def pcm_cache_stats(cfg: dict) -> dict:
+    enabled, cache_dir, max_bytes = _pcm_cache_settings(cfg)
+    with _pcm_lock:
+        hits = _pcm_stats["hits"]
+        misses = _pcm_stats["misses"]
+        lookups = hits + misses
+        return {
+            "enabled": enabled,
+            "dir": str(cache_dir),
+            "entries": len(_pcm_index),
+            "bytes": sum(_pcm_index.values()),
+            "max_bytes": max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+        }
+
+
+def _pcm_decode_cmd(src: Path, dst: Path) -> list[str] | None:
+    if MPG123 and src.suffix.lower() == ".mp3":
+        return [MPG123, "-q", "-w", str(dst), str(src)]
+    if FFMPEG:
+        return [FFMPEG, "-nostdin", "-loglevel", "error", "-y", "-i", str(src),
+                "-f", "wav", "-acodec", "pcm_s16le", str(dst)]
+    if MPV:
+        return [MPV, "--no-video", "--really-quiet", "--ao=pcm",
+                "--ao-pcm-waveheader=yes", f"--ao-pcm-file={dst}", str(src)]
+    return None
+
+
+def _pcm_fill(src: Path, key: str, cache_dir: Path, max_bytes: int) -> None:
+    rt_thread(False)
+    part = cache_dir / f"{key}.part.wav"
+    dst = cache_dir / f"{key}.wav"
+    try:
+        cmd = _pcm_decode_cmd(src, part)
+        if not cmd:
+            log("pcm cache: no decoder available (install mpg123, ffmpeg or mpv)")
+            return
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # decode at low priority so it never competes with the playing cue
+        r = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                           preexec_fn=lambda: _background_preexec(10))
+        if r.returncode != 0 or not part.exists():
+            log(f"pcm cache: decode failed for {src.name}: {r.stderr.decode(errors='replace').strip()}",
+                level="warning")
+            return
+        size = part.stat().st_size
+        if size > max_bytes:
+            log(f"pcm cache: {src.name} decodes to {size} bytes, larger than max_bytes; not cached")
+            return
+        os.replace(part, dst)
+        with _pcm_lock:
+            _pcm_index[key] = size
+            _pcm_index.move_to_end(key)
+            _pcm_evict(cache_dir, max_bytes)
+        log(f"pcm cache: stored {src.name} ({size} bytes)")
+    except Exception as e:
+        log(f"pcm cache: error decoding {src.name}: {e}", level="warning")
+    finally:
+        part.unlink(missing_ok=True)
+        with _pcm_lock:
+            _pcm_pending.discard(key)
+
+
+def pcm_cache_resolve(path: Path, cfg: dict) -> Path:
+    """Return a decoded WAV for compressed media if cached, else the original path.
+
+    A miss schedules a background decode so the next play starts from PCM.
+    """
+    if path.suffix.lower() not in PCM_DECODE_EXTS:
+        return path
+    enabled, cache_dir, max_bytes = _pcm_cache_settings(cfg)
+    if not enabled or max_bytes <= 0:
+        return path
+    key = _pcm_key(path)
+    if not key:
+        return path
+
+    with _pcm_lock:
+        _pcm_scan(cache_dir)
+        if key in _pcm_index:
+            cached = cache_dir / f"{key}.wav"
+            if cached.exists():
+                _pcm_stats["hits"] += 1
+                _pcm_index.move_to_end(key)
+                try:
+                    os.utime(cached)  # persist LRU order across restarts
+                except OSError:
+                    pass
+                return cached
+            del _pcm_index[key]
+        _pcm_stats["misses"] += 1
+        if key in _pcm_pending:
+            return path
+        _pcm_pending.add(key)
+
+    threading.Thread(target=_pcm_fill, args=(path, key, cache_dir, max_bytes), daemon=True).start()
+    return path
+
+
+def _cue_tables(entries: dict, pc_map: list, name: str, legacy: bool) -> CompiledShow:
+    top = max(entries) if entries else 0
+    cues = [None] * (top + 1)
+    prev_cue = [None] * (top + 1)
+    prev = None
+    for num in range(top + 1):
+        prev_cue[num] = prev  # largest defined cue below num
+        if num in entries:
+            cues[num] = entries[num]
+            prev = num
+    return CompiledShow(name, cues, pc_map, prev_cue, legacy)
+
+
+def legacy_show() -> CompiledShow:
+    # Default show: NN_workcue.* files, PC n -> cue n + PROGRAM_CHANGE_OFFSET.
+    # Several files for one number: the zero-padded name wins (07_ over 7_, as
+    # find_cue_file looks it up), then .wav > .mp3 > .mid > .midi, then the name.
+    entries = {}
+    shadowed = {}
+    rank = {ext: i for i, ext in enumerate((".wav", ".mp3", ".mid", ".midi"))}
+    found = []
+    if CUES_DIR.exists():
+        for p in CUES_DIR.iterdir():
+            m = CUE_FILE_RE.match(p.name)
+            if m and p.is_file():
+                num = int(m.group(1))
+                found.append((num, m.group(1) != f"{num:02d}", rank.get(p.suffix.lower(), 99), p.name, p))
+    for num, _, _, _, p in sorted(found):
+        if not 1 <= num <= MAX_CUE_NUMBER:
+            continue
+        if num in entries:
+            shadowed.setdefault(num, []).append(p.name)
+        else:
+            entries[num] = ShowCue(num, p, 0.0, (), 0.0, ())
+    for num, names in shadowed.items():
+        log(f"cue {num}: playing {entries[num].path.name}, ignoring {', '.join(names)}",
+            level="warning", key=f"cue_dup_{num}")
+    pc_map = [max(1, pc + PROGRAM_CHANGE_OFFSET) for pc in range(128)]
+    return _cue_tables(entries, pc_map, "", True)
+
+
+def _is_int(v) -> bool:
+    return isinstance(v, int) and not isinstance(v, bool)  # JSON true/false are not cue numbers
+
+
+def _is_num(v) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def compile_show(defn: dict, name: str) -> CompiledShow:
+    """Validate a show definition and compile it into lookup tables; raises ValueError."""
+    errors = []
+    rows = defn.get("cues") if isinstance(defn, dict) else None
+    if not isinstance(rows, list) or not rows:
+        raise ValueError(f"show {name}: 'cues' must be a non-empty list")
+
+    entries = {}
+    explicit_pc = {}
+    for i, row in enumerate(rows, 1):
+        where = f"cue entry {i}"
+        if not isinstance(row, dict):
+            errors.append(f"{where}: must be an object")
+            continue
+        num = row.get("cue")
+        if not _is_int(num) or not 1 <= num <= MAX_CUE_NUMBER:
+            errors.append(f"{where}: 'cue' must be an integer 1..{MAX_CUE_NUMBER}")
+            continue
+        where = f"cue {num}"
+        if num in entries:
+            errors.append(f"{where}: defined twice")
+            continue
+
+        f = row.get("file")
+        path = None
+        if not isinstance(f, str) or not f.strip():
+            errors.append(f"{where}: 'file' is required")
+        else:
+            path = CUES_DIR / f
+            if Path(f).is_absolute() or ".." in Path(f).parts:
+                errors.append(f"{where}: file must be a path inside cues/ (no absolute path or '..')")
+            elif path.suffix.lower() not in ALL_EXTS:
+                errors.append(f"{where}: unsupported file type {path.suffix or '(none)'}")
+            elif not path.is_file():
+                errors.append(f"{where}: file not found: {path}")
+
+        gain = row.get("gain_db", 0.0)
+        if not _is_num(gain) or not GAIN_DB_RANGE[0] <= gain <= GAIN_DB_RANGE[1]:
+            errors.append(f"{where}: 'gain_db' must be a number {GAIN_DB_RANGE[0]}..{GAIN_DB_RANGE[1]}")
+            gain = 0.0
+
+        output = row.get("output", "")
+        if isinstance(output, str):
+            output = [output] if output.strip() else []
+        if not isinstance(output, list) or not all(isinstance(o, str) and o.strip() for o in output):
+            errors.append(f"{where}: 'output' must be an output name or a list of names")
+            output = []
+
+        wait = row.get("wait", 0.0)
+        if not _is_num(wait) or wait < 0:
+            errors.append(f"{where}: 'wait' must be a number of seconds >= 0")
+            wait = 0.0
+
+        actions = []
+        raw_actions = list(row.get("actions") or [])
+        follow = row.get("follow")
+        if follow is not None:
+            # shorthand: {"cue": N, "delay": s} == GO cue N, s seconds after this cue ends
+            raw_actions.append(dict(follow, at="end", do="go") if isinstance(follow, dict) else follow)
+        for a in raw_actions:
+            if not isinstance(a, dict):
+                errors.append(f"{where}: actions must be objects")
+                continue
+            at, do, delay, target = a.get("at", "end"), a.get("do", "go"), a.get("delay", 0.0), a.get("cue")
+            if at not in CHAIN_TRIGGERS:
+                errors.append(f"{where}: action 'at' must be one of {sorted(CHAIN_TRIGGERS)}")
+            elif do not in CHAIN_ACTIONS:
+                errors.append(f"{where}: action 'do' must be one of {sorted(CHAIN_ACTIONS)}")
+            elif not _is_num(delay) or delay < 0:
+                errors.append(f"{where}: action 'delay' must be a number of seconds >= 0")
+            elif do != "stop" and not _is_int(target):
+                errors.append(f"{where}: action '{do}' needs a target 'cue'")
+            else:
+                actions.append(ChainAction(at, float(delay), do, target if do != "stop" else None))
+
+        pc = row.get("pc")
+        if pc is not None:
+            if not _is_int(pc) or not 0 <= pc <= 127:
+                errors.append(f"{where}: 'pc' must be an integer 0..127")
+            elif pc in explicit_pc:
+                errors.append(f"{where}: pc {pc} already used by cue {explicit_pc[pc]}")
+            else:
+                explicit_pc[pc] = num
+
+        entries[num] = ShowCue(num, path, float(gain), tuple(o.strip() for o in output), float(wait), tuple(actions))
+
+    for num, entry in entries.items():
+        for a in entry.actions:
+            if a.cue is not None and a.cue not in entries:
+                errors.append(f"cue {num}: action target cue {a.cue} is not in the show")
+
+    if errors:
+        raise ValueError(f"show {name}: " + "; ".join(errors))
+
+    # explicit PCs win; every other cue keeps the default PC = cue - offset if it is free
+    pc_map = [None] * 128
+    for pc, num in explicit_pc.items():
+        pc_map[pc] = num
+    for num in entries:
+        pc = num - PROGRAM_CHANGE_OFFSET
+        if 0 <= pc <= 127 and pc_map[pc] is None and num not in explicit_pc.values():
+            pc_map[pc] = num
+
+    return _cue_tables(entries, pc_map, name, False)
+
+
+def load_show(name: str) -> CompiledShow:
+    name = (name or "").strip()
+    if not name:
+        return legacy_show()
+    fname = name if name.endswith(".json") else f"{name}.json"
+    p = SHOWS_DIR / os.path.basename(fname)
+    try:
+        defn = json.loads(p.read_text())
+    except FileNotFoundError:
+        raise ValueError(f"show file not found: {p}")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"show {fname}: invalid JSON: {e}")
+    return compile_show(defn, fname)
+
+
+def activate_show(name: str) -> bool:
+    """Compile a show and swap it in atomically; on error the current show stays active."""
+    global _show, _show_status, current_cue
+    try:
+        show = load_show(name)
+    except ValueError as e:
+        log(f"show load failed: {e}", level="error")
+        _show_status = dict(_show_status, error=str(e))
+        return False
+    _show = show  # single reference swap: the MIDI thread sees the old or the new table, never a mix
+    flight("show", show.name)
+    mirror_send("show", name=show.name)
+    count = sum(1 for c in show.cues if c)
+    _show_status = {"name": show.name or "(cue files)", "cues": count, "error": None}
+    if current_cue is not None and not show.legacy and not show_cue(current_cue):
+        current_cue = None
+    log(f"show loaded: {_show_status['name']} ({count} cues)")
+    return True
+
+
+def show_cue(cue_num: int) -> ShowCue | None:
+    cues = _show.cues
+    return cues[cue_num] if 0 <= cue_num < len(cues) else None
+
+
+def scheduler() -> CueScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = CueScheduler()
+    return _scheduler
+
+
+def chain_dispatch(fn, *args) -> None:
+    # Scheduler callback: hand the action to the chain worker, which does the stop, file
+    # load and start. The scheduler thread only enqueues, so other timers stay on time.
+    global _chain_thread
+    _chain_queue.put((_chain_gen, time.monotonic(), fn, args))
+    if _chain_thread is None:
+        _chain_thread = threading.Thread(target=_chain_worker, name="cue-chain", daemon=True)
+        _chain_thread.start()
+
+
+def _chain_worker() -> None:
+    rt_thread(True)  # starts cues, like the scheduler it takes work from
+    while True:
+        gen, queued, fn, args = _chain_queue.get()
+        if gen != _chain_gen:
+            _chain_stats["stale"] += 1  # due before an operator GO/STOP/BACK, not yet run
+            continue
+        lag_ms = (time.monotonic() - queued) * 1000.0
+        _chain_stats["run"] += 1
+        _chain_stats["lag_ms_max"] = max(_chain_stats["lag_ms_max"], round(lag_ms, 3))
+        try:
+            fn(*args)
+        except Exception as e:
+            flight("error", f"chain: {e}")
+            log(f"chain: action error: {e}", level="error", key="scheduler_error")
+
+
+def cancel_chain() -> None:
+    # GO/STOP/BACK from the operator drops every pending wait/follow action, including
+    # ones already handed to the chain worker
+    global _chain_gen
+    _chain_gen += 1
+    if _scheduler is not None:
+        n = _scheduler.cancel_all()
+        if n:
+            flight("chain_cancel", n)
+            log(f"chain: cancelled {n} pending action(s)")
+
+
+@traced
 def stop_playback() -> None:
-    global running_proc, playback_watcher
+    global current_playback, playback_watcher
     with running_lock:
-        if running_proc:
+        # mark the watcher first so a stopped playback never runs its on-exit callback
+        stop_watcher.set()
+        if current_playback:
+            flight("proc_stop", (current_playback.pid, current_playback.label))
             try:
-                log(f"stopping pid={running_proc.pid}")
-                running_proc.terminate()
-                try:
-                    running_proc.wait(timeout=2)
-                except Exception:
-                    running_proc.kill()
+                log(f"stopping {current_playback.label}", pid=current_playback.pid)
+                current_playback.stop()
             except Exception as e:
-                log(f"error stopping process: {e}")
-            running_proc = None
+                log(f"error stopping playback: {e}", level="error")
+            current_playback = None
 
-        stop_watcher.set()
-        if playback_watcher and playback_watcher.is_alive():
-            playback_watcher.join(timeout=1)
-        stop_watcher.clear()
+        w = playback_watcher
+        if w and w.is_alive() and w is not threading.current_thread():
+            w.join(timeout=1)
         playback_watcher = None
 
     write_state(False, None)
 
 
-def _start_and_watch(cmd: list[str], now_playing: dict, on_exit_cb) -> None:
-    global running_proc, playback_watcher
+@traced(detail=lambda playback, now_playing, on_exit_cb: {"player": playback.label})
+def _start_and_watch(playback, now_playing: dict, on_exit_cb) -> None:
+    global current_playback, playback_watcher, stop_watcher
 
     with running_lock:
-        if running_proc:
+        if current_playback:
             stop_playback()
 
-        log(f"starting playback: {cmd}")
-        running_proc = subprocess.Popen(cmd)
+        t0 = time.monotonic()
+        try:
+            playback.start()
+        except Exception as e:
+            flight("error", f"start: {e}")
+            log(f"playback failed to start: {e}", level="error", file=now_playing.get("name"))
+            write_state(False, None)
+            return
+        log(f"starting playback: {playback.label}", pid=playback.pid, file=now_playing.get("name"),
+            spawn_ms=round((time.monotonic() - t0) * 1000.0, 2))
+        flight("proc_start", (playback.pid, now_playing.get("name"), playback.label))
+        stopped = threading.Event()
+        current_playback = playback
+        stop_watcher = stopped
         write_state(True, now_playing)
-        stop_watcher.clear()
 
         def watcher():
+            global current_playback
+            rt_thread(True)
+            # blocking wait: the end is seen the moment playback finishes (no poll interval)
+            ret = playback.wait()
+            flight("proc_exit", (playback.pid, ret))
+            if stopped.is_set():
+                return
+            log(f"playback ended with code {ret}", pid=playback.pid, code=ret)
+            with running_lock:
+                if current_playback is playback:
+                    current_playback = None
             try:
-                while True:
-                    if stop_watcher.is_set():
-                        return
-                    ret = running_proc.poll()
-                    if ret is not None:
-                        log(f"playback ended with code {ret}")
-                        break
-                    time.sleep(0.1)
-                try:
-                    on_exit_cb()
-                except Exception as e:
-                    log(f"on_exit_cb error: {e}")
-            finally:
-                time.sleep(0.05)
+                on_exit_cb()
+            except Exception as e:
+                log(f"on_exit_cb error: {e}", level="error")
 
         playback_watcher = threading.Thread(target=watcher, daemon=True)
         playback_watcher.start()
 
 
-def play_media(path: Path, cfg: dict, is_jukebox: bool, on_exit_cb) -> None:
+def media_length(path: Path) -> float | None:
+    try:
+        if path.suffix.lower() == ".wav":
+            with wave.open(str(path), "rb") as w:
+                return w.getnframes() / float(w.getframerate())
+        if path.suffix.lower() in MIDI_EXTS:
+            return mido.MidiFile(str(path)).length
+    except Exception:
+        pass
+    return None
+
+
+def get_output(name: str, kind: str, cfg: dict):
+    """Return the persistent output for `name`, creating (or re-creating, when its
+    config changed) it. Names not in cfg["outputs"] are raw mpv devices / MIDI ports."""
+    spec = (cfg.get("outputs") or {}).get(name)
+    if PLAYER_BACKEND == "fake":
+        want = ("fake",)
+    elif isinstance(spec, dict):
+        typ = spec.get("type", "audio")
+        if typ not in ("audio", "midi"):
+            raise ValueError(f"output {name}: unknown type {typ!r}")
+        want = (typ, str(spec.get("port" if typ == "midi" else "device", "")))
+    else:
+        want = ("midi" if kind == "midi" else "audio", name)
+
+    with _outputs_lock:
+        out = _outputs.get(name)
+        if out is None or out.spec != want:
+            if out is not None:
+                out.close()
+            if want[0] == "fake":
+                out = FakeOutput(name)
+            elif want[0] == "midi":
+                out = MidiOutput(name, want[1])
+            else:
+                out = AudioOutput(name, want[1])
+            _outputs[name] = out
+        return out
+
+
+def open_outputs(cfg: dict) -> None:
+    # at startup, so the first cue on each output does not pay for starting mpv / opening the port
+    for name, spec in (cfg.get("outputs") or {}).items():
+        try:
+            kind = spec.get("type", "audio") if isinstance(spec, dict) else "audio"
+            get_output(name, kind, cfg).open()
+        except Exception as e:
+            log(f"output {name}: {e}", level="warning")
+
+
+def close_outputs() -> None:
+    with _outputs_lock:
+        for out in _outputs.values():
+            try:
+                out.close()
+            except Exception:
+                pass
+        _outputs.clear()
+
+
+atexit.register(close_outputs)  # once per process; main() runs again after a crash restart
+
+
+def outputs_status() -> dict:
+    with _outputs_lock:
+        return {name: out.status() for name, out in _outputs.items()}
+
+
+def play_media(path: Path, cfg: dict, is_jukebox: bool, on_exit_cb,
+               gain_db: float = 0.0, output: tuple = ()) -> None:
     ext = path.suffix.lower()
     now = {
         "name": path.name,
@@ -340,56 +2394,127 @@ def play_media(path: Path, cfg: dict, is_jukebox: bool, on_exit_cb) -> None:
         "start_time": time.time(),
     }
 
+    # compressed audio plays from the decoded PCM cache when available
+    if ext in PCM_DECODE_EXTS:
+        src = pcm_cache_resolve(path, cfg)
+        now["pcm_cached"] = src != path
+        path, ext = src, src.suffix.lower()
+
+    # routed (or fake backend): persistent outputs, started together
+    if isinstance(output, str):
+        output = (output,) if output else ()
+    if (output or PLAYER_BACKEND == "fake") and ext in ALL_EXTS:
+        kind = "midi" if ext in MIDI_EXTS else "audio"
+        try:
+            outs = [get_output(n, kind, cfg) for n in (output or ("default",))]
+        except ValueError as e:
+            log(str(e), level="error")
+            write_state(False, None)
+            return
+        wrong = [o.name for o in outs if o.kind not in (kind, "fake")]
+        if wrong:
+            log(f"{path.name}: {kind} file routed to non-{kind} output(s) {wrong}", level="error")
+            write_state(False, None)
+            return
+        now["outputs"] = [o.name for o in outs]
+        _start_and_watch(OutputPlayback(outs, path, gain_db), now, on_exit_cb)
+        return
+
     if ext in MIDI_EXTS:
         port = cfg.get("midi_out_port", "14:0")
         if not APLAYMIDI:
-            log("ERROR: aplaymidi not found (install: sudo apt-get install -y alsa-utils)")
+            log("aplaymidi not found (install: sudo apt-get install -y alsa-utils)", level="error")
             write_state(False, None)
             return
         cmd = [APLAYMIDI, "-p", port, str(path)]
-        _start_and_watch(cmd, now, on_exit_cb)
+        _start_and_watch(ProcPlayback(cmd), now, on_exit_cb)
         return
 
     if ext in AUDIO_EXTS:
         if MPV:
-            cmd = [MPV, "--no-video", "--really-quiet", str(path)]
-            _start_and_watch(cmd, now, on_exit_cb)
+            cmd = [MPV, "--no-video", "--really-quiet"]
+            if gain_db:
+                cmd.append(f"--af=lavfi=[volume={gain_db}dB]")
+            cmd.append(str(path))
+            _start_and_watch(ProcPlayback(cmd), now, on_exit_cb)
             return
 
+        if gain_db:
+            log("per-cue gain needs mpv; playing at unity", level="warning", key="needs_mpv")
+
         if ext == ".wav":
             if not APLAY:
-                log("ERROR: aplay not found (install: sudo apt-get install -y alsa-utils)")
+                log("aplay not found (install: sudo apt-get install -y alsa-utils)", level="error")
                 write_state(False, None)
                 return
             cmd = [APLAY, "-q", str(path)]
-            _start_and_watch(cmd, now, on_exit_cb)
+            _start_and_watch(ProcPlayback(cmd), now, on_exit_cb)
             return
 
         if ext == ".mp3":
             if not MPG123:
-                log("ERROR: mpg123 not found (install: sudo apt-get install -y mpg123) OR install mpv")
+                log("mpg123 not found (install: sudo apt-get install -y mpg123) OR install mpv", level="error")
                 write_state(False, None)
                 return
             cmd = [MPG123, "-q", str(path)]
-            _start_and_watch(cmd, now, on_exit_cb)
+            _start_and_watch(ProcPlayback(cmd), now, on_exit_cb)
             return
 
     log(f"unsupported file type: {path}")
     write_state(False, None)
 
 
-def run_cue(cue_num: int, cfg: dict) -> None:
-    p = find_cue_file(cue_num)
-    if not p:
+def run_cue(cue_num: int, cfg: dict, waited: bool = False) -> None:
+    entry = show_cue(cue_num)
+    if _show.legacy and (entry is None or not entry.path.exists()):
+        # cue file added/replaced since the show was compiled
+        p = find_cue_file(cue_num)
+        entry = ShowCue(cue_num, p, 0.0, (), 0.0, ()) if p else None
+    if entry is None or not entry.path.exists():
+        flight("cue_missing", cue_num)
         log(f"no cue file found for cue {cue_num:02d}")
         write_state(False, None)
         return
 
-    def no_auto():
+    if entry.wait > 0 and not waited:
+        flight("cue_wait", (cue_num, entry.wait))
+        log(f"cue {cue_num:02d}: waiting {entry.wait:.3f}s")
+        scheduler().schedule(entry.wait, chain_dispatch, run_cue, cue_num, cfg, True)
+        return
+
+    flight("cue_run", (cue_num, entry.path.name))
+
+    def on_end():
         log("cue finished")
         write_state(False, None)
+        schedule_actions(entry, "end")
+
+    play_media(entry.path, cfg, is_jukebox=False, on_exit_cb=on_end,
+               gain_db=entry.gain_db, output=entry.output)
+    schedule_actions(entry, "start")
 
-    play_media(p, cfg, is_jukebox=False, on_exit_cb=no_auto)
+
+def schedule_actions(entry: ShowCue, trigger: str) -> None:
+    for a in entry.actions:
+        if a.at == trigger:
+            log(f"chain: cue {entry.cue:02d} {trigger} +{a.delay:.3f}s -> {a.do}"
+                + (f" {a.cue:02d}" if a.cue is not None else ""), cue=entry.cue, action=a.do)
+            scheduler().schedule(a.delay, chain_dispatch, chain_action, a)
+
+
+def chain_action(a: ChainAction) -> None:
+    # runs on the chain worker; unlike operator GO it keeps other pending actions
+    flight("chain", (a.do, a.cue))
+    if a.do == "stop":
+        mirror_send("stop")
+        stop_playback()
+    elif a.do == "select":
+        select_cue(a.cue)
+    elif a.do == "go":
+        select_cue(a.cue)
+        mirror_send("go", cue=a.cue)
+        stop_playback()
+        run_cue(a.cue, load_cfg())
 
 
 def jukebox_play_next(cfg: dict) -> None:
@@ -408,13 +2533,16 @@ def jukebox_play_next(cfg: dict) -> None:
         time.sleep(0.1)
         jukebox_play_next(load_cfg())
 
-    play_media(p, cfg, is_jukebox=True, on_exit_cb=advance)
+    output = cfg.get("jukebox", {}).get("output", "")
+    play_media(p, cfg, is_jukebox=True, on_exit_cb=advance, output=(output,) if output else ())
 
 
 def select_cue(cue: int) -> None:
     global current_cue
     current_cue = cue
-    log(f"cue selected: {current_cue:02d}")
+    flight("select", cue)
+    mirror_send("select", cue=cue)
+    log(f"cue selected: {current_cue:02d}", cue=current_cue, action="select")
 
 
 def cue_go(cfg: dict) -> None:
@@ -428,12 +2556,16 @@ def cue_go(cfg: dict) -> None:
         return
 
     if current_cue is None:
+        flight("go", None)
         log("go ignored (no cue selected)")
         return
 
-    log(f"GO cue {current_cue:02d}")
+    flight("go", current_cue)
+    mirror_send("go", cue=current_cue)
+    log(f"GO cue {current_cue:02d}", cue=current_cue, action="go")
 
     # HARD stop anything already playing BEFORE starting new cue
+    cancel_chain()
     stop_playback()
 
     run_cue(current_cue, cfg)
@@ -447,11 +2579,26 @@ def cue_back(cfg: dict) -> None:
         log(f"jukebox back -> next index {playlist_index}")
         return
 
-    if current_cue is None:
-        current_cue = 1
+    cancel_chain()
+    show = _show
+    if show.legacy:
+        if current_cue is None:
+            current_cue = 1
+        else:
+            current_cue = max(1, current_cue - 1)
+    elif show.cues:
+        top = len(show.cues) - 1
+        if current_cue is None:
+            current_cue = next(c.cue for c in show.cues if c)
+        elif current_cue > top:
+            current_cue = top
+        else:
+            current_cue = show.prev_cue[current_cue] or current_cue
     else:
-        current_cue = max(1, current_cue - 1)
-    log(f"cue selected: {current_cue:02d}")
+        return
+    flight("back", current_cue)
+    mirror_send("select", cue=current_cue)
+    log(f"cue selected: {current_cue:02d}", cue=current_cue, action="select")
 
 
 def cue_fire(cfg: dict) -> None:
@@ -459,7 +2606,10 @@ def cue_fire(cfg: dict) -> None:
 
 
 def cue_stop() -> None:
-    log("STOP -> stopping playback")
+    flight("stop")
+    mirror_send("stop")
+    log("STOP -> stopping playback", action="stop")
+    cancel_chain()
     stop_playback()
 
 
@@ -467,6 +2617,7 @@ def process_control_command(cmd: dict | None) -> None:
     if not cmd or "cmd" not in cmd:
         return
     c = cmd["cmd"]
+    flight("control", c)
     cfg = load_cfg()
 
     if c == "mode_cues":
@@ -492,50 +2643,99 @@ def process_control_command(cmd: dict | None) -> None:
         log("control: jukebox_next")
         stop_playback()
         jukebox_play_next(cfg)
+
+    elif c == "show_load":
+        name = str(cmd.get("name", cfg.get("show", "")))
+        log(f"control: show_load {name or '(cue files)'}")
+        if activate_show(name):
+            cfg["show"] = name
+            save_cfg(cfg)
+        write_state(False, None)
+
+    elif c == "log_level":
+        level = str(cmd.get("level", "")).lower()
+        fmt = cmd.get("format") or None
+        if set_log_level(level, fmt):
+            log(f"control: log_level {level}" + (f" format={fmt}" if fmt else ""))
+        else:
+            log(f"control: bad log_level {level!r} format={fmt!r}", level="warning")
+
+    elif c == "flight_dump":
+        log("control: flight_dump")
+        flight_dump("request")
+
+    elif c in ("mirror_takeover", "mirror_standby"):
+        log(f"control: {c}")
+        if _mirror is None or _mirror.role != "backup":
+            log(f"control: {c} ignored (this engine is not a backup)", level="warning")
+        elif c == "mirror_takeover":
+            _mirror.promote("operator")
+        else:
+            _mirror.standby()
     else:
         log(f"unknown control command: {c}")
 
 
 def control_watcher() -> None:
+    rt_thread(False)
     while True:
         try:
             cmd = read_control()
             if cmd:
                 process_control_command(cmd)
         except Exception as e:
-            log(f"control watcher error: {e}")
+            flight("error", f"control: {e}")
+            log(f"control watcher error: {e}", level="error", key="control_error")
         time.sleep(0.5)
 
 
-def _debounced(key: str, window_sec: float) -> bool:
+@traced(detail=lambda key, window_sec, table: {"key": key})
+def _debounced(key: str, window_sec: float, table: dict) -> bool:
     now = time.time()
-    last = _last_action_time.get(key, 0.0)
+    last = table.get(key, 0.0)
     if (now - last) < window_sec:
+        flight("debounced", key)
         return True
-    _last_action_time[key] = now
+    table[key] = now
     return False
 
 
-def handle_midi(msg, cfg: dict) -> None:
-    global _last_pc_time, _last_pc_val
-
-    if MIDI_DEBUG:
-        log(f"RX: {msg}")
+@traced(detail=lambda msg, cfg, src=None: {"msg": str(msg), "input": src.name if src else None})
+def handle_midi(msg, cfg: dict, src: MidiInput | None = None) -> None:
+    # src: the input the message came from (mapping, debounce state, counters)
+    if src is None:
+        src = _default_input
+    t0 = time.monotonic()
+    stats = src.stats
+    stats["received"] += 1
+    stats["last_rx"] = time.time()
+    flight("midi", (src.name, msg))
+    if log_enabled("debug"):
+        log(f"RX {src.name}: {msg}", level="debug")
+    if _mirror is not None and not _mirror.active:
+        stats["ignored"] += 1  # standby: the primary's actions arrive through the mirror
+        return
 
-    if msg.type == "program_change":
+    if msg.type == "program_change" and src.programs:
         now = time.time()
         pc = int(msg.program)
 
         # debounce program changes (OnSong often repeats)
-        if _last_pc_val == pc and (now - _last_pc_time) < PC_DEBOUNCE_SEC:
+        if src.last_pc_val == pc and (now - src.last_pc_time) < PC_DEBOUNCE_SEC:
+            stats["debounced"] += 1
+            flight("debounced", ("pc", pc))
+            return
+        src.last_pc_val = pc
+        src.last_pc_time = now
+
+        new_cue = _show.pc_map[pc] if 0 <= pc < 128 else None
+        flight("pc", (pc, new_cue))
+        if new_cue is None:
+            stats["ignored"] += 1
+            log(f"program {pc} is not mapped in this show", level="debug", key="pc_unmapped")
             return
-        _last_pc_val = pc
-        _last_pc_time = now
-
-        new_cue = pc + PROGRAM_CHANGE_OFFSET
-        if new_cue < 1:
-            new_cue = 1
 
+        stats["actions"] += 1
         if new_cue != current_cue:
             select_cue(new_cue)
         return
@@ -543,13 +2743,16 @@ def handle_midi(msg, cfg: dict) -> None:
     # Note on (treat velocity 0 as note_off)
     if msg.type == "note_on" and int(getattr(msg, "velocity", 0)) > 0:
         note = int(msg.note)
-        action = NOTE_ACTIONS.get(note)
+        action = src.notes.get(note)
         if not action:
+            stats["ignored"] += 1
             return
 
-        if _debounced(action, NOTE_DEBOUNCE_SEC):
+        if _debounced(action, NOTE_DEBOUNCE_SEC, src.last_action_time):
+            stats["debounced"] += 1
             return
 
+        stats["actions"] += 1
         if action == "go":
             cue_go(cfg)
         elif action == "back":
@@ -558,8 +2761,366 @@ def handle_midi(msg, cfg: dict) -> None:
             cue_fire(cfg)
         elif action == "stop":
             cue_stop()
+        if log_enabled("debug"):
+            log(f"{src.name}: note {note} -> {action}", level="debug", action=action, cue=current_cue,
+                input=src.name, latency_ms=round((time.monotonic() - t0) * 1000.0, 3))
         return
 
+    stats["ignored"] += 1
+
+
+def _check_pcm_cached(path: Path, cfg: dict) -> Path | None:
+    # like pcm_cache_resolve, but only looks: a check must not leave decodes running
+    enabled, cache_dir, _ = _pcm_cache_settings(cfg)
+    key = _pcm_key(path) if enabled else None
+    cached = cache_dir / f"{key}.wav" if key else None
+    return cached if cached and cached.exists() else None
+
+
+def _check_player(ext: str, entry: ShowCue) -> str | None:
+    # the player play_media would pick for this cue (None: nothing can play it)
+    if entry.output or PLAYER_BACKEND == "fake":
+        return "outputs"
+    if ext in MIDI_EXTS:
+        return "aplaymidi" if APLAYMIDI else None
+    if MPV:
+        return "mpv"
+    if ext == ".wav":
+        return "aplay" if APLAY else None
+    return "mpg123" if MPG123 else None
+
+
+def _check_decode(path: Path, ext: str) -> dict:
+    """Decode the whole file and return its format; raises ValueError if it does not decode."""
+    if ext == ".wav":
+        with wave.open(str(path), "rb") as w:
+            frames, rate = w.getnframes(), w.getframerate()
+            fmt = {"codec": "pcm", "rate": rate, "channels": w.getnchannels(),
+                   "bits": w.getsampwidth() * 8, "duration": round(frames / float(rate), 3)}
+            want = frames * w.getsampwidth() * w.getnchannels()
+            got = len(w.readframes(frames))
+        if got < want:
+            raise ValueError(f"truncated: {got} of {want} bytes of audio")
+        return fmt
+    if ext in MIDI_EXTS:
+        mid = mido.MidiFile(str(path))
+        notes = sum(1 for track in mid.tracks for m in track if m.type == "note_on")
+        return {"codec": f"smf{mid.type}", "tracks": len(mid.tracks), "notes": notes,
+                "duration": round(mid.length, 3)}
+
+    # mp3: ffmpeg decodes to null, else mpg123 in test mode, else only the header is checked
+    if FFMPEG:
+        info = subprocess.run([FFMPEG, "-hide_banner", "-nostdin", "-i", str(path)],
+                              capture_output=True, text=True, timeout=CHECK_PROC_TIMEOUT).stderr
+        fmt = {"codec": "mp3"}
+        m = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", info)
+        if m:
+            fmt["duration"] = round(int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3)), 3)
+        m = re.search(r"Audio: (\w+).*?, (\d+) Hz, ([^,]+)", info)
+        if m:
+            fmt.update(codec=m.group(1), rate=int(m.group(2)), channels=m.group(3).strip())
+        r = subprocess.run([FFMPEG, "-v", "error", "-nostdin", "-i", str(path), "-f", "null", "-"],
+                           capture_output=True, text=True, timeout=CHECK_PROC_TIMEOUT)
+        if r.returncode != 0 or "rate" not in fmt:
+            raise ValueError((r.stderr.strip().splitlines() or ["ffmpeg cannot decode it"])[-1])
+        if r.stderr.strip():
+            fmt["warning"] = f"decoder errors: {r.stderr.strip().splitlines()[-1]}"
+        return fmt
+    if MPG123:
+        r = subprocess.run([MPG123, "-q", "-t", str(path)], capture_output=True, text=True,
+                           timeout=CHECK_PROC_TIMEOUT)
+        if r.returncode != 0:
+            raise ValueError((r.stderr.strip().splitlines() or ["mpg123 cannot decode it"])[-1])
+        return {"codec": "mp3"}
+    with open(path, "rb") as fh:
+        head = fh.read(3)
+    if head != b"ID3" and not (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        raise ValueError("not an MP3 file")
+    return {"codec": "mp3", "warning": "not decoded (needs ffmpeg or mpg123)"}
+
+
+def _check_cue(entry: ShowCue, cfg: dict, legacy: bool) -> dict:
+    # file, name, format, player and routing of one cue; safe to run in parallel
+    path = entry.path
+    ext = path.suffix.lower()
+    r = {"cue": entry.cue, "file": path.name, "status": "ok", "problems": [],
+         "output": list(entry.output), "player": None, "format": None,
+         "cold_ms": None, "warm_ms": None}
+
+    def problem(level: str, text: str) -> None:
+        r["problems"].append({"level": level, "text": text})
+        if level == "error" or r["status"] == "ok":
+            r["status"] = level
+
+    try:
+        size = path.stat().st_size
+    except OSError as e:
+        problem("error", f"cannot read: {e.strerror or e}")
+        return r
+    if size == 0:
+        problem("error", "empty file")
+        return r
+    canonical = f"{entry.cue:02d}_workcue{ext}"
+    if legacy and path.name != canonical:
+        problem("warning", f"name should be {canonical} (a cue file added after the show "
+                           f"loaded is only found under that name)")
+
+    try:
+        r["format"] = _check_decode(path, ext)
+    except Exception as e:
+        problem("error", f"does not decode: {e}")
+        return r
+    if r["format"].get("warning"):
+        problem("warning", r["format"].pop("warning"))
+    if r["format"].get("notes") == 0:
+        problem("warning", "MIDI file has no notes")
+
+    if ext in PCM_DECODE_EXTS:
+        r["pcm_cached"] = _check_pcm_cached(path, cfg) is not None
+        if not r["pcm_cached"] and _pcm_cache_settings(cfg)[0] and _pcm_decode_cmd(path, path):
+            problem("warning", "not in the PCM cache yet: the first GO plays the mp3 and queues the decode")
+
+    kind = "midi" if ext in MIDI_EXTS else "audio"
+    outputs = cfg.get("outputs") or {}
+    for name in entry.output:
+        spec = outputs.get(name)
+        if spec is None:
+            problem("warning", f"output {name!r} is not in config outputs; used as a raw "
+                               f"{'MIDI port' if kind == 'midi' else 'audio device'}")
+        elif (spec.get("type", "audio") if isinstance(spec, dict) else "audio") != kind:
+            problem("error", f"{kind} file routed to non-{kind} output {name!r}")
+
+    r["player"] = _check_player(ext, entry)
+    if r["player"] is None:
+        need = {".wav": "mpv or aplay", ".mp3": "mpv or mpg123"}.get(ext, "alsa-utils for aplaymidi")
+        problem("error", f"no player for {ext} (install {need})")
+    elif entry.gain_db and r["player"] in ("aplay", "mpg123"):
+        problem("warning", f"gain {entry.gain_db:+.1f} dB needs mpv; {r['player']} plays at unity")
+    return r
+
+
+def _check_engine_pid() -> int | None:
+    # pid of a live engine (from state.json), whose outputs the check must not touch
+    try:
+        pid = int(json.loads(STATE_PATH.read_text()).get("pid") or 0)
+    except (OSError, ValueError, TypeError, AttributeError):
+        return None
+    if pid <= 0 or pid == os.getpid():
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except PermissionError:
+        pass
+    return pid
+
+
+def _check_outputs(cfg: dict, entries: list[ShowCue], engine_pid: int | None) -> list[dict]:
+    """Open every configured output (and the aplaymidi port if a cue needs it).
+
+    While an engine runs it holds the outputs' devices and mpv IPC sockets, so they
+    are reported as skipped instead of being opened (and stopped) under it.
+    """
+    report = []
+    names = dict.fromkeys(cfg.get("outputs") or {})
+    names.update(dict.fromkeys(n for e in entries for n in e.output))
+    if PLAYER_BACKEND == "fake" and not names:
+        names["default"] = None
+    for name in names:
+        spec = (cfg.get("outputs") or {}).get(name)
+        kind = spec.get("type", "audio") if isinstance(spec, dict) else "audio"
+        if spec is None and any(name in e.output and e.path.suffix.lower() in MIDI_EXTS for e in entries):
+            kind = "midi"
+        r = {"name": name, "kind": kind, "status": "ok", "open_ms": None, "error": None}
+        if engine_pid:
+            r.update(status="skipped", error=f"in use by the running engine (pid {engine_pid})")
+            report.append(r)
+            continue
+        t0 = time.perf_counter()
+        try:
+            get_output(name, kind, cfg).open()
+            r["open_ms"] = round((time.perf_counter() - t0) * 1000.0, 1)
+        except Exception as e:
+            r.update(status="error", error=str(e))
+        report.append(r)
+
+    if any(_check_player(e.path.suffix.lower(), e) == "aplaymidi" for e in entries):
+        port = cfg.get("midi_out_port", "14:0")
+        r = {"name": "midi_out_port", "kind": "midi", "status": "ok", "open_ms": None, "error": None}
+        t0 = time.perf_counter()
+        try:
+            listing = subprocess.run([APLAYMIDI, "-l"], capture_output=True, text=True,
+                                     timeout=CHECK_PROC_TIMEOUT).stdout
+            r["open_ms"] = round((time.perf_counter() - t0) * 1000.0, 1)
+            if not any(line.split()[:1] == [port] for line in listing.splitlines()):
+                r.update(status="error", error=f"ALSA port {port} not found (aplaymidi -l)")
+        except (OSError, subprocess.SubprocessError) as e:
+            r.update(status="error", error=str(e))
+        report.append(r)
+    return report
+
+
+def _check_evict(path: Path) -> None:
+    # drop the file from the page cache so the first start reads it from the card
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    except (OSError, AttributeError):
+        pass
+
+
+def _check_start(entry: ShowCue, player: str, cfg: dict, engine_pid: int | None) -> float | None:
+    """Time one silent start of a cue on its player, in ms (None: not measurable).
+
+    Outputs preroll the file paused and are stopped before it is released, the way
+    a GO prerolls. Per-cue players run against a null sink for a few milliseconds,
+    and so do cues on outputs while a running engine holds them.
+    """
+    path = entry.path
+    ext = path.suffix.lower()
+    if ext in PCM_DECODE_EXTS:
+        path = _check_pcm_cached(path, cfg) or path
+        ext = path.suffix.lower()
+    if player == "outputs" and engine_pid:
+        if ext in MIDI_EXTS:
+            return None
+        player = "mpv" if MPV else "aplay" if ext == ".wav" and APLAY else None
+        if player is None:
+            return None
+    if player == "outputs":
+        kind = "midi" if ext in MIDI_EXTS else "audio"
+        outs = [get_output(n, kind, cfg) for n in (entry.output or ("default",))]
+        t0 = time.perf_counter()
+        try:
+            for o in outs:
+                o.load(path, entry.gain_db)
+            return round((time.perf_counter() - t0) * 1000.0, 3)
+        finally:
+            for o in outs:
+                o.stop()
+    if player == "mpv":
+        cmd = [MPV, "--no-video", "--really-quiet", "--ao=null", "--length=0.01"]
+        if entry.gain_db:
+            cmd.append(f"--af=lavfi=[volume={entry.gain_db}dB]")
+        cmd.append(str(path))
+    elif player == "aplay":
+        cmd = [APLAY, "-q", "-D", "null", "-s", "1", str(path)]
+    elif player == "mpg123":
+        cmd = [MPG123, "-q", "-t", "-n", "1", str(path)]
+    else:
+        return None  # aplaymidi plays straight to the port; the port itself is checked
+    t0 = time.perf_counter()
+    r = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.PIPE, text=True, timeout=CHECK_PROC_TIMEOUT)
+    ms = round((time.perf_counter() - t0) * 1000.0, 3)
+    if r.returncode != 0:
+        raise RuntimeError((r.stderr.strip().splitlines() or [f"{player} exited {r.returncode}"])[-1])
+    return ms
+
+
+def show_check(cfg: dict, timing: bool = True) -> dict:
+    """Check every cue of the configured show before the show: file, name, decode and
+    format, player and routing, outputs, then cold/warm start latency. Plays nothing.
+
+    File checks run in parallel; outputs and timings run one at a time so the
+    numbers are not skewed by each other.
+    """
+    t_start = time.monotonic()
+    name = (cfg.get("show") or "").strip()
+    engine_pid = _check_engine_pid()
+    report = {"show": name or "(cue files)", "player": PLAYER_BACKEND, "time": time.time(),
+              "engine_pid": engine_pid, "errors": [], "cues": [], "outputs": [], "stray": [], "gaps": []}
+    try:
+        show = load_show(name)
+    except ValueError as e:
+        report["errors"] = str(e).split(": ", 1)[-1].split("; ")
+        show = None
+    entries = [c for c in show.cues if c] if show else []
+
+    with ThreadPoolExecutor(max_workers=CHECK_WORKERS) as pool:
+        cues = list(pool.map(lambda e: _check_cue(e, cfg, show.legacy), entries))
+
+    if show and show.legacy and entries:
+        # NN_workcue names the table skipped, and numbers with no file (PC n -> cue n+1)
+        used = {e.path.name for e in entries}
+        if CUES_DIR.exists():
+            for p in sorted(CUES_DIR.iterdir()):
+                if p.name in used or p.name.startswith(".") or not p.is_file():
+                    continue
+                m = CUE_FILE_RE.match(p.name)
+                num = int(m.group(1)) if m else None
+                if m and 1 <= num < len(show.cues) and show.cues[num]:
+                    why = f"cue {num} already plays {show.cues[num].path.name}"
+                elif m:
+                    why = f"cue number outside 1..{MAX_CUE_NUMBER}"
+                elif "workcue" in p.name.lower() or re.match(r"^\d+", p.name):
+                    why = f"not a cue name (NN_workcue{{{','.join(sorted(e[1:] for e in ALL_EXTS))}}})"
+                else:
+                    continue
+                report["stray"].append({"file": p.name, "problem": why})
+        nums = {e.cue for e in entries}
+        report["gaps"] = [n for n in range(1, max(nums)) if n not in nums]
+
+    report["outputs"] = _check_outputs(cfg, entries, engine_pid)
+    if timing:
+        for r, entry in zip(cues, entries):
+            if r["status"] == "error" or not r["player"]:
+                continue
+            try:
+                _check_evict(entry.path)
+                r["cold_ms"] = _check_start(entry, r["player"], cfg, engine_pid)
+                r["warm_ms"] = _check_start(entry, r["player"], cfg, engine_pid)
+            except Exception as e:
+                r["problems"].append({"level": "error", "text": f"start failed: {e}"})
+                r["status"] = "error"
+                continue
+            if r["warm_ms"] is not None and r["warm_ms"] > CHECK_SLOW_START_MS:
+                r["problems"].append({"level": "warning",
+                                      "text": f"slow start: {r['warm_ms']:.0f} ms warm"})
+                if r["status"] == "ok":
+                    r["status"] = "warning"
+    close_outputs()
+
+    report["cues"] = cues
+    summary = {s: sum(1 for c in cues if c["status"] == s) for s in ("ok", "warning", "error")}
+    summary["outputs_failed"] = sum(1 for o in report["outputs"] if o["status"] == "error")
+    summary["elapsed_s"] = round(time.monotonic() - t_start, 3)
+    report["summary"] = summary
+    report["ok"] = not (report["errors"] or summary["error"] or summary["outputs_failed"])
+    return report
+
+
+def print_show_check(report: dict) -> None:
+    s = report["summary"]
+    print(f"show: {report['show']}  player: {report['player']}  {len(report['cues'])} cue(s): "
+          f"{s['ok']} ok, {s['warning']} warning, {s['error']} error  ({s['elapsed_s']:.1f}s)")
+    for e in report["errors"]:
+        print(f"  ERROR: {e}")
+    if report["cues"]:
+        print(f"  {'cue':>4}  {'file':<28} {'format':<30} {'player':<9} {'cold ms':>8} {'warm ms':>8}  status")
+    for c in report["cues"]:
+        f = c["format"] or {}
+        fmt = " ".join(str(x) for x in (
+            f.get("codec"), f.get("rate") and f"{f['rate']}Hz", f.get("channels") and f"{f['channels']}ch",
+            f.get("bits") and f"{f['bits']}bit", f.get("duration") is not None and f"{f['duration']:.1f}s") if x)
+        cold = "-" if c["cold_ms"] is None else f"{c['cold_ms']:.1f}"
+        warm = "-" if c["warm_ms"] is None else f"{c['warm_ms']:.1f}"
+        print(f"  {c['cue']:>4}  {c['file']:<28} {fmt:<30} {c['player'] or '-':<9} {cold:>8} {warm:>8}  {c['status']}")
+        for p in c["problems"]:
+            print(f"        {p['level']}: {p['text']}")
+    for o in report["outputs"]:
+        took = f" ({o['open_ms']:.1f} ms)" if o["open_ms"] is not None else ""
+        print(f"  output {o['name']} [{o['kind']}]: {o['status']}{took}" + (f": {o['error']}" if o["error"] else ""))
+    for st in report["stray"]:
+        print(f"  stray file {st['file']}: {st['problem']}")
+    if report["gaps"]:
+        print(f"  no file for cue(s): {', '.join(str(n) for n in report['gaps'])}")
+    print("OK" if report["ok"] else "FAILED")
+
 
 def sanity_log_tools() -> None:
     log("tooling check:")
@@ -567,33 +3128,79 @@ def sanity_log_tools() -> None:
     log(f"  aplaymidi: {'ok' if APLAYMIDI else 'missing'}")
     log(f"  mpv:       {'ok' if MPV else 'missing'}")
     log(f"  mpg123:    {'ok' if MPG123 else 'missing'}")
+    log(f"  ffmpeg:    {'ok' if FFMPEG else 'missing'}")
 
 
 def main() -> None:
     ensure_dirs()
     sanity_log_tools()
+    realtime_setup()  # before any thread starts, so the rest inherit the locked/pinned setup
+    signal.signal(signal.SIGUSR1, _flight_signal)  # kill -USR1 <pid> dumps the flight recorder
+    threading.excepthook = _flight_thread_crash
 
     # stage-safe boot behavior
     force_startup_defaults()
 
-    threading.Thread(target=control_watcher, daemon=True).start()
+    if not activate_show(load_cfg().get("show", "")):
+        activate_show("")  # broken show file: fall back to the N_workcue files
 
-    cfg = load_cfg()
-    port = find_input_port(cfg)
-    log(f"listening on MIDI input: {port}")
+    threading.Thread(target=control_watcher, daemon=True).start()
+    open_outputs(load_cfg())
+    global _mirror
+    if _mirror is None:  # survives main() restarts: same socket, same epoch
+        _mirror = mirror_from_cfg(load_cfg())
+
+    global _midi_inputs
+    inputs = midi_inputs_from_cfg(load_cfg())
+    _midi_inputs = inputs
+
+    with MidiMux() as mux:
+        ports = midi_input_names()
+        if not any([mux.open(i, ports) for i in inputs]):
+            raise RuntimeError(f"no configured MIDI input could be opened; available: {ports}")
+        write_state(False, None)
 
-    with mido.open_input(port) as inp:
-        for msg in inp:
-            try:
-                handle_midi(msg, load_cfg())
-            except Exception as e:
-                log(f"error handling {msg}: {e}")
+        next_refresh = time.monotonic() + MIDI_REOPEN_SEC
+        while True:
+            batch = mux.poll(MIDI_REOPEN_SEC)
+            if time.monotonic() >= next_refresh:
+                mux.refresh(inputs)
+                next_refresh = time.monotonic() + MIDI_REOPEN_SEC
+            cfg = load_cfg()
+            for inp, msg, t_rx in batch:
+                inp.stats["queue_ms_max"] = max(inp.stats["queue_ms_max"],
+                                                round((time.monotonic() - t_rx) * 1000.0, 3))
+                try:
+                    handle_midi(msg, cfg, inp)
+                except Exception as e:
+                    inp.stats["errors"] += 1
+                    flight("error", f"midi: {e}")
+                    log(f"error handling {msg} from {inp.name}: {e}", level="error", key="midi_error")
 
 
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="MIDI cue engine")
+    ap.add_argument("--check", action="store_true", help="check every cue of the show and exit")
+    ap.add_argument("--json", action="store_true", help="with --check: print the report as JSON")
+    ap.add_argument("--no-timing", action="store_true", help="with --check: skip start latency")
+    args = ap.parse_args()
+    if args.check:
+        if args.json:
+            _log_out = sys.stderr
+        check = show_check(load_cfg(), timing=not args.no_timing)
+        log_flush()
+        if args.json:
+            print(json.dumps(check, indent=2))
+        else:
+            print_show_check(check)
+        sys.exit(0 if check["ok"] else 1)
+
     while True:
         try:
             main()
         except Exception as e:
-            log(f"midicues fatal: {e}")
+            flight("fatal", str(e))
+            log(f"midicues fatal: {e}", level="error")
+            flight_dump("crash")
+            log_flush()
             time.sleep(2)
@@ -1,29 +1,124 @@
 #!/usr/bin/env python3
 # /home/fc/showbox/webapp/app.py
 # ShowBox web UI (updated: jukebox accepts mp3/wav/mid)
+import glob
+import gzip
+import hashlib
 import json
+import math
 import os
+import queue
 import random
 import re
+import shutil
+import signal
+import struct
+import subprocess
+import sys
+import tarfile
 import tempfile
+import threading
+import time
+import uuid
+import wave
+from array import array
+from collections import deque
 from pathlib import Path
-from flask import Flask, request, redirect, url_for, flash, render_template_string, send_from_directory
+from flask import Flask, Response, request, redirect, url_for, flash, render_template_string, send_from_directory, send_file, abort, jsonify, g
 
-BASE = Path("/home/fc/showbox")
+try:
+    import mido  # optional: MIDI file durations in the media index
+except ImportError:
+    mido = None
+
+BASE = Path(os.environ.get("SHOWBOX_BASE", "/home/fc/showbox"))
 CUES_DIR = BASE / "cues"
 JUKE_SONGS = BASE / "jukebox" / "songs"
 JUKE_LISTS = BASE / "jukebox" / "playlists"
 CFG_PATH = BASE / "config.json"
 STATE_PATH = BASE / "state.json"
 CONTROL_PATH = BASE / "control.json"
+INGEST_DIR = BASE / "cache" / "ingest"
+SHOWS_DIR = BASE / "shows"
+FLIGHT_DIR = BASE / "flight"
+
+# engine log levels, changed at runtime via the log_level control command
+LOG_LEVELS = ("debug", "info", "warning", "error")
 
 # Allow WAV, MP3, and MIDI files in jukebox
-ALLOWED_CUE_EXT = {".wav", ".mid", ".midi"}
+ALLOWED_CUE_EXT = {".wav", ".mp3", ".mid", ".midi"}
 ALLOWED_SONG_EXT = {".wav", ".mp3", ".mid", ".midi"}
 
-CUE_NAME_RE = re.compile(r"^(\d+)_workcue(\.(wav|mid|midi))$", re.IGNORECASE)
+CUE_NAME_RE = re.compile(r"^(\d+)_workcue(\.(wav|mp3|mid|midi))$", re.IGNORECASE)
+MAX_CUE_NUMBER = 999  # same limit as the engine and createcue
+
+# Audition (browser preview) of cues/songs
+AUDIO_EXT = {".wav", ".mp3"}
+PREVIEW_BITRATE = "64k"
+FFMPEG = shutil.which("ffmpeg")
+MPV = shutil.which("mpv")
+MPG123 = shutil.which("mpg123")
+
+# Cue generation jobs (createcue run in the background at idle priority)
+CREATECUE = Path(os.environ.get("SHOWBOX_CREATECUE", str(BASE / "tools" / "createcue")))
+CUE_JOB_WORKERS = int(os.environ.get("SHOWBOX_CUE_JOBS", "1"))
+CUE_JOB_HISTORY = 100
+CUE_JOB_TIMEOUT = 600
+# createcue prints one of these for every other file with the new cue's number it removed
+CUE_REPLACED_RE = re.compile(r"^removed (\S+) \(same cue number as ")
+IONICE = shutil.which("ionice")
+
+# Pre-show check: the engine's --check, run on demand (see docs/architecture.md)
+ENGINE = Path(os.environ.get("SHOWBOX_ENGINE", str(BASE / "player" / "midi_cues.py")))
+SHOW_CHECK_TIMEOUT = 300
+
+# Show packages: an uncompressed tar whose first member is MANIFEST.json (sha256 per file)
+SHOW_PKG_FORMAT = "showbox-show"
+SHOW_PKG_VERSION = 1
+SHOW_PKG_MANIFEST = "MANIFEST.json"
+SHOW_PKG_CHUNK = 256 * 1024
+SHOW_PKG_CFG_MAX = 1024 * 1024
+# The only config.json settings an import takes over. The rest (MIDI ports, outputs,
+# mirror peer, inputs, PCM cache, jukebox output) describe this machine and are kept.
+SHOW_PKG_CFG_KEYS = ("show",)
+SHOW_PKG_JUKEBOX_KEYS = ("play_mode", "playlist")
+
+# Waveform peaks: min/max per block, stored as int16 pairs at several resolutions
+PEAKS_MAGIC = b"SBPK"
+PEAKS_VERSION = 1
+PEAKS_BASE_BLOCK = 256      # frames per block at the finest level
+PEAKS_LEVEL_FACTOR = 4      # each coarser level merges this many blocks
+PEAKS_MIN_POINTS = 64       # stop adding levels below this many blocks
+PEAKS_TIMEOUT = 300         # seconds for one file's peaks child process
+DECODE_RATE = 22050         # compressed files are decoded to mono at this rate for peaks
+SILENCE_THRESHOLD = 100     # |sample| below this (about -50 dBFS) counts as silence
+# set when running behind nginx/apache so the front server sends files (sendfile) itself
+USE_X_SENDFILE = os.environ.get("SHOWBOX_WEB_X_SENDFILE", "").strip() in ("1", "true", "yes", "on")
+
+# Static assets are served locally (no CDN) so the UI works at venues without internet.
+# The stylesheet is committed under src/webapp/static/ and copied by scripts/install.sh;
+# its filename carries a version because it is served as immutable.
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+UI_CSS = "showbox-1.css"
+STATIC_MAX_AGE = 365 * 24 * 3600  # asset filenames are versioned, so cache "forever"
+GZIP_MIN_BYTES = 1024
+GZIP_TYPES = {"text/html", "text/css", "application/javascript", "application/json"}
+
+# Server settings (see docs/web-ui.md)
+WEB_HOST = os.environ.get("SHOWBOX_WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.environ.get("SHOWBOX_WEB_PORT", "8080"))
+WEB_THREADS = int(os.environ.get("SHOWBOX_WEB_THREADS", "8"))
+WEB_SERVER = os.environ.get("SHOWBOX_WEB_SERVER", "auto").strip().lower()  # auto | waitress | flask
 
-app = Flask(__name__)
+# Request tracing (Chrome/Perfetto JSON), shared with the engine's SHOWBOX_TRACE file
+_trace_env = os.environ.get("SHOWBOX_TRACE", "").strip()
+TRACE_PATH = (None if _trace_env in ("", "0", "false", "no", "off")
+              else BASE / "trace" / "showbox-trace.json" if _trace_env in ("1", "true", "yes", "on")
+              else Path(_trace_env))
+TRACE_FLUSH_SEC = 0.5
+
+app = Flask(__name__, static_folder=None)
+app.config["USE_X_SENDFILE"] = USE_X_SENDFILE
 app.secret_key = "change-me"  # fine for LAN; rotate if exposed externally
 
 # HTML template (includes Now Playing UI and client-side polling for /state)
@@ -34,7 +129,7 @@ TEMPLATE = """
   <meta charset="utf-8"/>
   <meta name="viewport" content="width=device-width, initial-scale=1"/>
   <title>ShowBox</title>
-  <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css" rel="stylesheet">
+  {% if ui_css %}<link href="{{ url_for('static_asset', filename=ui_css) }}" rel="stylesheet">{% endif %}
   <style>
     body { background: #0b0f14; color: #e9eef5; }
     .card { background: #111824; border: 1px solid #1f2a3a; }
@@ -69,6 +164,14 @@ TEMPLATE = """
     </div>
   </div>
 
+  <div id="audition-bar" class="card p-2 mb-3" style="display:none">
+    <div class="d-flex align-items-center gap-2">
+      <span class="muted">Audition</span>
+      <span id="audition-name" class="mono"></span>
+    </div>
+    <audio id="audition" controls preload="none" style="width:100%"></audio>
+  </div>
+
   {% with messages = get_flashed_messages() %}
     {% if messages %}
       <div class="alert alert-info">
@@ -81,7 +184,7 @@ TEMPLATE = """
     <div class="col-lg-6">
       <div class="card p-3">
         <h5 class="mb-2">Work Cues</h5>
-        <div class="muted mb-3">Filename must be <span class="mono">N_workcue.wav</span> or <span class="mono">N_workcue.mid</span></div>
+        <div class="muted mb-3">Any {{ cue_exts }} file; saved as <span class="mono">NN_workcue.&lt;ext&gt;</span>, replacing other files for that cue number</div>
 
         <form class="row g-2 mb-3" method="post" action="{{ url_for('upload_cue') }}" enctype="multipart/form-data">
           <div class="col-12">
@@ -97,13 +200,23 @@ TEMPLATE = """
 
         <div class="table-responsive">
           <table class="table table-dark table-sm align-middle">
-            <thead><tr><th>File</th><th>Type</th><th class="text-end">Actions</th></tr></thead>
+            <thead><tr><th>File</th><th>Type</th><th>Length</th><th class="text-end">Actions</th></tr></thead>
             <tbody>
               {% for f in cues %}
+                {% set meta = media_index.get('cue/' ~ f.name, {}) %}
                 <tr>
-                  <td class="mono">{{ f.name }}</td>
+                  <td class="mono">{{ f.name }}
+                    {% if f.suffix.lower() in audio_ext %}
+                      <canvas class="wave d-block" width="160" height="24" data-peaks="{{ url_for('api_peaks', kind='cue', filename=f.name) }}"></canvas>
+                    {% endif %}
+                  </td>
                   <td><span class="badge">{{ f.suffix[1:] }}</span></td>
+                  <td class="mono" title="{% if meta.lead_silence %}lead silence {{ meta.lead_silence }}s{% endif %}{% if meta.get('peak_dbfs') is not none %}, peak {{ meta.peak_dbfs }} dBFS{% endif %}">{{ fmt_duration(meta.get('duration')) }}</td>
                   <td class="text-end">
+                    {% if f.suffix.lower() in audio_ext %}
+                      <button class="btn btn-sm btn-outline-light audition" type="button"
+                        data-src="{{ url_for('audition_media', kind='cue', filename=f.name) }}" data-name="{{ f.name }}">Play</button>
+                    {% endif %}
                     <a class="btn btn-sm btn-outline-light" href="{{ url_for('download_cue', filename=f.name) }}">Download</a>
                     <form class="d-inline" method="post" action="{{ url_for('delete_cue', filename=f.name) }}">
                       <button class="btn btn-sm btn-outline-danger" type="submit">Delete</button>
@@ -111,12 +224,67 @@ TEMPLATE = """
                   </td>
                 </tr>
               {% else %}
-                <tr><td colspan="3" class="muted">No cues yet.</td></tr>
+                <tr><td colspan="4" class="muted">No cues yet.</td></tr>
               {% endfor %}
             </tbody>
           </table>
         </div>
 
+        <h6 class="mt-3 mb-2">Show</h6>
+        <div class="muted mb-2">Active: <span id="show-name" class="mono">{{ cfg.get('show') or '(cue files)' }}</span>
+          <span id="show-error" class="text-danger"></span></div>
+        <div class="row g-2 mb-2">
+          <div class="col-7">
+            <form method="post" action="{{ url_for('select_show') }}">
+              <select class="form-select" name="show">
+                <option value="" {{ 'selected' if not cfg.get('show') else '' }}>(cue files)</option>
+                {% for sh in shows %}
+                  <option value="{{ sh.name }}" {{ 'selected' if sh.name == cfg.get('show') else '' }}>{{ sh.name }}</option>
+                {% endfor %}
+              </select>
+              <button class="btn btn-outline-light w-100 mt-2" type="submit">Load Show</button>
+            </form>
+          </div>
+          <div class="col-5">
+            <form method="post" action="{{ url_for('upload_show') }}" enctype="multipart/form-data">
+              <input class="form-control mb-2" type="file" name="file" accept=".json" required>
+              <button class="btn btn-outline-light w-100" type="submit">Upload Show</button>
+            </form>
+          </div>
+        </div>
+        <div class="d-flex gap-2 align-items-center mb-2">
+          <button class="btn btn-sm btn-outline-light text-nowrap" type="button" onclick="checkShow()">Check show</button>
+          <span class="muted small">decodes and start-times every cue, silently</span>
+        </div>
+        <div id="show-check" class="mono small"></div>
+
+        <h6 class="mt-3 mb-2">Create count-in cue</h6>
+        <form id="cue-job-form" class="row g-2 mb-2" onsubmit="submitCueJob(event)">
+          <div class="col-3"><input class="form-control mono" name="number" placeholder="cue #" required></div>
+          <div class="col-9"><input class="form-control" name="title" placeholder="song title" required></div>
+          <div class="col-3"><input class="form-control mono" name="bpm" placeholder="bpm" required></div>
+          <div class="col-3"><input class="form-control mono" name="beats" placeholder="beats" value="4"></div>
+          <div class="col-3 d-flex align-items-center"><label class="muted"><input type="checkbox" name="count" value="1"> spoken</label></div>
+          <div class="col-3"><button class="btn btn-primary w-100" type="submit">Create</button></div>
+        </form>
+        <div id="cue-jobs" class="mono small"></div>
+
+        <div class="muted mt-2">
+          MIDI inputs: <span id="midi-inputs" class="mono">—</span>
+        </div>
+        {% if cfg.get('mirror', {}).get('role', 'off') == 'backup' %}
+        <div class="d-flex gap-2 align-items-center mt-2">
+          <span class="muted">Hot standby:</span> <span id="mirror" class="mono">—</span>
+          <form method="post" action="{{ url_for('mirror_control', action='takeover') }}">
+            <button class="btn btn-sm btn-danger" type="submit">Take over</button>
+          </form>
+          <form method="post" action="{{ url_for('mirror_control', action='standby') }}">
+            <button class="btn btn-sm btn-outline-light" type="submit">Standby</button>
+          </form>
+        </div>
+        {% elif cfg.get('mirror', {}).get('role', 'off') == 'primary' %}
+        <div class="muted mt-2">Hot standby: <span id="mirror" class="mono">—</span></div>
+        {% endif %}
         <div class="muted mt-2">
           Current MIDI out port for MIDI files: <span class="mono">{{ cfg['midi_out_port'] }}</span>
         </div>
@@ -178,6 +346,18 @@ TEMPLATE = """
           </form>
         </div>
 
+        {% if cfg.get('outputs') %}
+        <form class="d-flex gap-2 mb-3" method="post" action="{{ url_for('set_jukebox_output') }}">
+          <select class="form-select form-select-sm" name="output">
+            <option value="" {{ 'selected' if not cfg['jukebox'].get('output') else '' }}>(default player)</option>
+            {% for name, spec in cfg['outputs'].items() if spec.get('type', 'audio') == 'audio' %}
+              <option value="{{ name }}" {{ 'selected' if name == cfg['jukebox'].get('output') else '' }}>{{ name }}</option>
+            {% endfor %}
+          </select>
+          <button class="btn btn-sm btn-outline-light text-nowrap" type="submit">Jukebox output</button>
+        </form>
+        {% endif %}
+
         <div class="row g-2 mb-3">
           <div class="col-7">
             <form method="post" action="{{ url_for('set_playlist') }}">
@@ -200,12 +380,22 @@ TEMPLATE = """
         <h6 class="mb-2">Songs</h6>
         <div class="table-responsive">
           <table class="table table-dark table-sm align-middle">
-            <thead><tr><th>File</th><th class="text-end">Actions</th></tr></thead>
+            <thead><tr><th>File</th><th>Length</th><th class="text-end">Actions</th></tr></thead>
             <tbody>
               {% for s in songs %}
+                {% set meta = media_index.get('song/' ~ s.name, {}) %}
                 <tr>
-                  <td class="mono">{{ s.name }}</td>
+                  <td class="mono">{{ s.name }}
+                    {% if s.suffix.lower() in audio_ext %}
+                      <canvas class="wave d-block" width="160" height="24" data-peaks="{{ url_for('api_peaks', kind='song', filename=s.name) }}"></canvas>
+                    {% endif %}
+                  </td>
+                  <td class="mono">{{ fmt_duration(meta.get('duration')) }}</td>
                   <td class="text-end">
+                    {% if s.suffix.lower() in audio_ext %}
+                      <button class="btn btn-sm btn-outline-light audition" type="button"
+                        data-src="{{ url_for('audition_media', kind='song', filename=s.name) }}" data-name="{{ s.name }}">Play</button>
+                    {% endif %}
                     <form class="d-inline" method="post" action="{{ url_for('playlist_add') }}">
                       <input type="hidden" name="song" value="{{ s.name }}">
                       <button class="btn btn-sm btn-outline-light" type="submit">Add to Playlist</button>
@@ -216,7 +406,7 @@ TEMPLATE = """
                   </td>
                 </tr>
               {% else %}
-                <tr><td colspan="2" class="muted">No songs yet.</td></tr>
+                <tr><td colspan="3" class="muted">No songs yet.</td></tr>
               {% endfor %}
             </tbody>
           </table>
@@ -241,12 +431,117 @@ TEMPLATE = """
     </div>
   </div>
 
+  <div class="card p-3 mt-3">
+    <h5 class="mb-2">Show Package</h5>
+    <div class="muted mb-3">Cues, playlists and config in one archive with a checksum manifest. Unchanged files are skipped on import.</div>
+    <div class="row g-2">
+      <div class="col-lg-4 d-flex gap-2">
+        <a class="btn btn-outline-light w-100" href="{{ url_for('show_export') }}">Export show</a>
+        <a class="btn btn-outline-light w-100" href="{{ url_for('show_export', songs=1) }}">Export + songs</a>
+      </div>
+      <div class="col-lg-5">
+        <input id="show-file" class="form-control" type="file" accept=".tar,.gz,.tgz">
+      </div>
+      <div class="col-lg-3 d-flex gap-2 align-items-center">
+        <label class="muted"><input id="show-replace" type="checkbox"> replace cues</label>
+        <button class="btn btn-primary w-100" type="button" onclick="importShow()">Import</button>
+      </div>
+    </div>
+    <div id="show-result" class="muted mono mt-2"></div>
+  </div>
+
+  <div class="card p-3 mt-3">
+    <div class="d-flex justify-content-between align-items-center mb-2">
+      <h5 class="mb-0">Flight Recorder</h5>
+      <div class="d-flex gap-2">
+        <form class="d-flex gap-2" method="post" action="{{ url_for('set_log_level') }}">
+          <select class="form-select form-select-sm" name="level" title="engine log level">
+            {% for lv in log_levels %}<option value="{{ lv }}" {{ 'selected' if lv == 'info' else '' }}>{{ lv }}</option>{% endfor %}
+          </select>
+          <button class="btn btn-sm btn-outline-light text-nowrap" type="submit">Set log level</button>
+        </form>
+        <form method="post" action="{{ url_for('flight_capture') }}">
+          <button class="btn btn-sm btn-outline-light text-nowrap" type="submit">Capture now</button>
+        </form>
+      </div>
+    </div>
+    <div class="muted mb-2">The engine keeps the last 4096 MIDI messages, debounce decisions, cue actions and player starts/stops. Dumps are written on a crash, on <span class="mono">kill -USR1</span> or by Capture.</div>
+    <ul class="mono mb-0">
+      {% for d in flight_dumps %}
+        <li><a href="{{ url_for('flight_view', filename=d.name) }}">{{ d.name }}</a></li>
+      {% else %}
+        <li class="muted">No dumps yet.</li>
+      {% endfor %}
+    </ul>
+  </div>
+
   <div class="mt-3 muted">
     Tip: Jukebox playback is controlled by the cue engine (mode switch). This UI edits files/config only.
   </div>
 </div>
 
 <script>
+function audition(url, name){
+  // low-bitrate preview by default; the server falls back to the original file
+  const a = document.getElementById('audition');
+  document.getElementById('audition-bar').style.display = '';
+  document.getElementById('audition-name').textContent = name;
+  a.src = url + '?preview=1';
+  a.play();
+}
+
+// file names come from uploads: keep them in data-* attributes, never in inline JS
+document.addEventListener('click', e => {
+  const b = e.target.closest('button.audition');
+  if(b) audition(b.dataset.src, b.dataset.name);
+});
+
+async function drawWave(c){
+  try{
+    const r = await fetch(c.dataset.peaks + '?format=json&points=' + c.width);
+    if(r.status !== 200) return;
+    const p = await r.json();
+    const g = c.getContext('2d'), h = c.height / 2, n = p.min.length;
+    g.fillStyle = '#3d6fb8';
+    for(let x = 0; x < c.width; x++){
+      const a = Math.floor(x * n / c.width), b = Math.max(a + 1, Math.floor((x + 1) * n / c.width));
+      let lo = 0, hi = 0;
+      for(let i = a; i < b && i < n; i++){ lo = Math.min(lo, p.min[i]); hi = Math.max(hi, p.max[i]); }
+      const top = h - hi / 32768 * h, bot = h - lo / 32768 * h;
+      g.fillRect(x, top, 1, Math.max(1, bot - top));
+    }
+  }catch(e){
+    console.log('peaks err', e);
+  }
+}
+
+// only fetch peaks for rows scrolled into view (large libraries)
+window.addEventListener('load', () => {
+  const io = new IntersectionObserver(entries => {
+    for(const e of entries){
+      if(e.isIntersecting){ io.unobserve(e.target); drawWave(e.target); }
+    }
+  });
+  document.querySelectorAll('canvas.wave').forEach(c => io.observe(c));
+});
+
+async function importShow(){
+  const f = document.getElementById('show-file').files[0];
+  const out = document.getElementById('show-result');
+  if(!f){ out.textContent = 'choose a show package first'; return; }
+  const replace = document.getElementById('show-replace').checked ? '1' : '0';
+  out.textContent = 'importing…';
+  try{
+    const r = await fetch('/show/import?replace=' + replace, {method: 'POST', body: f,
+      headers: {'Content-Type': 'application/x-tar'}});
+    const j = await r.json();
+    out.textContent = j.error ? ('import failed: ' + j.error + (j.summary ? ' (' + j.summary + ')' : '')) : j.summary;
+    if(!j.error) setTimeout(() => location.reload(), 1500);
+  }catch(e){
+    out.textContent = 'import failed: ' + e;
+  }
+}
+
 async function refreshState(){
   try{
     const r = await fetch('/state');
@@ -260,6 +555,23 @@ async function refreshState(){
     } else {
       now.textContent = '—';
     }
+    if(s.midi_inputs){
+      document.getElementById('midi-inputs').textContent = s.midi_inputs.map(i =>
+        `${i.name} ${i.connected ? 'ok' : 'offline'} rx ${i.received} act ${i.actions} deb ${i.debounced}`).join(' | ');
+    }
+    const mirror = document.getElementById('mirror');
+    if(mirror && s.mirror && s.mirror.error){
+      mirror.textContent = 'not running: ' + s.mirror.error;
+    } else if(mirror && s.mirror){
+      const m = s.mirror;
+      mirror.textContent = `${m.role} ${m.active ? 'ACTIVE' : 'standby'} peer ${m.peer || '—'} seq ${m.seq}`
+        + (m.role === 'primary' ? ` lag ${m.lag_ms ?? '—'} ms rtt ${m.rtt_ms ?? '—'} ms unacked ${m.unacked}`
+                                : ` heard ${m.peer_age_ms ?? '—'} ms ago gaps ${m.gaps}`);
+    }
+    if(s.show){
+      document.getElementById('show-name').textContent = s.show.name || '(cue files)';
+      document.getElementById('show-error').textContent = s.show.error ? ' ' + s.show.error : '';
+    }
     const startBtn = document.getElementById('jb-start');
     const stopBtn = document.getElementById('jb-stop');
     if(startBtn && stopBtn){
@@ -270,13 +582,124 @@ async function refreshState(){
     console.log('state refresh err', e);
   }
 }
+async function submitCueJob(ev){
+  ev.preventDefault();
+  const body = new FormData(ev.target);
+  const r = await fetch('/api/cue-jobs', {method: 'POST', body});
+  const j = await r.json();
+  if(j.error) alert(j.error);
+  refreshJobs();
+}
+
+async function checkShow(){
+  const el = document.getElementById('show-check');
+  el.textContent = 'checking…';
+  try{
+    const r = await fetch('/api/show-check');
+    const j = await r.json();
+    if(j.error){ el.textContent = 'check failed: ' + j.error; return; }
+    const s = j.summary;
+    const lines = [[`${j.show}: ${s.ok} ok, ${s.warning} warning, ${s.error} error (${s.elapsed_s}s)`, '']];
+    for(const e of j.errors) lines.push(['error: ' + e, 'text-danger']);
+    for(const c of j.cues){
+      const t = c.warm_ms === null ? '' : ` cold ${c.cold_ms} ms, warm ${c.warm_ms} ms`;
+      lines.push([`${String(c.cue).padStart(2, '0')} ${c.file}: ${c.status}${t}`,
+                  c.status === 'error' ? 'text-danger' : (c.status === 'warning' ? 'text-warning' : 'muted')]);
+      for(const p of c.problems) lines.push([`   ${p.level}: ${p.text}`, 'muted']);
+    }
+    for(const o of j.outputs) if(o.status !== 'ok') lines.push([`output ${o.name}: ${o.status === 'skipped' ? 'not opened, ' : ''}${o.error}`,
+                                                            o.status === 'skipped' ? 'muted' : 'text-danger']);
+    for(const f of j.stray) lines.push([`stray ${f.file}: ${f.problem}`, 'text-warning']);
+    if(j.gaps.length) lines.push(['no file for cue(s): ' + j.gaps.join(', '), 'muted']);
+    el.replaceChildren(...lines.map(([t, cls]) => {
+      const d = document.createElement('div');
+      d.className = cls;
+      d.textContent = t;
+      return d;
+    }));
+  }catch(e){
+    el.textContent = 'check failed: ' + e;
+  }
+}
+
+async function refreshJobs(){
+  const el = document.getElementById('cue-jobs');
+  if(!el) return;
+  try{
+    const r = await fetch('/api/cue-jobs');
+    if(!r.ok) return;
+    const jobs = (await r.json()).slice(0, 5);
+    el.replaceChildren(...jobs.map(j => {
+      const d = document.createElement('div');
+      d.className = j.status === 'failed' ? 'text-danger' : (j.status === 'done' ? '' : 'muted');
+      d.textContent = `${j.params.number} ${j.params.title} @${j.params.bpm}: ${j.status} - ${j.progress}`;
+      return d;
+    }));
+  }catch(e){
+    console.log('jobs refresh err', e);
+  }
+}
+
 setInterval(refreshState, 2000);
+setInterval(refreshJobs, 2000);
+window.addEventListener('load', refreshJobs);
 window.addEventListener('load', refreshState);
 </script>
 </body>
 </html>
 """
 
+FLIGHT_TEMPLATE = """
+<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8"/>
+  <meta name="viewport" content="width=device-width, initial-scale=1"/>
+  <title>ShowBox - {{ name }}</title>
+  {% if ui_css %}<link href="{{ url_for('static_asset', filename=ui_css) }}" rel="stylesheet">{% endif %}
+  <style>
+    body { background: #0b0f14; color: #e9eef5; }
+    .muted { color: #9fb0c7; }
+    .mono { font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, "Liberation Mono", "Courier New", monospace; }
+    a { color: #9ad0ff; }
+    tr.ev-error td, tr.ev-fatal td { color: #ff8a8a; }
+    tr.ev-debounced td { color: #9fb0c7; }
+  </style>
+</head>
+<body>
+<div class="container py-4">
+  <div class="d-flex justify-content-between align-items-center mb-3">
+    <div>
+      <h4 class="mb-0 mono">{{ name }}</h4>
+      <div class="muted">reason <span class="mono">{{ doc.reason }}</span>,
+        {{ doc.events|length }} events, cue <span class="mono">{{ doc.current_cue }}</span>,
+        show <span class="mono">{{ doc.show }}</span></div>
+    </div>
+    <div class="d-flex gap-2">
+      <a class="btn btn-sm btn-outline-light" href="{{ url_for('flight_view', filename=name, format='json') }}">JSON</a>
+      <a class="btn btn-sm btn-outline-light" href="{{ url_for('index') }}">Back</a>
+    </div>
+  </div>
+  <table class="table table-dark table-sm mono">
+    <thead><tr><th class="text-end">ms before dump</th><th class="text-end">+ms</th><th>Event</th><th>Detail</th></tr></thead>
+    <tbody>
+      {% set ns = namespace(prev=None) %}
+      {% for e in doc.events %}
+        <tr class="ev-{{ e.event }}">
+          <td class="text-end">{{ '%.1f'|format(e.ago_ms) }}</td>
+          <td class="text-end">{{ '%.1f'|format((e.t - ns.prev) * 1000) if ns.prev is not none else '' }}</td>
+          <td>{{ e.event }}</td>
+          <td>{{ e.detail if e.detail is not none else '' }}</td>
+        </tr>
+        {% set ns.prev = e.t %}
+      {% endfor %}
+    </tbody>
+  </table>
+</div>
+</body>
+</html>
+"""
+
 # ---------- Helpers for server-side operations ----------
 
 def load_cfg():
@@ -287,12 +710,25 @@ def load_cfg():
             "jukebox": {"play_mode": "random", "playlist": "default.json"}
         }
         CFG_PATH.parent.mkdir(parents=True, exist_ok=True)
-        CFG_PATH.write_text(json.dumps(default, indent=2))
+        save_cfg(default)
         return default
     return json.loads(CFG_PATH.read_text())
 
+def write_json_file(path: Path, obj):
+    # write + rename: readers (the engine, another request) never see a truncated file
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.stem}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as fh:
+            fh.write(json.dumps(obj, indent=2))
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
 def save_cfg(cfg):
-    CFG_PATH.write_text(json.dumps(cfg, indent=2))
+    # the engine re-reads config.json on every MIDI event; a truncated file
+    # would make it fall back to defaults
+    write_json_file(CFG_PATH, cfg)
 
 def safe_filename(name: str) -> str:
     return os.path.basename(name).replace("/", "_").replace("\\", "_")
@@ -318,16 +754,15 @@ def load_playlist(name: str):
         return {"name": name, "tracks": []}
 
 def save_playlist(name: str, data: dict):
-    p = JUKE_LISTS / safe_filename(name)
-    p.write_text(json.dumps(data, indent=2))
+    write_json_file(JUKE_LISTS / safe_filename(name), data)
 
 # Atomic write for control.json
-def write_control(cmd: str):
+def write_control(cmd: str, **args):
     BASE.mkdir(parents=True, exist_ok=True)
     fd, tmp = tempfile.mkstemp(dir=str(BASE))
     try:
         with os.fdopen(fd, "w") as fh:
-            fh.write(json.dumps({"cmd": cmd}))
+            fh.write(json.dumps({"cmd": cmd, **args}))
         tmp_path = Path(tmp)
         try:
             tmp_path.replace(CONTROL_PATH)
@@ -336,8 +771,802 @@ def write_control(cmd: str):
     except Exception as e:
         flash(f"control write failed: {e}")
 
+def media_dir(kind: str) -> Path | None:
+    return {"cue": CUES_DIR, "song": JUKE_SONGS}.get(kind)
+
+# ---------- Ingest cache ----------
+# Derived artifacts (peaks, browser previews) are built once per file when it is
+# uploaded or changed, under INGEST_DIR/<kind>/. One worker thread queues them; the
+# decoding and the peak reduction run in child processes at idle CPU and I/O
+# priority, so they take no CPU from the engine or GIL time from request threads.
+
+_ingest_queue = queue.Queue()
+_ingest_pending = set()
+_ingest_lock = threading.Lock()
+_ingest_thread = None
+
+def ingest_path(kind: str, name: str, suffix: str) -> Path:
+    return INGEST_DIR / kind / f"{name}{suffix}"
+
+def is_fresh(artifact: Path, src: Path) -> bool:
+    try:
+        return artifact.stat().st_mtime >= src.stat().st_mtime
+    except OSError:
+        return False
+
+def preview_cmd(src: Path, dst: Path):
+    if FFMPEG:
+        return [FFMPEG, "-nostdin", "-loglevel", "error", "-y", "-i", str(src),
+                "-vn", "-ac", "1", "-b:a", PREVIEW_BITRATE, "-f", "mp3", str(dst)]
+    if MPV:
+        return [MPV, "--no-video", "--really-quiet", str(src), f"--o={dst}", "--of=mp3",
+                "--oac=libmp3lame", f"--oacopts=b={PREVIEW_BITRATE}", "--audio-channels=mono"]
+    return None
+
+def build_preview(kind: str, src: Path) -> None:
+    dst = ingest_path(kind, src.name, ".preview.mp3")
+    if src.suffix.lower() not in AUDIO_EXT or is_fresh(dst, src):
+        return
+    tmp = dst.with_name(dst.name + ".part")
+    cmd = preview_cmd(src, tmp)
+    if not cmd:
+        return
+    if IONICE:
+        cmd = [IONICE, "-c3"] + cmd
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        r = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                           preexec_fn=idle_priority)
+        if r.returncode == 0 and tmp.exists():
+            os.replace(tmp, dst)
+        else:
+            print(f"preview failed for {src.name}: {r.stderr.decode(errors='replace').strip()}", flush=True)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+# ---- Waveform peaks + duration index ----
+
+_media_index = None  # "<kind>/<name>" -> metadata, mirrors INGEST_DIR/index.json
+_media_index_lock = threading.Lock()
+
+def media_index_path() -> Path:
+    return INGEST_DIR / "index.json"
+
+def load_media_index() -> dict:
+    global _media_index
+    with _media_index_lock:
+        if _media_index is None:
+            try:
+                _media_index = json.loads(media_index_path().read_text())
+            except Exception:
+                _media_index = {}
+        return dict(_media_index)
+
+def update_media_index(key: str, entry: dict | None) -> None:
+    global _media_index
+    load_media_index()
+    with _media_index_lock:
+        if entry is None:
+            _media_index.pop(key, None)
+        else:
+            _media_index[key] = entry
+        p = media_index_path()
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(p.name + ".tmp")
+        tmp.write_text(json.dumps(_media_index, indent=1, sort_keys=True))
+        os.replace(tmp, p)
+
+def index_entry_fresh(entry: dict | None, src: Path) -> bool:
+    if not entry:
+        return False
+    try:
+        st = src.stat()
+    except OSError:
+        return False
+    return entry.get("mtime_ns") == st.st_mtime_ns and entry.get("size") == st.st_size
+
+def pcm_stream(src: Path):
+    """Yield (rate, channels, iterator of int16 arrays) for an audio file, or None."""
+    if src.suffix.lower() == ".wav":
+        try:
+            w = wave.open(str(src), "rb")
+        except (wave.Error, EOFError):
+            w = None  # e.g. WAVE_FORMAT_EXTENSIBLE / float: let a decoder handle it
+        if w is not None and w.getsampwidth() == 2:
+            def frames():
+                with w:
+                    while True:
+                        raw = w.readframes(65536)
+                        if not raw:
+                            return
+                        a = array("h")
+                        a.frombytes(raw)
+                        if sys.byteorder == "big":
+                            a.byteswap()
+                        yield a
+            return w.getframerate(), w.getnchannels(), frames()
+        if w is not None:
+            w.close()
+
+    if FFMPEG:
+        cmd = [FFMPEG, "-nostdin", "-loglevel", "error", "-i", str(src),
+               "-ac", "1", "-ar", str(DECODE_RATE), "-f", "s16le", "-"]
+    elif MPG123 and src.suffix.lower() == ".mp3":
+        cmd = [MPG123, "-q", "-m", "-s", "-r", str(DECODE_RATE), "-e", "s16", str(src)]
+    else:
+        return None
+
+    def decoded():
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                preexec_fn=lambda: os.nice(15))
+        try:
+            while True:
+                raw = proc.stdout.read(131072)
+                if not raw:
+                    break
+                a = array("h")
+                a.frombytes(raw[: len(raw) - (len(raw) % 2)])
+                if sys.byteorder == "big":
+                    a.byteswap()
+                yield a
+        finally:
+            proc.stdout.close()
+            proc.wait()
+    return DECODE_RATE, 1, decoded()
+
+def compute_peaks(rate: int, channels: int, chunks) -> tuple[list, int, dict]:
+    """Min/max per PEAKS_BASE_BLOCK frames (all channels folded together), then coarser levels."""
+    step = PEAKS_BASE_BLOCK * channels
+    mins, maxs = array("h"), array("h")
+    total = 0
+    lead = None
+    carry = array("h")
+    for chunk in chunks:
+        if carry:
+            carry.extend(chunk)
+            chunk, carry = carry, array("h")
+        usable = len(chunk) - (len(chunk) % step)
+        for i in range(0, usable, step):
+            block = chunk[i:i + step]
+            lo, hi = min(block), max(block)
+            mins.append(lo)
+            maxs.append(hi)
+            if lead is None and max(hi, -lo) >= SILENCE_THRESHOLD:
+                lead = len(mins) - 1
+        carry = chunk[usable:]
+        total += usable
+    if carry:
+        mins.append(min(carry))
+        maxs.append(max(carry))
+        if lead is None and max(maxs[-1], -mins[-1]) >= SILENCE_THRESHOLD:
+            lead = len(mins) - 1
+        total += len(carry)
+
+    frames = total // max(1, channels)
+    levels = [(PEAKS_BASE_BLOCK, mins, maxs)]
+    while len(levels[-1][1]) > PEAKS_MIN_POINTS:
+        spb, lmins, lmaxs = levels[-1]
+        f = PEAKS_LEVEL_FACTOR
+        nmins = array("h", (min(lmins[i:i + f]) for i in range(0, len(lmins), f)))
+        nmaxs = array("h", (max(lmaxs[i:i + f]) for i in range(0, len(lmaxs), f)))
+        levels.append((spb * f, nmins, nmaxs))
+
+    peak = max(max(maxs, default=0), -min(mins, default=0))
+    info = {
+        "sample_rate": rate,
+        "channels": channels,
+        "frames": frames,
+        "duration": round(frames / rate, 3) if rate else None,
+        "lead_silence": round((lead if lead is not None else len(mins)) * PEAKS_BASE_BLOCK / rate, 3) if rate else None,
+        "peak_dbfs": round(20 * math.log10(peak / 32768), 1) if peak > 0 else None,
+    }
+    return levels, frames, info
+
+def write_peaks(dst: Path, rate: int, frames: int, levels: list) -> None:
+    # Layout (little-endian):
+    #   header: magic "SBPK", u16 version, u16 level count, u32 sample rate, u64 frames
+    #   per level: u32 frames per block, u32 block count
+    #   then per level: block count * (i16 min, i16 max) pairs
+    tmp = dst.with_name(dst.name + ".part")
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    with open(tmp, "wb") as fh:
+        fh.write(struct.pack("<4sHHIQ", PEAKS_MAGIC, PEAKS_VERSION, len(levels), rate, frames))
+        for spb, mins, _ in levels:
+            fh.write(struct.pack("<II", spb, len(mins)))
+        for _, mins, maxs in levels:
+            pairs = array("h", bytes(4 * len(mins)))
+            pairs[0::2] = mins
+            pairs[1::2] = maxs
+            if sys.byteorder == "big":
+                pairs.byteswap()
+            fh.write(pairs.tobytes())
+    os.replace(tmp, dst)
+
+def read_peaks(path: Path) -> dict:
+    data = path.read_bytes()
+    magic, version, nlevels, rate, frames = struct.unpack_from("<4sHHIQ", data, 0)
+    if magic != PEAKS_MAGIC or version != PEAKS_VERSION:
+        raise ValueError("bad peaks file")
+    off = struct.calcsize("<4sHHIQ")
+    heads = [struct.unpack_from("<II", data, off + 8 * i) for i in range(nlevels)]
+    off += 8 * nlevels
+    levels = []
+    for spb, count in heads:
+        pairs = array("h")
+        pairs.frombytes(data[off:off + 4 * count])
+        if sys.byteorder == "big":
+            pairs.byteswap()
+        levels.append({"samples_per_block": spb, "min": pairs[0::2].tolist(), "max": pairs[1::2].tolist()})
+        off += 4 * count
+    return {"sample_rate": rate, "frames": frames, "levels": levels}
+
+def peaks_main(src: Path, dst: Path) -> int:
+    # child side of run_peaks (app.py --peaks SRC DST): info JSON on stdout, null if no audio
+    stream = pcm_stream(src)
+    info = None
+    if stream:
+        rate, channels, chunks = stream
+        levels, frames, info = compute_peaks(rate, channels, chunks)
+        if frames:
+            write_peaks(dst, rate, frames, levels)
+        else:
+            info = None
+    print(json.dumps(info))
+    return 0
+
+def run_peaks(src: Path, dst: Path) -> dict | None:
+    # The per-block reduction is Python code: run it in a child at idle priority
+    # rather than holding the GIL in the web server process.
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--peaks", str(src), str(dst)]
+    if IONICE:
+        cmd = [IONICE, "-c3"] + cmd
+    try:
+        r = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                           timeout=PEAKS_TIMEOUT, preexec_fn=idle_priority)
+    except subprocess.TimeoutExpired:
+        print(f"peaks timed out for {src.name}", flush=True)
+        return None
+    if r.returncode != 0:
+        print(f"peaks failed for {src.name}: {r.stderr.strip()}", flush=True)
+        return None
+    return json.loads(r.stdout or "null")
+
+def build_peaks(kind: str, src: Path) -> None:
+    key = f"{kind}/{src.name}"
+    if index_entry_fresh(load_media_index().get(key), src):
+        return
+    st = src.stat()
+    entry = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "duration": None, "peaks": False}
+    ext = src.suffix.lower()
+    if ext in AUDIO_EXT:
+        info = run_peaks(src, ingest_path(kind, src.name, ".peaks"))
+        if info:
+            entry.update(info)
+            entry["peaks"] = True
+    elif ext in (".mid", ".midi") and mido is not None:
+        try:
+            entry["duration"] = round(mido.MidiFile(str(src)).length, 3)
+        except Exception as e:
+            print(f"midi length failed for {src.name}: {e}", flush=True)
+    update_media_index(key, entry)
+
+def refresh_media_index(kind: str, files) -> dict:
+    # Queue ingest for new/changed files; returns the current index for rendering.
+    idx = load_media_index()
+    for p in files:
+        if not index_entry_fresh(idx.get(f"{kind}/{p.name}"), p):
+            queue_ingest(kind, p)
+    return idx
+
+INGEST_STEPS = [build_peaks, build_preview]
+
+def ingest_worker():
+    while True:
+        kind, name = _ingest_queue.get()
+        try:
+            src = media_dir(kind) / name
+            if src.is_file():
+                for step in INGEST_STEPS:
+                    step(kind, src)
+        except Exception as e:
+            print(f"ingest error for {kind}/{name}: {e}", flush=True)
+        finally:
+            with _ingest_lock:
+                _ingest_pending.discard((kind, name))
+
+def queue_ingest(kind: str, path: Path) -> None:
+    global _ingest_thread
+    with _ingest_lock:
+        if (kind, path.name) in _ingest_pending:
+            return
+        _ingest_pending.add((kind, path.name))
+        if _ingest_thread is None:
+            _ingest_thread = threading.Thread(target=ingest_worker, daemon=True)
+            _ingest_thread.start()
+    _ingest_queue.put((kind, path.name))
+
+def drop_ingest(kind: str, name: str) -> None:
+    d = INGEST_DIR / kind
+    if d.exists():
+        for p in d.glob(f"{glob.escape(name)}.*"):
+            p.unlink(missing_ok=True)
+    update_media_index(f"{kind}/{name}", None)
+
+def cue_number_ok(num: str) -> bool:
+    # ASCII digits only ("٣" passes isdigit) and a cue the engine can play
+    return num.isascii() and num.isdigit() and 1 <= int(num) <= MAX_CUE_NUMBER
+
+def cue_filename(num, ext: str) -> str:
+    return f"{int(num):02d}_workcue{ext}"  # the engine looks cues up as %02d
+
+def cue_shadows(num, keep: str) -> list:
+    # files with the same cue number under another name/extension would shadow `keep`
+    out = []
+    for p in list_files(CUES_DIR):
+        m = CUE_NAME_RE.match(p.name)
+        if m and int(m.group(1)) == int(num) and p.name != keep:
+            out.append(p)
+    return out
+
+def drop_cue_files(paths) -> None:
+    for p in paths:
+        p.unlink(missing_ok=True)
+        drop_ingest("cue", p.name)
+
+def fmt_duration(seconds) -> str:
+    if seconds is None:
+        return "—"
+    m, s = divmod(int(round(seconds)), 60)
+    return f"{m}:{s:02d}"
+
+# ---------- Cue generation jobs ----------
+# createcue runs on a small pool of worker threads, at nice 19 / SCHED_IDLE (and idle I/O
+# class) so rendering never competes with the cue engine. createcue itself renames the
+# finished WAV into CUES_DIR atomically.
+
+_cue_jobs = {}          # id -> job dict (insertion ordered, trimmed to CUE_JOB_HISTORY)
+_cue_jobs_lock = threading.Lock()
+_cue_job_queue = queue.Queue()
+_cue_job_threads = []
+
+def cue_job_params(src) -> dict:
+    num = str(src.get("number", "")).strip()
+    title = str(src.get("title", "")).strip()
+    if not cue_number_ok(num) or not title:
+        raise ValueError(f"cue number (1-{MAX_CUE_NUMBER}) and title are required")
+    try:
+        bpm = float(src.get("bpm", ""))
+        beats = int(src.get("beats") or 4)
+    except (TypeError, ValueError):
+        raise ValueError("bpm and beats must be numbers")
+    if not (20 <= bpm <= 400) or not (1 <= beats <= 16):
+        raise ValueError("bpm must be 20-400 and beats 1-16")
+    count = str(src.get("count", "")).lower() in ("1", "true", "on", "yes")
+    return {"number": f"{int(num):02d}", "title": title, "bpm": bpm, "beats": beats, "count": count}
+
+def cue_job_key(params: dict) -> str:
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+def idle_priority():
+    # runs in the child before exec
+    os.nice(19)
+    if hasattr(os, "sched_setscheduler") and hasattr(os, "SCHED_IDLE"):
+        try:
+            os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+        except OSError:
+            pass
+
+def run_cue_job(job: dict) -> None:
+    p = job["params"]
+    cmd = [sys.executable, str(CREATECUE), p["number"], p["title"], "tempo", str(p["bpm"]),
+           "--beats", str(p["beats"]), "--outdir", str(CUES_DIR)]
+    if p["count"]:
+        cmd.append("--count")
+    if IONICE:
+        cmd = [IONICE, "-c3"] + cmd
+    out = CUES_DIR / cue_filename(p["number"], ".wav")
+    # own session, so the watchdog also kills piper/sox children that hold stdout open
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                            preexec_fn=idle_priority, start_new_session=True)
+    timed_out = threading.Event()
+
+    def expire():
+        # fires even when createcue hangs without printing anything
+        timed_out.set()
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    watchdog = threading.Timer(CUE_JOB_TIMEOUT, expire)
+    watchdog.daemon = True
+    watchdog.start()
+    lines = []
+    try:
+        for line in proc.stdout:
+            line = line.strip()
+            if line:
+                lines.append(line)
+                with _cue_jobs_lock:
+                    job["progress"] = line
+        rc = proc.wait()
+    finally:
+        watchdog.cancel()
+    if timed_out.is_set():
+        lines.append(f"timed out after {CUE_JOB_TIMEOUT}s")
+    with _cue_jobs_lock:
+        job["log"] = lines[-20:]
+        job["finished"] = time.time()
+        if rc == 0 and out.is_file() and not timed_out.is_set():
+            # createcue removed any other file with this cue number; say which
+            replaced = [m.group(1) for m in map(CUE_REPLACED_RE.match, lines) if m]
+            job["status"] = "done"
+            job["output"] = out.name
+            job["replaced"] = replaced
+            job["progress"] = f"created {out.name}" + (f", replaced {', '.join(replaced)}" if replaced else "")
+        else:
+            job["status"] = "failed"
+            job["progress"] = lines[-1] if lines else f"createcue exited with {rc}"
+    if job["status"] == "done":
+        for name in job["replaced"]:
+            drop_ingest("cue", name)
+        queue_ingest("cue", out)
+
+def cue_job_worker():
+    while True:
+        job = _cue_job_queue.get()
+        with _cue_jobs_lock:
+            job["status"] = "running"
+            job["started"] = time.time()
+            job["progress"] = "starting"
+        try:
+            run_cue_job(job)
+        except Exception as e:
+            with _cue_jobs_lock:
+                job["status"] = "failed"
+                job["progress"] = str(e)
+                job["finished"] = time.time()
+
+def submit_cue_job(params: dict) -> tuple[dict, bool]:
+    """Queue a createcue job; returns (job, created). Identical requests share one job."""
+    key = cue_job_key(params)
+    out = CUES_DIR / cue_filename(params["number"], ".wav")
+    with _cue_jobs_lock:
+        for job in reversed(list(_cue_jobs.values())):
+            if job["key"] != key:
+                continue
+            if job["status"] in ("queued", "running"):
+                return dict(job), False
+            if job["status"] == "done" and out.is_file() and out.stat().st_mtime <= job["finished"] + 1:
+                return dict(job), False  # same cue already rendered and untouched since
+            break
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "key": key,
+            "params": params,
+            "status": "queued",
+            "progress": "queued",
+            "submitted": time.time(),
+            "started": None,
+            "finished": None,
+            "output": None,
+            "replaced": [],
+            "log": [],
+        }
+        _cue_jobs[job["id"]] = job
+        while len(_cue_jobs) > CUE_JOB_HISTORY:
+            oldest = next(iter(_cue_jobs))
+            if _cue_jobs[oldest]["status"] in ("queued", "running"):
+                break
+            del _cue_jobs[oldest]
+        if not _cue_job_threads:
+            for _ in range(max(1, CUE_JOB_WORKERS)):
+                t = threading.Thread(target=cue_job_worker, daemon=True)
+                t.start()
+                _cue_job_threads.append(t)
+        snapshot = dict(job)
+    _cue_job_queue.put(job)
+    return snapshot, True
+
+def list_cue_jobs() -> list:
+    with _cue_jobs_lock:
+        return [dict(j) for j in reversed(list(_cue_jobs.values()))]
+
+# ---------- Show packages ----------
+
+_sha_cache = {}  # str(path) -> (mtime_ns, size, sha256 hex)
+_sha_lock = threading.Lock()
+
+def file_sha256(path: Path) -> str:
+    st = path.stat()
+    with _sha_lock:
+        hit = _sha_cache.get(str(path))
+    if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+        return hit[2]
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(SHOW_PKG_CHUNK), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _sha_lock:
+        _sha_cache[str(path)] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+def show_package_files(include_songs: bool) -> list:
+    # (archive name, path) for everything that makes up the current show
+    files = [(f"cues/{p.name}", p) for p in list_files(CUES_DIR) if CUE_NAME_RE.match(p.name)]
+    files += [(f"jukebox/playlists/{p.name}", p) for p in list_files(JUKE_LISTS, {".json"})]
+    files += [(f"shows/{p.name}", p) for p in list_files(SHOWS_DIR, {".json"})]
+    if include_songs:
+        files += [(f"jukebox/songs/{p.name}", p) for p in list_files(JUKE_SONGS, ALLOWED_SONG_EXT)]
+    if CFG_PATH.is_file():
+        files.append(("config.json", CFG_PATH))
+    return files
+
+def show_package_target(name: str) -> Path | None:
+    # Map an archive member name to its destination; None if not allowed.
+    parts = name.split("/")
+    if name == "config.json":
+        return CFG_PATH
+    if len(parts) != 2 and len(parts) != 3:
+        return None
+    fname = parts[-1]
+    if not fname or fname != safe_filename(fname) or fname.startswith("."):
+        return None
+    if parts[0] == "cues" and len(parts) == 2 and CUE_NAME_RE.match(fname):
+        return CUES_DIR / fname
+    if parts[0] == "shows" and len(parts) == 2 and fname.endswith(".json"):
+        return SHOWS_DIR / fname
+    if parts[:2] == ["jukebox", "playlists"] and len(parts) == 3 and fname.endswith(".json"):
+        return JUKE_LISTS / fname
+    if parts[:2] == ["jukebox", "songs"] and len(parts) == 3 and Path(fname).suffix.lower() in ALLOWED_SONG_EXT:
+        return JUKE_SONGS / fname
+    return None
+
+def merge_show_cfg(cfg: dict, imported: dict) -> dict:
+    merged = dict(cfg)
+    for k in SHOW_PKG_CFG_KEYS:
+        if k in imported:
+            merged[k] = imported[k]
+    jb = imported.get("jukebox")
+    if isinstance(jb, dict):
+        merged["jukebox"] = dict(cfg.get("jukebox") or {},
+                                 **{k: jb[k] for k in SHOW_PKG_JUKEBOX_KEYS if k in jb})
+    merged["mode"] = "cues"  # stage-safe: an import never switches the engine into jukebox
+    return merged
+
+def tar_header(name: str, size: int, mtime: float) -> bytes:
+    ti = tarfile.TarInfo(name)
+    ti.size = size
+    ti.mtime = int(mtime)
+    ti.mode = 0o644
+    return ti.tobuf(format=tarfile.PAX_FORMAT)
+
+def stream_show_package(files: list):
+    """Yield an uncompressed tar of the show chunk by chunk (nothing buffered in memory or on disk)."""
+    entries = []
+    for arcname, path in files:
+        st = path.stat()
+        entries.append((arcname, path, st.st_size, st.st_mtime, file_sha256(path)))
+    manifest = {
+        "format": SHOW_PKG_FORMAT,
+        "version": SHOW_PKG_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "files": {a: {"sha256": sha, "size": size} for a, _, size, _, sha in entries},
+    }
+    body = json.dumps(manifest, indent=2).encode("utf-8")
+    yield tar_header(SHOW_PKG_MANIFEST, len(body), time.time()) + body + b"\0" * (-len(body) % 512)
+
+    for arcname, path, size, mtime, _ in entries:
+        yield tar_header(arcname, size, mtime)
+        remaining = size
+        with open(path, "rb") as fh:
+            while remaining > 0:
+                chunk = fh.read(min(SHOW_PKG_CHUNK, remaining))
+                if not chunk:
+                    break  # file shrank while streaming; pad so the archive stays valid
+                remaining -= len(chunk)
+                yield chunk
+        yield b"\0" * remaining + b"\0" * (-size % 512)
+    yield b"\0" * 1024  # end-of-archive marker
+
+def import_show_package(stream, replace_cues: bool) -> dict:
+    """Stream-extract a show package. Files whose checksum already matches are skipped."""
+    report = {"written": [], "skipped": [], "rejected": [], "removed": []}
+    with tarfile.open(fileobj=stream, mode="r|*") as tf:
+        manifest = None
+        for member in tf:
+            if manifest is None:
+                if member.name != SHOW_PKG_MANIFEST or not member.isfile():
+                    raise ValueError(f"not a show package ({SHOW_PKG_MANIFEST} must come first)")
+                manifest = json.loads(tf.extractfile(member).read().decode("utf-8"))
+                if manifest.get("format") != SHOW_PKG_FORMAT:
+                    raise ValueError("not a show package (bad manifest format)")
+                continue
+
+            entry = manifest.get("files", {}).get(member.name)
+            target = show_package_target(member.name)
+            if not member.isfile() or target is None or not entry:
+                report["rejected"].append(member.name)
+                continue
+            if target.is_file() and file_sha256(target) == entry.get("sha256"):
+                report["skipped"].append(member.name)
+                continue
+            if target == CFG_PATH:
+                # merged into this machine's config, never written over it
+                body = tf.extractfile(member).read(SHOW_PKG_CFG_MAX + 1)
+                try:
+                    if len(body) > SHOW_PKG_CFG_MAX or hashlib.sha256(body).hexdigest() != entry.get("sha256"):
+                        raise ValueError
+                    imported = json.loads(body.decode("utf-8"))
+                    if not isinstance(imported, dict):
+                        raise ValueError
+                except ValueError:
+                    report["rejected"].append(member.name)
+                    continue
+                cfg = load_cfg()
+                merged = merge_show_cfg(cfg, imported)
+                if merged == cfg:
+                    report["skipped"].append(member.name)
+                else:
+                    save_cfg(merged)
+                    report["written"].append(member.name)
+                continue
+
+            target.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=str(target.parent), prefix=".import-")
+            h = hashlib.sha256()
+            try:
+                src = tf.extractfile(member)
+                with os.fdopen(fd, "wb") as out:
+                    for chunk in iter(lambda: src.read(SHOW_PKG_CHUNK), b""):
+                        h.update(chunk)
+                        out.write(chunk)
+                if h.hexdigest() != entry.get("sha256"):
+                    report["rejected"].append(member.name)
+                    continue
+                os.replace(tmp, target)
+                tmp = None
+            finally:
+                if tmp:
+                    Path(tmp).unlink(missing_ok=True)
+            report["written"].append(member.name)
+            if target.parent == CUES_DIR:
+                queue_ingest("cue", target)
+            elif target.parent == JUKE_SONGS:
+                queue_ingest("song", target)
+
+    if manifest is None:
+        raise ValueError("empty show package")
+
+    if replace_cues:
+        keep = {n.split("/", 1)[1] for n in manifest.get("files", {}) if n.startswith("cues/")}
+        for p in list_files(CUES_DIR):
+            if CUE_NAME_RE.match(p.name) and p.name not in keep:
+                p.unlink()
+                drop_ingest("cue", p.name)
+                report["removed"].append(f"cues/{p.name}")
+    return report
+
+# gzip bodies keyed by (path, mtime) so each static file is compressed once
+_gzip_cache = {}
+_gzip_lock = threading.Lock()
+
+def accepts_gzip() -> bool:
+    return "gzip" in request.headers.get("Accept-Encoding", "").lower()
+
+def gzipped_static(path: Path) -> bytes:
+    key = (str(path), path.stat().st_mtime_ns)
+    with _gzip_lock:
+        data = _gzip_cache.get(key)
+    if data is None:
+        data = gzip.compress(path.read_bytes(), compresslevel=9)
+        with _gzip_lock:
+            _gzip_cache[key] = data
+    return data
+
 # ---------- Flask routes ----------
 
+@app.get("/static/<path:filename>")
+def static_asset(filename):
+    path = (STATIC_DIR / filename).resolve()
+    if STATIC_DIR.resolve() not in path.parents or not path.is_file():
+        abort(404)
+    resp = send_from_directory(STATIC_DIR, filename, max_age=STATIC_MAX_AGE, conditional=True)
+    resp.headers["Cache-Control"] = f"public, max-age={STATIC_MAX_AGE}, immutable"
+    resp.vary.add("Accept-Encoding")
+    if resp.status_code == 200 and resp.mimetype in GZIP_TYPES and accepts_gzip():
+        resp.direct_passthrough = False
+        resp.set_data(gzipped_static(path))
+        resp.headers["Content-Encoding"] = "gzip"
+        resp.headers.pop("Accept-Ranges", None)
+        gzip_etag(resp)
+        resp.make_conditional(request)  # If-None-Match for the gzip variant -> 304
+    return resp
+
+def gzip_etag(resp):
+    # the gzip body is a different representation: it must not share the identity ETag
+    etag, weak = resp.get_etag()
+    if etag and not etag.endswith("-gz"):
+        resp.set_etag(f"{etag}-gz", weak=weak)
+
+@app.after_request
+def compress_response(resp):
+    # Compress dynamic HTML/JSON (the index page is ~15 KB); static assets are handled above.
+    if (resp.direct_passthrough or resp.status_code != 200
+            or "Content-Encoding" in resp.headers
+            or resp.mimetype not in GZIP_TYPES or not accepts_gzip()):
+        return resp
+    data = resp.get_data()
+    if len(data) < GZIP_MIN_BYTES:
+        return resp
+    resp.set_data(gzip.compress(data, compresslevel=6))
+    resp.headers["Content-Encoding"] = "gzip"
+    resp.vary.add("Accept-Encoding")
+    gzip_etag(resp)
+    return resp
+
+# ---------- Request tracing (only registered when SHOWBOX_TRACE is set) ----------
+
+_trace_pending = deque(maxlen=100_000)
+_trace_lock = threading.Lock()
+_trace_writer = None
+
+def trace_writer():
+    # same file as the engine (O_APPEND), so web requests and cue handling share a timeline
+    TRACE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        fd = os.open(TRACE_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        os.write(fd, b"[\n")
+        os.close(fd)
+    except FileExistsError:
+        pass
+    fd = os.open(TRACE_PATH, os.O_WRONLY | os.O_APPEND)
+    pid = os.getpid()
+    lines = [json.dumps({"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": "webapp"}}) + ",\n"]
+    while True:
+        while _trace_pending:
+            ev = _trace_pending.popleft()
+            ev["pid"] = pid
+            lines.append(json.dumps(ev) + ",\n")
+        if lines:
+            try:
+                os.write(fd, "".join(lines).encode())
+            except OSError as e:
+                print(f"trace write failed: {e}", flush=True)
+            lines = []
+        time.sleep(TRACE_FLUSH_SEC)
+
+def trace_event(ph: str, name: str, args: dict | None = None):
+    global _trace_writer
+    ev = {"name": name, "ph": ph, "ts": time.monotonic_ns() // 1000, "tid": threading.get_native_id()}
+    if args:
+        ev["args"] = args
+    _trace_pending.append(ev)
+    if _trace_writer is None:
+        with _trace_lock:
+            if _trace_writer is None:
+                _trace_writer = threading.Thread(target=trace_writer, daemon=True)
+                _trace_writer.start()
+
+def trace_request_begin():
+    g.trace_name = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+    trace_event("B", g.trace_name, {"path": request.full_path.rstrip("?")})
+
+def trace_request_status(resp):
+    g.trace_status = resp.status_code
+    return resp
+
+def trace_request_end(exc):
+    # teardown runs after the response is built (also on errors)
+    if "trace_name" in g:
+        trace_event("E", g.trace_name, {"status": g.get("trace_status", 500)})
+
+if TRACE_PATH:
+    app.before_request(trace_request_begin)
+    app.after_request(trace_request_status)
+    app.teardown_request(trace_request_end)
+
 @app.get("/")
 def index():
     cfg = load_cfg()
@@ -345,13 +1574,25 @@ def index():
     songs = list_files(JUKE_SONGS, ALLOWED_SONG_EXT)
     playlists = list_files(JUKE_LISTS, {".json"})
     pl = load_playlist(cfg["jukebox"]["playlist"])
+    shows = list_files(SHOWS_DIR, {".json"})
+    flight_dumps = sorted(FLIGHT_DIR.glob("flight-*.json"), reverse=True)[:10] if FLIGHT_DIR.is_dir() else []
+    media_index = refresh_media_index("cue", cues)
+    media_index.update(refresh_media_index("song", songs))
     return render_template_string(
         TEMPLATE,
+        media_index=media_index,
+        fmt_duration=fmt_duration,
+        ui_css=UI_CSS if (STATIC_DIR / UI_CSS).is_file() else None,
+        cue_exts=", ".join(sorted(e.lstrip(".") for e in ALLOWED_CUE_EXT)),
         cfg=cfg,
         cues=cues,
         songs=songs,
         playlists=playlists,
-        playlist_tracks=pl.get("tracks", [])
+        playlist_tracks=pl.get("tracks", []),
+        shows=shows,
+        flight_dumps=flight_dumps,
+        log_levels=LOG_LEVELS,
+        audio_ext=AUDIO_EXT,
     )
 
 @app.post("/mode")
@@ -378,21 +1619,32 @@ def set_midi_out():
     flash(f"midi out port set to {port}")
     return redirect(url_for("index"))
 
+@app.post("/mirror/<action>")
+def mirror_control(action):
+    # backup engine only: go active now, or hand control back to the primary
+    if action not in ("takeover", "standby"):
+        abort(404)
+    write_control(f"mirror_{action}")
+    flash(f"hot standby: {action} requested")
+    return redirect(url_for("index"))
+
 @app.post("/upload-cue")
 def upload_cue():
     f = request.files.get("file")
     num = request.form.get("number", "").strip()
-    if not f or not num.isdigit():
-        flash("provide a cue number and a file")
+    if not f or not cue_number_ok(num):
+        flash(f"provide a cue number (1-{MAX_CUE_NUMBER}) and a file")
         return redirect(url_for("index"))
     ext = Path(f.filename).suffix.lower()
     if ext not in ALLOWED_CUE_EXT:
-        flash("cue must be wav or midi")
+        flash("cue must be wav, mp3 or midi")
         return redirect(url_for("index"))
-    outname = f"{int(num)}_workcue{ext}"
+    outname = cue_filename(num, ext)
     CUES_DIR.mkdir(parents=True, exist_ok=True)
+    drop_cue_files(cue_shadows(num, outname))
     outpath = CUES_DIR / outname
     f.save(outpath)
+    queue_ingest("cue", outpath)
     flash(f"uploaded cue {outname}")
     return redirect(url_for("index"))
 
@@ -405,9 +1657,68 @@ def delete_cue(filename):
     p = CUES_DIR / safe_filename(filename)
     if p.exists():
         p.unlink()
+        drop_ingest("cue", p.name)
         flash(f"deleted {p.name}")
     return redirect(url_for("index"))
 
+@app.get("/audition/<kind>/<path:filename>")
+def audition_media(kind, filename):
+    # Streams a cue/song to the browser: byte ranges (scrubbing), conditional GETs
+    # (ETag/Last-Modified) and wsgi.file_wrapper / X-Sendfile for the body.
+    d = media_dir(kind)
+    if d is None:
+        abort(404)
+    src = d / safe_filename(filename)
+    if not src.is_file():
+        abort(404)
+    path = src
+    if request.args.get("preview") == "1":
+        preview = ingest_path(kind, src.name, ".preview.mp3")
+        if is_fresh(preview, src):
+            path = preview
+        else:
+            queue_ingest(kind, src)  # next audition gets the small file
+    resp = send_file(path, conditional=True, etag=True, max_age=0)
+    resp.headers["Cache-Control"] = "no-cache"  # revalidate: files can be replaced in place
+    return resp
+
+@app.get("/api/media-index")
+def api_media_index():
+    # duration / level / lead-silence metadata for every ingested cue and song
+    return jsonify(load_media_index())
+
+@app.get("/api/peaks/<kind>/<path:filename>")
+def api_peaks(kind, filename):
+    # Binary peaks file by default (see write_peaks for the layout).
+    # ?format=json&points=N returns the coarsest level with at least N blocks.
+    d = media_dir(kind)
+    if d is None:
+        abort(404)
+    name = safe_filename(filename)
+    src = d / name
+    peaks = ingest_path(kind, name, ".peaks")
+    if not src.is_file():
+        abort(404)
+    if not is_fresh(peaks, src):
+        queue_ingest(kind, src)
+        return jsonify({"error": "peaks pending"}), 202
+    if request.args.get("format") != "json":
+        resp = send_file(peaks, mimetype="application/octet-stream", conditional=True, max_age=0)
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
+    data = read_peaks(peaks)
+    try:
+        points = max(1, int(request.args.get("points", "0")))
+    except ValueError:
+        points = 1
+    levels = data.pop("levels")
+    chosen = levels[0]
+    for lvl in levels:
+        if len(lvl["min"]) >= points:
+            chosen = lvl
+    data.update(chosen)
+    return jsonify(data)
+
 @app.post("/upload-song")
 def upload_song():
     f = request.files.get("file")
@@ -422,6 +1733,7 @@ def upload_song():
     JUKE_SONGS.mkdir(parents=True, exist_ok=True)
     outpath = JUKE_SONGS / name
     f.save(outpath)
+    queue_ingest("song", outpath)
     flash(f"uploaded song {name}")
     return redirect(url_for("index"))
 
@@ -430,6 +1742,7 @@ def delete_song(filename):
     p = JUKE_SONGS / safe_filename(filename)
     if p.exists():
         p.unlink()
+        drop_ingest("song", p.name)
         flash(f"deleted {p.name}")
     return redirect(url_for("index"))
 
@@ -473,6 +1786,19 @@ def set_jukebox_playmode():
     flash(f"jukebox play mode set to {mode}")
     return redirect(url_for("index"))
 
+@app.post("/jukebox/output")
+def set_jukebox_output():
+    # named outputs come from config.json "outputs"; the engine picks it up on the next track
+    cfg = load_cfg()
+    name = request.form.get("output", "").strip()
+    if name and name not in (cfg.get("outputs") or {}):
+        flash(f"unknown output: {name}")
+        return redirect(url_for("index"))
+    cfg["jukebox"]["output"] = name
+    save_cfg(cfg)
+    flash(f"jukebox output: {name or '(default player)'}")
+    return redirect(url_for("index"))
+
 @app.post("/playlist/add")
 def playlist_add():
     song = safe_filename(request.form.get("song", ""))
@@ -500,6 +1826,181 @@ def playlist_remove():
 
 )
 
+# ---------- Shows ----------
+
+@app.post("/show/select")
+def select_show():
+    # "" selects the plain N_workcue files. The engine validates and compiles the show;
+    # load errors show up in /state under "show".
+    name = safe_filename(request.form.get("show", "").strip())
+    if name and not (SHOWS_DIR / name).is_file():
+        flash(f"show not found: {name}")
+        return redirect(url_for("index"))
+    write_control("show_load", name=name)
+    flash(f"show {name or '(cue files)'} requested")
+    return redirect(url_for("index"))
+
+@app.post("/show/upload")
+def upload_show():
+    f = request.files.get("file")
+    if not f or not f.filename.lower().endswith(".json"):
+        flash("show file must be .json")
+        return redirect(url_for("index"))
+    name = safe_filename(f.filename)
+    try:
+        defn = json.loads(f.read().decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        flash(f"invalid show JSON: {e}")
+        return redirect(url_for("index"))
+    if not isinstance(defn, dict) or not isinstance(defn.get("cues"), list):
+        flash("show must be an object with a 'cues' list")
+        return redirect(url_for("index"))
+    SHOWS_DIR.mkdir(parents=True, exist_ok=True)
+    write_json_file(SHOWS_DIR / name, defn)
+    flash(f"uploaded show {name}")
+    return redirect(url_for("index"))
+
+@app.post("/show/<path:filename>/delete")
+def delete_show(filename):
+    p = SHOWS_DIR / safe_filename(filename)
+    if p.exists():
+        p.unlink()
+        flash(f"deleted {p.name}")
+    return redirect(url_for("index"))
+
+# ---------- Show check ----------
+
+_show_check_lock = threading.Lock()
+
+def engine_playing() -> bool:
+    try:
+        return bool(json.loads(STATE_PATH.read_text()).get("playing"))
+    except (OSError, ValueError, AttributeError):
+        return False
+
+@app.get("/api/show-check")
+def api_show_check():
+    # Runs `midi_cues.py --check --json`: every cue resolved, decoded and start-timed
+    # without sound. ?timing=0 skips the latency runs. One check at a time, at idle
+    # priority, and never while a cue plays: the cold-start timing evicts cue files
+    # from the page cache and the decodes compete with the player.
+    if not ENGINE.is_file():
+        return jsonify({"error": f"engine not found at {ENGINE}"}), 503
+    if engine_playing():
+        return jsonify({"error": "a cue is playing; run the show check when nothing plays"}), 409
+    if not _show_check_lock.acquire(blocking=False):
+        return jsonify({"error": "a show check is already running"}), 409
+    cmd = [sys.executable, str(ENGINE), "--check", "--json"]
+    if request.args.get("timing") == "0":
+        cmd.append("--no-timing")
+    if IONICE:
+        cmd = [IONICE, "-c3"] + cmd
+    try:
+        r = subprocess.run(cmd, capture_output=True, text=True, timeout=SHOW_CHECK_TIMEOUT,
+                           preexec_fn=idle_priority)
+    except subprocess.TimeoutExpired:
+        return jsonify({"error": f"show check took longer than {SHOW_CHECK_TIMEOUT}s"}), 504
+    finally:
+        _show_check_lock.release()
+    try:
+        return jsonify(json.loads(r.stdout))
+    except json.JSONDecodeError:
+        tail = (r.stderr.strip().splitlines() or [f"exit {r.returncode}"])[-1]
+        return jsonify({"error": f"show check failed: {tail}"}), 500
+
+# ---------- Cue generation jobs ----------
+
+@app.post("/api/cue-jobs")
+def api_cue_job_submit():
+    src = request.get_json(silent=True) or request.form
+    try:
+        params = cue_job_params(src)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not CREATECUE.is_file():
+        return jsonify({"error": f"createcue not found at {CREATECUE}"}), 503
+    job, created = submit_cue_job(params)
+    return jsonify(job), 202 if created else 200
+
+@app.get("/api/cue-jobs")
+def api_cue_jobs():
+    return jsonify(list_cue_jobs())
+
+@app.get("/api/cue-jobs/<job_id>")
+def api_cue_job(job_id):
+    with _cue_jobs_lock:
+        job = _cue_jobs.get(job_id)
+        if job is None:
+            abort(404)
+        return jsonify(dict(job))
+
+# ---------- Show package import/export ----------
+
+@app.get("/show/export")
+def show_export():
+    include_songs = request.args.get("songs") == "1"
+    files = show_package_files(include_songs)
+    fname = time.strftime("show-%Y%m%d-%H%M.showbox.tar")
+    return Response(
+        stream_show_package(files),
+        mimetype="application/x-tar",
+        headers={"Content-Disposition": f'attachment; filename="{fname}"', "Cache-Control": "no-store"},
+        direct_passthrough=True,
+    )
+
+@app.post("/show/import")
+def show_import():
+    # Body is the raw archive (the UI posts the File directly), so it is never
+    # parsed as a multipart form or held in memory.
+    replace_cues = request.args.get("replace") == "1"
+    try:
+        report = import_show_package(request.stream, replace_cues)
+    except (tarfile.TarError, ValueError, UnicodeDecodeError) as e:
+        return jsonify({"error": str(e)}), 400
+    report["summary"] = (f"{len(report['written'])} written, {len(report['skipped'])} unchanged, "
+                         f"{len(report['rejected'])} rejected, {len(report['removed'])} removed")
+    if report["rejected"]:
+        # the rest was imported, but the package is not what it claims to be
+        report["error"] = f"{len(report['rejected'])} file(s) rejected: {', '.join(report['rejected'])}"
+        return jsonify(report), 422
+    return jsonify(report)
+
+# ---------- Flight recorder ----------
+
+@app.post("/flight/dump")
+def flight_capture():
+    write_control("flight_dump")
+    flash("flight recorder dump requested")
+    return redirect(url_for("index"))
+
+@app.get("/flight/<path:filename>")
+def flight_view(filename):
+    p = FLIGHT_DIR / safe_filename(filename)
+    if not p.is_file() or p.suffix != ".json":
+        abort(404)
+    if request.args.get("format") == "json":
+        return send_file(p, mimetype="application/json", as_attachment=True, download_name=p.name)
+    try:
+        doc = json.loads(p.read_text())
+    except (OSError, json.JSONDecodeError):
+        abort(404)
+    return render_template_string(
+        FLIGHT_TEMPLATE,
+        name=p.name,
+        doc=doc,
+        ui_css=UI_CSS if (STATIC_DIR / UI_CSS).is_file() else None,
+    )
+
+@app.post("/log-level")
+def set_log_level():
+    level = request.form.get("level", "")
+    if level not in LOG_LEVELS:
+        flash(f"unknown log level: {level}")
+        return redirect(url_for("index"))
+    write_control("log_level", level=level)
+    flash(f"engine log level {level} requested")
+    return redirect(url_for("index"))
+
 # ---------- New control endpoints and state endpoint ----------
 
 @app.post("/jukebox/start")
@@ -533,10 +2034,30 @@ def get_state():
 
 # ---------- Run server ----------
 
+def serve():
+    # Production: waitress (threaded WSGI server) so uploads, listings and /state polling
+    # from several devices are handled concurrently. Flask's dev server is the fallback.
+    if WEB_SERVER in ("auto", "waitress"):
+        try:
+            from waitress import serve as waitress_serve
+        except ImportError:
+            if WEB_SERVER == "waitress":
+                raise
+            print("waitress not installed (sudo apt-get install -y python3-waitress); "
+                  "using Flask threaded server", flush=True)
+        else:
+            print(f"serving on {WEB_HOST}:{WEB_PORT} (waitress, {WEB_THREADS} threads)", flush=True)
+            waitress_serve(app, host=WEB_HOST, port=WEB_PORT, threads=WEB_THREADS,
+                           ident="ShowBox", channel_timeout=60)
+            return
+    app.run(host=WEB_HOST, port=WEB_PORT, debug=False, threaded=True)
+
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["--peaks"] and len(sys.argv) == 4:
+        sys.exit(peaks_main(Path(sys.argv[2]), Path(sys.argv[3])))
     # Ensure directories exist so uploads work
     CUES_DIR.mkdir(parents=True, exist_ok=True)
     JUKE_SONGS.mkdir(parents=True, exist_ok=True)
     JUKE_LISTS.mkdir(parents=True, exist_ok=True)
     CFG_PATH.parent.mkdir(parents=True, exist_ok=True)
-    app.run(host="0.0.0.0", port=8080, debug=False)
+    serve()
@@ -0,0 +1,38 @@
+"""Shared setup: the engine and web app read SHOWBOX_BASE at import time, so it
+points at a scratch directory before either is imported."""
+
+import os
+import sys
+import tempfile
+import types
+from importlib.machinery import SourceFileLoader
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+os.environ["SHOWBOX_BASE"] = tempfile.mkdtemp(prefix="showbox-test-")
+os.environ.setdefault("SHOWBOX_PLAYER", "fake")
+sys.path[:0] = [str(ROOT / "src" / "player"), str(ROOT / "src" / "webapp")]
+
+
+@pytest.fixture
+def engine():
+    import midi_cues
+    midi_cues.ensure_dirs()
+    return midi_cues
+
+
+@pytest.fixture
+def webapp():
+    import app
+    return app
+
+
+@pytest.fixture(scope="session")
+def createcue():
+    # a script without .py: load it by path
+    loader = SourceFileLoader("createcue", str(ROOT / "src" / "tools" / "createcue"))
+    mod = types.ModuleType(loader.name)
+    loader.exec_module(mod)
+    return mod
@@ -0,0 +1,82 @@
+import json
+import sys
+import time
+
+import pytest
+
+
+def test_load_setlist_csv_and_json(createcue, tmp_path):
+    csv = tmp_path / "set.csv"
+    csv.write_text("Number,Title,BPM,beats,count\n7,Amos Moses,120,,\n012,Jolene,111.5,3,yes\n")
+    rows = createcue.load_setlist(csv)
+    assert rows == [
+        {"number": "07", "title": "Amos Moses", "bpm": 120.0, "beats": 4, "count": False},
+        {"number": "12", "title": "Jolene", "bpm": 111.5, "beats": 3, "count": True},
+    ]
+    js = tmp_path / "set.json"
+    js.write_text(json.dumps({"cues": [{"number": 1, "title": "Intro", "tempo": 90}]}))
+    assert createcue.load_setlist(js)[0]["number"] == "01"
+
+
+@pytest.mark.parametrize("row", ["x1,T,120", "0,T,120", "1000,T,120", "1,T,", "1,T,120,0"])
+def test_load_setlist_rejects(createcue, tmp_path, row):
+    p = tmp_path / "set.csv"
+    p.write_text("number,title,bpm,beats\n" + row + "\n")
+    with pytest.raises(RuntimeError):
+        createcue.load_setlist(p)
+
+
+def test_load_setlist_rejects_duplicate_numbers(createcue, tmp_path):
+    p = tmp_path / "set.csv"
+    p.write_text("number,title,bpm\n7,A,120\n8,B,120\n007,C,120\n")
+    with pytest.raises(RuntimeError, match="row 3: cue 07 already defined in row 1"):
+        createcue.load_setlist(p)
+
+
+def fake_piper(tmp_path, body):
+    script = tmp_path / "piper"
+    script.write_text(f"#!{sys.executable}\nimport json, sys, time\n{body}")
+    script.chmod(0o755)
+    return str(script)
+
+
+def test_resident_piper(createcue, tmp_path, monkeypatch):
+    monkeypatch.setattr(createcue, "PIPER", fake_piper(tmp_path, (
+        "for line in sys.stdin:\n"
+        "    d = json.loads(line)\n"
+        "    open(d['output_file'], 'wb').write(b'RIFF')\n"
+        "    print(d['output_file'], flush=True)\n")))
+    w = createcue.PiperWorker()
+    try:
+        for i in range(3):
+            w.synth(f"title {i}", tmp_path / f"{i}.wav")
+            assert (tmp_path / f"{i}.wav").exists()
+    finally:
+        w.close()
+
+
+def test_resident_piper_timeout(createcue, tmp_path, monkeypatch):
+    monkeypatch.setattr(createcue, "PIPER_TIMEOUT", 0.3)
+    monkeypatch.setattr(createcue, "PIPER", fake_piper(tmp_path, (
+        "sys.stdin.readline()\n"
+        "sys.stdout.write('half a line'); sys.stdout.flush()\n"
+        "time.sleep(30)\n")))
+    w = createcue.PiperWorker()
+    t0 = time.monotonic()
+    with pytest.raises(RuntimeError, match="did not answer"):
+        w.synth("stuck", tmp_path / "x.wav")
+    assert time.monotonic() - t0 < 5
+    assert w.proc.wait(timeout=5) != 0  # killed, not left running
+
+
+
+def test_spoken_count_without_sox_fails_before_tts(createcue, tmp_path, monkeypatch):
+    monkeypatch.setattr(createcue, "SOX", None)
+    monkeypatch.setattr(createcue, "make_speech", lambda *a, **k: pytest.fail("speech made without sox"))
+    cues = [{"number": "01", "title": "T", "bpm": 120.0, "beats": 4, "count": True}]
+    with pytest.raises(RuntimeError, match="sox is required for a spoken count-in"):
+        createcue.build_setlist(cues, tmp_path, 0.25, 0.2, False, "cedar", 1)
+    with pytest.raises(RuntimeError, match="sox is required for a spoken count-in"):
+        createcue.create_cue("1", "T", 120.0, tmp_path, count=True)
+    with pytest.raises(RuntimeError, match="sox is required for a spoken count-in"):
+        createcue.build_spoken_count_track(tmp_path, createcue.silence(0.5), 4, 120.0)
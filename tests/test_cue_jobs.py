@@ -0,0 +1,34 @@
+import pytest
+
+
+@pytest.mark.parametrize("number", ["", "0", "00", "1000", "٣", "1a"])
+def test_params_reject_bad_numbers(webapp, number):
+    with pytest.raises(ValueError, match="cue number"):
+        webapp.cue_job_params({"number": number, "title": "T", "bpm": "120"})
+
+
+def test_params_normalise(webapp):
+    p = webapp.cue_job_params({"number": " 007 ", "title": " Jolene ", "bpm": "111.5", "count": "on"})
+    assert p == {"number": "07", "title": "Jolene", "bpm": 111.5, "beats": 4, "count": True}
+
+
+def test_job_reports_what_createcue_replaced(webapp, tmp_path, monkeypatch):
+    # stand-in createcue: writes the cue and removes the shadow, printing what it removed
+    tool = tmp_path / "createcue"
+    tool.write_text(
+        "import sys\nfrom pathlib import Path\n"
+        "out = Path(sys.argv[sys.argv.index('--outdir') + 1])\n"
+        "(out / '07_workcue.wav').write_bytes(b'x')\n"
+        "(out / '7_workcue.mp3').unlink()\n"
+        "print('removed 7_workcue.mp3 (same cue number as 07_workcue.wav)')\n")
+    monkeypatch.setattr(webapp, "CREATECUE", tool)
+    monkeypatch.setattr(webapp, "queue_ingest", lambda kind, path: None)
+    webapp.CUES_DIR.mkdir(parents=True, exist_ok=True)
+    (webapp.CUES_DIR / "7_workcue.mp3").write_bytes(b"x")
+    (webapp.CUES_DIR / "07_workcue.mid").write_bytes(b"x")  # createcue left it: so does the app
+    job = {"params": webapp.cue_job_params({"number": "7", "title": "T", "bpm": "120"}), "replaced": []}
+    webapp.run_cue_job(job)
+    assert job["status"] == "done"
+    assert job["replaced"] == ["7_workcue.mp3"]
+    assert "replaced 7_workcue.mp3" in job["progress"]
+    assert (webapp.CUES_DIR / "07_workcue.mid").exists()
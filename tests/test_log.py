@@ -0,0 +1,39 @@
+import threading
+import time
+
+
+class SlowOut:
+    # stands in for a slow journal: the batch is taken off the queue long before it lands
+    def __init__(self):
+        self.lines = []
+        self.writing = threading.Event()
+
+    def write(self, text):
+        self.writing.set()
+        time.sleep(0.2)
+        self.lines.extend(text.splitlines())
+
+    def flush(self):
+        pass
+
+
+def test_flush_waits_for_the_last_batch(engine, monkeypatch):
+    out = SlowOut()
+    engine.log_flush()
+    monkeypatch.setattr(engine, "_log_out", out)
+    engine.log("last words")
+    assert out.writing.wait(1.0)
+    assert engine._log_queue.empty()  # dequeued, but not yet written
+    engine.log_flush()
+    assert out.lines == ["last words"]
+
+
+def test_flush_is_bounded(engine, monkeypatch):
+    out = SlowOut()
+    engine.log_flush()
+    monkeypatch.setattr(engine, "_log_out", out)
+    engine.log("stuck")
+    t0 = time.monotonic()
+    engine.log_flush(timeout=0.05)
+    assert time.monotonic() - t0 < 0.15
+    engine.log_flush()
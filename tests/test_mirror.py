@@ -0,0 +1,129 @@
+import json
+import socket
+
+import pytest
+
+
+@pytest.fixture
+def peer():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(1.0)
+    yield sock
+    sock.close()
+
+
+def recv(sock):
+    return json.loads(sock.recvfrom(4096)[0])
+
+
+def act(seq, kind, epoch="e1", **data):
+    return {"v": 1, "type": "act", "epoch": epoch, "seq": seq, "t": 1.0, "kind": kind, **data}
+
+
+@pytest.fixture
+def backup(engine):
+    m = engine.Mirror("backup", ("127.0.0.1", 0), None, heartbeat=0.05, takeover=60.0, auto=False)
+    yield m
+    m.close()
+
+
+def test_backup_applies_and_acks_in_order(engine, backup, peer):
+    addr = peer.getsockname()
+    backup._receive(act(1, "select", cue=4), addr)
+    assert engine.current_cue == 4
+    assert recv(peer) == {"v": 1, "type": "ack", "epoch": "e1", "seq": 1, "t": 1.0}
+    backup._receive(act(2, "go", cue=5), addr)
+    assert recv(peer)["seq"] == 2
+    assert (engine.current_cue, backup.last_go) == (5, 5)
+    backup._receive(act(3, "stop"), addr)
+    recv(peer)
+    assert backup.last_go is None
+    assert backup.stats["applied"] == 3 and backup.stats["gaps"] == 0
+    assert backup.peer == addr
+
+
+def test_backup_counts_duplicates_and_gaps(engine, backup, peer):
+    addr = peer.getsockname()
+    backup._receive(act(1, "select", cue=1), addr)
+    backup._receive(act(1, "select", cue=9), addr)  # retransmit: dropped, not applied
+    assert engine.current_cue == 1
+    backup._receive(act(4, "select", cue=2), addr)  # 2 and 3 lost
+    assert engine.current_cue == 2
+    assert backup.stats["duplicates"] == 1
+    assert backup.stats["gaps"] == 2
+    assert backup.status()["seq"] == 4
+
+
+def test_new_epoch_restarts_sequence(engine, backup, peer):
+    addr = peer.getsockname()
+    backup._receive(act(7, "select", cue=3), addr)
+    backup._receive(act(1, "select", cue=6, epoch="e2"), addr)  # primary restarted
+    assert engine.current_cue == 6
+    assert backup.stats["duplicates"] == 0
+    assert recv(peer)["epoch"] == "e1" and recv(peer)["epoch"] == "e2"
+
+
+def test_heartbeat_resyncs_cue_and_is_acked(engine, backup, peer):
+    addr = peer.getsockname()
+    engine.current_cue = 1
+    backup._receive({"v": 1, "type": "hb", "epoch": "e1", "seq": 3, "t": 2.0,
+                     "snap": {"cue": 8, "mode": "cues"}}, addr)
+    ack = recv(peer)
+    assert ack["hb"] is True and ack["seq"] == 3
+    assert engine.current_cue == 8
+    assert backup.stats["resyncs"] == 1
+    assert backup.stats["gaps"] == 3  # actions 1..3 never arrived
+
+
+def test_active_backup_ignores_primary(engine, backup, peer):
+    backup.promote("test")
+    engine.current_cue = 2
+    backup._receive(act(1, "select", cue=5), peer.getsockname())
+    assert engine.current_cue == 2
+    assert backup.stats["applied"] == 0
+
+
+def test_primary_turns_acks_into_lag(engine, peer):
+    m = engine.Mirror("primary", ("127.0.0.1", 0), peer.getsockname(),
+                      heartbeat=0.05, takeover=60.0, auto=False)
+    try:
+        m.send("go", cue=3)
+        msg = recv(peer)
+        while msg["type"] != "act":  # the first heartbeat may come first
+            msg = recv(peer)
+        assert (msg["kind"], msg["cue"], msg["seq"]) == ("go", 3, 1)
+        assert m.status()["unacked"] == 1
+        m._receive({"type": "ack", "epoch": "other", "seq": 1, "t": msg["t"]}, peer.getsockname())
+        assert m.status()["unacked"] == 1
+        m._receive({"type": "ack", "epoch": m.epoch, "seq": 1, "t": msg["t"]}, peer.getsockname())
+        assert m._lag[-1] >= 0.0
+        st = m.status()
+        assert st["unacked"] == 0 and st["acked"] == 1 and st["lag_ms"] is not None
+    finally:
+        m.close()
+
+
+def test_default_ports_differ():
+    import midi_cues
+    assert midi_cues._mirror_addr("", "0.0.0.0", midi_cues.MIRROR_PORTS["primary"]) == ("0.0.0.0", 5510)
+    assert midi_cues._mirror_addr("10.0.0.12", "x", midi_cues.MIRROR_PORTS["backup"]) == ("10.0.0.12", 5511)
+    assert midi_cues._mirror_addr("10.0.0.12:6000", "x", 5511) == ("10.0.0.12", 6000)
+
+
+def test_port_in_use_is_an_error(engine, peer):
+    port = peer.getsockname()[1]
+    with pytest.raises(OSError):
+        engine.Mirror("backup", ("127.0.0.1", port), None, heartbeat=10.0, takeover=60.0, auto=False)
+    assert engine.mirror_from_cfg({"mirror": {"role": "backup", "listen": f"127.0.0.1:{port}"}}) is None
+    assert "cannot listen" in engine._mirror_error
+
+
+def test_snapshot_reads_cached_mode(engine, backup, monkeypatch):
+    cfg = engine.load_cfg()
+    engine.save_cfg(dict(cfg, mode="jukebox"))
+    monkeypatch.setattr(engine, "load_cfg", lambda: pytest.fail("heartbeat read config.json"))
+    try:
+        assert backup._snapshot()["mode"] == "jukebox"
+    finally:
+        engine.save_cfg(cfg)
@@ -0,0 +1,35 @@
+import time
+
+
+def test_outputs_release_together_and_report_skew(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, "FAKE_PLAY_SEC", 0.05)
+    path = tmp_path / "01_workcue.wav"
+    path.write_bytes(b"x")
+    outs = [engine.FakeOutput("stage"), engine.FakeOutput("monitors")]
+    pb = engine.OutputPlayback(outs, path, 0.0)
+    pb.start()
+    assert pb.wait() == 0
+    t = pb.timing()
+    assert t["outputs"] == ["stage", "monitors"]
+    assert 0 <= t["send_skew_ms"] < 50 and 0 <= t["start_skew_ms"] < 50
+    assert engine._output_start is pb
+
+
+class RecordingSock:
+    # mpv's IPC socket, seen from the engine: records writes, answers nothing by itself
+    def __init__(self):
+        self.sent = []
+
+    def sendall(self, data):
+        self.sent.append((time.perf_counter(), data))
+
+
+def test_audio_release_is_one_prebuilt_write(engine):
+    out = engine.AudioOutput("stage", "")
+    out.sock = RecordingSock()
+    out.arm(lambda code: None)
+    t = out.release()
+    (when, data), = out.sock.sent
+    assert when >= t
+    assert data == b'{"command": ["set_property", "pause", false], "request_id": 1}\n'
+    assert out.started_at is None  # set by the reader when mpv replies
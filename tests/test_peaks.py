@@ -0,0 +1,59 @@
+import math
+import wave
+from array import array
+
+
+def chunked(samples, size):
+    for i in range(0, len(samples), size):
+        yield array("h", samples[i:i + size])
+
+
+def test_blocks_fold_channels_and_span_chunks(webapp):
+    block = webapp.PEAKS_BASE_BLOCK
+    # stereo: block 0 silent, block 1 has its peak in the right channel, last block partial
+    samples = [0] * (2 * block) + [5, -7] * (block - 1) + [1000, -2000] + [3, -3] * 10
+    for size in (len(samples), 1000, 7):  # chunk boundaries must not change the result
+        levels, frames, info = webapp.compute_peaks(44100, 2, chunked(samples, size))
+        spb, mins, maxs = levels[0]
+        assert spb == block
+        assert list(mins) == [0, -2000, -3]
+        assert list(maxs) == [0, 1000, 3]
+        assert frames == len(samples) // 2
+    assert info["lead_silence"] == round(block / 44100, 3)
+    assert info["peak_dbfs"] == round(20 * math.log10(2000 / 32768), 1)
+    assert info["duration"] == round(frames / 44100, 3)
+
+
+def test_coarser_levels(webapp):
+    block, f = webapp.PEAKS_BASE_BLOCK, webapp.PEAKS_LEVEL_FACTOR
+    n = webapp.PEAKS_MIN_POINTS * f * 2
+    samples = [((i // block) % 50) * 10 for i in range(n * block)]
+    levels, _, _ = webapp.compute_peaks(8000, 1, chunked(samples, 4096))
+    assert [spb for spb, _, _ in levels] == [block * f ** k for k in range(len(levels))]
+    assert len(levels[-1][1]) <= webapp.PEAKS_MIN_POINTS
+    fine, coarse = levels[0][2], levels[1][2]
+    assert list(coarse) == [max(fine[i:i + f]) for i in range(0, len(fine), f)]
+
+
+def test_silence_and_empty(webapp):
+    levels, frames, info = webapp.compute_peaks(8000, 1, chunked([0] * 1000, 100))
+    assert info["peak_dbfs"] is None
+    assert info["lead_silence"] == round(len(levels[0][1]) * webapp.PEAKS_BASE_BLOCK / 8000, 3)
+    _, frames, _ = webapp.compute_peaks(8000, 1, iter(()))
+    assert frames == 0
+
+
+def test_build_peaks_in_child(webapp, tmp_path):
+    webapp.CUES_DIR.mkdir(parents=True, exist_ok=True)
+    src = webapp.CUES_DIR / "05_workcue.wav"
+    with wave.open(str(src), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(array("h", [0] * 512 + [12000, -12000] * 2000).tobytes())
+    webapp.build_peaks("cue", src)
+    entry = webapp.load_media_index()["cue/05_workcue.wav"]
+    assert entry["peaks"] and entry["frames"] == 4512 and entry["sample_rate"] == 8000
+    peaks = webapp.read_peaks(webapp.ingest_path("cue", src.name, ".peaks"))
+    assert peaks["frames"] == 4512
+    assert max(peaks["levels"][0]["max"]) == 12000 and min(peaks["levels"][0]["min"]) == -12000
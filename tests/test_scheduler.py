@@ -0,0 +1,122 @@
+import resource
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def sched(engine, monkeypatch):
+    monkeypatch.setattr(engine, "SCHED_SLOTS", 16)  # one revolution = 16 ms
+    return engine.CueScheduler()
+
+
+class Recorder:
+    def __init__(self, expect):
+        self.fired = []
+        self.expect = expect
+        self.done = threading.Event()
+
+    def __call__(self, name, deadline):
+        self.fired.append((name, time.monotonic(), deadline))
+        if len(self.fired) == self.expect:
+            self.done.set()
+
+
+def at(sched, rec, delay, name):
+    return sched.schedule(delay, rec, name, time.monotonic() + delay)
+
+
+def test_fires_in_deadline_order(sched):
+    rec = Recorder(4)
+    for delay, name in ((0.03, "c"), (0.01, "a"), (0.0, "now"), (0.02, "b")):
+        at(sched, rec, delay, name)
+    assert rec.done.wait(2)
+    assert [n for n, _, _ in rec.fired] == ["now", "a", "b", "c"]
+
+
+def test_delays_longer_than_one_revolution(engine, sched):
+    rec = Recorder(4)
+    lap = engine.SCHED_SLOTS * engine.SCHED_TICK_SEC
+    # same slot, different laps: the later ones must not fire a lap early
+    for k, name in enumerate(("lap0", "lap1", "lap3", "lap6")):
+        at(sched, rec, 0.005 + lap * int(name[3:]), name)
+    assert rec.done.wait(2)
+    assert [n for n, _, _ in rec.fired] == ["lap0", "lap1", "lap3", "lap6"]
+    for _, t, deadline in rec.fired:
+        assert t >= deadline - engine.SCHED_EARLY_SEC
+        assert t - deadline < 0.05
+
+
+def test_cancel(sched):
+    rec = Recorder(1)
+    drop = at(sched, rec, 0.01, "dropped")
+    at(sched, rec, 0.02, "kept")
+    assert sched.cancel(drop)
+    assert not sched.cancel(drop)
+    assert rec.done.wait(2)
+    time.sleep(0.02)
+    assert [n for n, _, _ in rec.fired] == ["kept"]
+    st = sched.stats()
+    assert st["cancelled"] == 1 and st["fired"] == 1 and st["pending"] == 0
+
+
+def test_cancel_all(sched):
+    rec = Recorder(1)
+    for i in range(5):
+        at(sched, rec, 0.02 + i * 0.03, i)
+    assert sched.cancel_all() == 5
+    time.sleep(0.2)
+    assert rec.fired == []
+    assert sched.stats()["pending"] == 0
+
+
+def test_reschedule_from_callback(sched):
+    rec = Recorder(3)
+
+    def chain(n):
+        rec(n, time.monotonic())
+        if n < 3:
+            sched.schedule(0.0, chain, n + 1)
+
+    sched.schedule(0.005, chain, 1)
+    assert rec.done.wait(2)
+    assert [n for n, _, _ in rec.fired] == [1, 2, 3]
+
+
+def test_waits_without_spinning(sched):
+    rec = Recorder(1)
+    cpu0 = resource.getrusage(resource.RUSAGE_SELF)
+    at(sched, rec, 0.3, "late")
+    assert rec.done.wait(2)
+    cpu1 = resource.getrusage(resource.RUSAGE_SELF)
+    used = (cpu1.ru_utime - cpu0.ru_utime) + (cpu1.ru_stime - cpu0.ru_stime)
+    assert used < 0.1  # a spinning scheduler burns the whole 0.3 s
+
+
+def test_slow_chain_go_does_not_hold_other_timers(engine, sched):
+    # a chain GO whose file load takes 200 ms runs on the chain worker, not the scheduler
+    rec = Recorder(2)
+
+    def slow_go():
+        time.sleep(0.2)
+        rec("go", time.monotonic())
+
+    sched.schedule(0.005, engine.chain_dispatch, slow_go)
+    at(sched, rec, 0.02, "timer")
+    assert rec.done.wait(2)
+    name, fired, deadline = rec.fired[0]
+    assert name == "timer" and fired - deadline < 0.05
+
+
+def test_cancel_drops_actions_already_handed_over(engine):
+    ran = []
+    gate = threading.Event()
+    engine.chain_dispatch(gate.wait, 1.0)  # keeps the worker busy
+    engine.chain_dispatch(ran.append, "stale")
+    engine.cancel_chain()
+    gate.set()
+    done = threading.Event()
+    engine.chain_dispatch(done.set)
+    assert done.wait(2)
+    assert ran == []
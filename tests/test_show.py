@@ -0,0 +1,108 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+
+@pytest.fixture
+def cues(engine):
+    shutil.rmtree(engine.CUES_DIR, ignore_errors=True)
+    engine.CUES_DIR.mkdir(parents=True)
+
+    def make(*names):
+        for n in names:
+            (engine.CUES_DIR / n).write_bytes(b"x")
+    return make
+
+
+def row(**kw):
+    return dict({"cue": 1, "file": "a.wav"}, **kw)
+
+
+def test_compile_tables(engine, cues):
+    cues("a.wav", "b.mp3")
+    show = engine.compile_show({"cues": [
+        row(cue=3, file="a.wav", pc=10, gain_db=-3, follow={"cue": 5, "delay": 1.5}),
+        row(cue=5, file="b.mp3", output="stage"),
+    ]}, "t.json")
+    assert show.pc_map[10] == 3
+    assert show.pc_map[5 - engine.PROGRAM_CHANGE_OFFSET] == 5
+    assert show.pc_map[3 - engine.PROGRAM_CHANGE_OFFSET] is None  # cue 3 has an explicit pc
+    assert show.prev_cue[5] == 3 and show.prev_cue[4] == 3 and show.prev_cue[3] is None
+    c3 = show.cues[3]
+    assert c3.path == engine.CUES_DIR / "a.wav" and c3.gain_db == -3.0
+    assert c3.actions == (engine.ChainAction("end", 1.5, "go", 5),)
+    assert show.cues[5].output == ("stage",)
+    assert not show.legacy
+
+
+@pytest.mark.parametrize("bad, message", [
+    (row(cue=True), "'cue' must be an integer"),
+    (row(cue=0), "'cue' must be an integer"),
+    (row(pc=False), "'pc' must be an integer"),
+    (row(pc=128), "'pc' must be an integer"),
+    (row(gain_db=True), "'gain_db' must be a number"),
+    (row(wait=-1), "'wait' must be a number"),
+    (row(file="/etc/passwd.wav"), "inside cues/"),
+    (row(file="../x.wav"), "inside cues/"),
+    (row(file="a.txt"), "unsupported file type"),
+    (row(file="missing.wav"), "file not found"),
+    (row(actions=[{"do": "go", "cue": True}]), "needs a target 'cue'"),
+    (row(actions=[{"do": "go", "cue": 9}]), "target cue 9 is not in the show"),
+    (row(actions=[{"at": "later"}]), "action 'at' must be one of"),
+])
+def test_compile_rejects(engine, cues, bad, message):
+    cues("a.wav", "a.txt")
+    with pytest.raises(ValueError, match=message):
+        engine.compile_show({"cues": [bad]}, "t.json")
+
+
+def test_compile_collects_every_error(engine, cues):
+    cues("a.wav")
+    with pytest.raises(ValueError) as e:
+        engine.compile_show({"cues": [row(), row(), row(cue=2, pc=1), row(cue=3, pc=1)]}, "t.json")
+    assert "cue 1: defined twice" in str(e.value)
+    assert "pc 1 already used by cue 2" in str(e.value)
+
+
+def test_compile_requires_cues(engine):
+    for defn in ({}, {"cues": []}, {"cues": {}}, []):
+        with pytest.raises(ValueError, match="non-empty list"):
+            engine.compile_show(defn, "t.json")
+
+
+def test_legacy_show(engine, cues):
+    cues("01_workcue.wav", "03_workcue.mid", "notes.txt", "1000_workcue.wav")
+    show = engine.legacy_show()
+    assert show.legacy and show.name == ""
+    assert [c.cue for c in show.cues if c] == [1, 3]
+    assert show.prev_cue[3] == 1
+    assert show.pc_map[0] == 1 and show.pc_map[2] == 3
+
+
+def test_legacy_prefers_padded_name_then_wav(engine, cues):
+    cues("7_workcue.wav", "07_workcue.mp3", "07_workcue.mid", "2_workcue.mp3", "2_workcue.wav")
+    show = engine.legacy_show()
+    assert show.cues[7].path.name == "07_workcue.mp3"
+    assert show.cues[2].path.name == "2_workcue.wav"
+    assert engine.find_cue_file(7).name == "07_workcue.mp3"  # same file the GO fallback finds
+
+
+def test_check_leaves_engine_outputs_alone(engine, cues, monkeypatch):
+    # a live engine in state.json: its outputs are skipped, never opened under it
+    cues("01_workcue.wav")
+    other = subprocess.Popen(["sleep", "30"])
+    try:
+        engine.STATE_PATH.write_text(json.dumps({"pid": other.pid}))
+        opened = []
+        monkeypatch.setattr(engine, "get_output", lambda *a: opened.append(a))
+        report = engine.show_check({"outputs": {"stage": {}}}, timing=False)
+    finally:
+        other.kill()
+        other.wait()
+        engine.STATE_PATH.unlink()
+    assert report["engine_pid"] == other.pid
+    assert [(o["name"], o["status"]) for o in report["outputs"]] == [("stage", "skipped")]
+    assert report["summary"]["outputs_failed"] == 0
+    assert opened == []
@@ -0,0 +1,153 @@
+import hashlib
+import io
+import json
+import shutil
+import tarfile
+
+import pytest
+
+
+@pytest.fixture
+def show(webapp, monkeypatch):
+    ingested = []
+    monkeypatch.setattr(webapp, "queue_ingest", lambda kind, path: ingested.append(f"{kind}/{path.name}"))
+    for d in (webapp.CUES_DIR, webapp.SHOWS_DIR, webapp.JUKE_LISTS, webapp.JUKE_SONGS):
+        shutil.rmtree(d, ignore_errors=True)
+        d.mkdir(parents=True)
+    (webapp.CUES_DIR / "01_workcue.wav").write_bytes(b"RIFF one" * 100)
+    (webapp.CUES_DIR / "02_workcue.mid").write_bytes(b"MThd two")
+    (webapp.CUES_DIR / "notes.txt").write_text("not a cue")
+    (webapp.SHOWS_DIR / "friday.json").write_text('{"cues": []}')
+    (webapp.JUKE_LISTS / "default.json").write_text('{"tracks": []}')
+    (webapp.JUKE_SONGS / "song.mp3").write_bytes(b"ID3 song")
+    webapp.save_cfg({"mode": "jukebox", "show": "friday.json"})
+    return ingested
+
+
+def export(webapp, songs=False):
+    r = webapp.app.test_client().get("/show/export" + ("?songs=1" if songs else ""))
+    assert r.status_code == 200
+    return r.data
+
+
+def import_(webapp, data, replace=False):
+    return webapp.app.test_client().post("/show/import" + ("?replace=1" if replace else ""), data=data)
+
+
+def members(data):
+    with tarfile.open(fileobj=io.BytesIO(data)) as tf:
+        return {m.name: tf.extractfile(m).read() for m in tf}
+
+
+def package(files, manifest=None):
+    # hand-built package: files is {name: bytes}; manifest lists their real checksums
+    if manifest is None:
+        manifest = {"format": "showbox-show", "version": 1,
+                    "files": {n: {"sha256": hashlib.sha256(b).hexdigest(), "size": len(b)}
+                              for n, b in files.items()}}
+    out = io.BytesIO()
+    with tarfile.open(fileobj=out, mode="w") as tf:
+        for name, body in [("MANIFEST.json", json.dumps(manifest).encode())] + list(files.items()):
+            ti = tarfile.TarInfo(name)
+            ti.size = len(body)
+            tf.addfile(ti, io.BytesIO(body))
+    return out.getvalue()
+
+
+def test_export_contents(webapp, show):
+    data = export(webapp)
+    with tarfile.open(fileobj=io.BytesIO(data)) as tf:
+        assert tf.getmembers()[0].name == "MANIFEST.json"
+    files = members(data)
+    manifest = json.loads(files.pop("MANIFEST.json"))
+    assert sorted(files) == ["config.json", "cues/01_workcue.wav", "cues/02_workcue.mid",
+                             "jukebox/playlists/default.json", "shows/friday.json"]
+    for name, body in files.items():
+        assert manifest["files"][name] == {"sha256": hashlib.sha256(body).hexdigest(), "size": len(body)}
+    assert "jukebox/songs/song.mp3" in members(export(webapp, songs=True))
+
+
+def test_round_trip(webapp, show):
+    data = export(webapp, songs=True)
+    originals = {p: p.read_bytes() for p in webapp.CUES_DIR.glob("*_workcue.*")}
+    for d in (webapp.CUES_DIR, webapp.SHOWS_DIR, webapp.JUKE_LISTS, webapp.JUKE_SONGS):
+        shutil.rmtree(d)
+    webapp.CFG_PATH.unlink()
+
+    r = import_(webapp, data)
+    assert r.status_code == 200
+    assert len(r.json["written"]) == 6 and not r.json["rejected"]
+    for p, body in originals.items():
+        assert p.read_bytes() == body
+    assert (webapp.SHOWS_DIR / "friday.json").read_text() == '{"cues": []}'
+    cfg = json.loads(webapp.CFG_PATH.read_text())
+    assert cfg["show"] == "friday.json" and cfg["mode"] == "cues"  # never imports into jukebox
+    assert sorted(show) == ["cue/01_workcue.wav", "cue/02_workcue.mid", "song/song.mp3"]
+
+    again = import_(webapp, data).json
+    assert again["written"] == []
+    assert "cues/01_workcue.wav" in again["skipped"] and "config.json" in again["skipped"]
+
+
+def test_config_keeps_host_settings(webapp, show):
+    host = {"mode": "jukebox", "show": "friday.json", "midi_out_port": "20:0",
+            "outputs": {"stage": {"device": "alsa/hw:1"}}, "mirror": {"role": "primary", "peer": "10.0.0.2"},
+            "midi_inputs": [{"name": "ipad"}], "jukebox": {"play_mode": "random", "playlist": "a.json",
+                                                           "output": "stage"}}
+    webapp.save_cfg(host)
+    other = {"mode": "jukebox", "show": "saturday.json", "midi_out_port": "14:0", "outputs": {},
+             "mirror": {"role": "backup"}, "jukebox": {"play_mode": "playlist", "playlist": "b.json",
+                                                       "output": "monitors"}}
+    r = import_(webapp, package({"config.json": json.dumps(other).encode()}))
+    assert r.status_code == 200 and r.json["written"] == ["config.json"]
+    cfg = json.loads(webapp.CFG_PATH.read_text())
+    assert cfg == dict(host, mode="cues", show="saturday.json",
+                       jukebox={"play_mode": "playlist", "playlist": "b.json", "output": "stage"})
+
+
+def test_replace_removes_other_cues(webapp, show):
+    data = export(webapp)
+    extra = webapp.CUES_DIR / "03_workcue.wav"
+    extra.write_bytes(b"extra")
+    assert import_(webapp, data).json["removed"] == []
+    assert extra.exists()
+    assert import_(webapp, data, replace=True).json["removed"] == ["cues/03_workcue.wav"]
+    assert not extra.exists()
+    assert (webapp.CUES_DIR / "notes.txt").exists()  # not a cue name: left alone
+
+
+def test_checksum_mismatch_is_rejected(webapp, show):
+    good = b"new cue"
+    manifest = {"format": "showbox-show", "version": 1,
+                "files": {"cues/01_workcue.wav": {"sha256": hashlib.sha256(b"other").hexdigest()}}}
+    before = (webapp.CUES_DIR / "01_workcue.wav").read_bytes()
+    resp = import_(webapp, package({"cues/01_workcue.wav": good}, manifest))
+    assert resp.status_code == 422
+    r = resp.json
+    assert r["rejected"] == ["cues/01_workcue.wav"] and r["written"] == []
+    assert (webapp.CUES_DIR / "01_workcue.wav").read_bytes() == before
+    assert not list(webapp.CUES_DIR.glob(".import-*"))
+
+
+@pytest.mark.parametrize("name", [
+    "../escape.json", "cues/../../escape.wav", "/etc/passwd", "cues/evil.sh",
+    "shows/.hidden.json", "cues/sub/01_workcue.wav", "jukebox/songs/x.exe", "unlisted.json",
+])
+def test_unsafe_names_are_rejected(webapp, show, name):
+    resp = import_(webapp, package({name: b"x"}))
+    assert resp.status_code == 422 and name in resp.json["error"]
+    r = resp.json
+    assert r["rejected"] == [name] and r["written"] == []
+
+
+def test_not_a_package(webapp, show):
+    out = io.BytesIO()
+    with tarfile.open(fileobj=out, mode="w") as tf:
+        ti = tarfile.TarInfo("cues/01_workcue.wav")
+        ti.size = 1
+        tf.addfile(ti, io.BytesIO(b"x"))
+    r = import_(webapp, out.getvalue())
+    assert r.status_code == 400 and "MANIFEST.json" in r.json["error"]
+    bad = package({}, {"format": "other"})
+    assert import_(webapp, bad).status_code == 400
+    assert import_(webapp, b"").status_code == 400
@@ -0,0 +1,106 @@
+import os
+from array import array
+
+import pytest
+
+
+@pytest.fixture
+def cc(createcue, monkeypatch, tmp_path):
+    monkeypatch.setattr(createcue, "TTS_CACHE_DIR", tmp_path / "tts")
+    monkeypatch.setattr(createcue, "TTS_CACHE_MAX_BYTES", 1 << 30)
+    monkeypatch.setattr(createcue, "TTS_CACHE_ENABLED", True)
+    return createcue
+
+
+def tone(n, v=1000):
+    return array("h", [v] * n)
+
+
+def test_key(cc):
+    k = cc.tts_cache_key("piper", "en_US-amy.onnx:123", "Amos Moses")
+    assert k == cc.tts_cache_key("piper", "en_US-amy.onnx:123", "  Amos Moses\n")
+    assert len(k) == 64
+    others = {
+        cc.tts_cache_key("openai", "en_US-amy.onnx:123", "Amos Moses"),
+        cc.tts_cache_key("piper", "en_US-amy.onnx:124", "Amos Moses"),  # model file changed
+        cc.tts_cache_key("piper", "en_US-amy.onnx:123", "amos moses"),
+        cc.tts_cache_key("piper", "en_US-amy.onnx", ":123Amos Moses"),  # no separator collisions
+    }
+    assert k not in others and len(others) == 4
+
+
+def test_put_get(cc):
+    cc.tts_cache_put("a" * 64, tone(441))
+    assert cc.tts_cache_get("a" * 64) == tone(441)
+    assert cc.tts_cache_get("b" * 64) is None
+    assert not list(cc.TTS_CACHE_DIR.glob(".*"))  # no temp files left behind
+
+
+def test_disabled(cc, monkeypatch):
+    monkeypatch.setattr(cc, "TTS_CACHE_ENABLED", False)
+    cc.tts_cache_put("a" * 64, tone(10))
+    assert not cc.TTS_CACHE_DIR.exists()
+    assert cc.tts_cache_get("a" * 64) is None
+
+
+def test_damaged_entry_is_a_miss(cc):
+    cc.TTS_CACHE_DIR.mkdir(parents=True)
+    bad = cc.TTS_CACHE_DIR / f"{'c' * 64}.wav"
+    bad.write_bytes(b"not a wav")
+    assert cc.tts_cache_get("c" * 64) is None
+    assert not bad.exists()
+
+
+def test_lru_eviction(cc):
+    keys = [c * 64 for c in "abcd"]
+    for i, k in enumerate(keys):
+        cc.tts_cache_put(k, tone(1000))
+        os.utime(cc.TTS_CACHE_DIR / f"{k}.wav", (1000 + i, 1000 + i))
+    assert cc.tts_cache_get(keys[0]) is not None  # a is now the most recently used
+    size = (cc.TTS_CACHE_DIR / f"{keys[0]}.wav").stat().st_size
+    cc.tts_cache_evict(2 * size)
+    left = sorted(p.stem[0] for p in cc.TTS_CACHE_DIR.glob("*.wav"))
+    assert left == ["a", "d"]
+    cc.tts_cache_evict(0)
+    assert not list(cc.TTS_CACHE_DIR.glob("*.wav"))
+
+
+def test_put_enforces_limit(cc, monkeypatch):
+    cc.tts_cache_put("a" * 64, tone(1000))
+    size = (cc.TTS_CACHE_DIR / f"{'a' * 64}.wav").stat().st_size
+    monkeypatch.setattr(cc, "TTS_CACHE_MAX_BYTES", size)
+    os.utime(cc.TTS_CACHE_DIR / f"{'a' * 64}.wav", (1000, 1000))
+    cc.tts_cache_put("b" * 64, tone(1000))
+    assert [p.stem[0] for p in cc.TTS_CACHE_DIR.glob("*.wav")] == ["b"]
+
+
+def test_make_speech_uses_cache(cc, monkeypatch, tmp_path):
+    calls = []
+
+    def engines(ident):
+        def broken(text, out):
+            calls.append(("broken", text))
+            raise RuntimeError("offline")
+
+        def synth(text, out):
+            calls.append(("fake", text))
+            cc.write_wav(out, tone(len(text) * 100))
+        return [("broken", True, "x", broken), ("none", False, "", None), ("fake", True, ident, synth)]
+
+    monkeypatch.setattr(cc, "tts_engines", lambda prefer_openai, voice: engines("v1"))
+    first = cc.make_speech("Hello", tmp_path, False, "cedar")
+    assert first == tone(500)
+    assert calls == [("broken", "Hello"), ("fake", "Hello")]
+    calls.clear()
+    assert cc.make_speech("Hello", tmp_path, False, "cedar") == first
+    assert calls == [("broken", "Hello")]  # "fake" answered from the cache
+    calls.clear()
+    monkeypatch.setattr(cc, "tts_engines", lambda prefer_openai, voice: engines("v2"))
+    cc.make_speech("Hello", tmp_path, False, "cedar")
+    assert ("fake", "Hello") in calls  # another voice/model is another key
+
+
+def test_make_speech_without_engines(cc, monkeypatch, tmp_path):
+    monkeypatch.setattr(cc, "tts_engines", lambda prefer_openai, voice: [("none", False, "", None)])
+    with pytest.raises(RuntimeError, match="no TTS engine"):
+        cc.make_speech("Hello", tmp_path, False, "cedar")